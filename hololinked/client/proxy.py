@@ -9,7 +9,8 @@ from ..server.config import global_config
 from ..server.constants import JSON, CommonRPC, ServerMessage, ResourceTypes, ZMQ_PROTOCOLS
 from ..server.serializers import BaseSerializer
 from ..server.dataklasses import ZMQResource, ServerSentEvent
-from ..server.zmq_message_brokers import AsyncZMQClient, SyncZMQClient, EventConsumer, PROXY
+from ..server.zmq_message_brokers import (AsyncZMQClient, SyncZMQClient, EventConsumer, PROXY, EMPTY_DICT, 
+                                        shared_zmq_clients)
 from ..server.schema_validators import BaseSchemaValidator
 
 
@@ -36,6 +37,11 @@ class ObjectProxy:
     **kwargs: 
         async_mixin: bool, default False
             whether to use both synchronous and asynchronous clients. 
+        shared_client: bool, default False
+            use a synchronous client shared with other proxies of the same server, protocol & serializer 
+            (see ``SharedZMQClients``), which is already connected to the server. The asynchronous client is not shared.
+            A shared client always handshakes with the server irrespective of ``load_thing``, and logs with the 
+            logger of the proxy which created it.
         serializer: BaseSerializer
             use a custom serializer, must be same as the serializer supplied to the server. 
         schema_validator: BaseSchemaValidator
@@ -72,7 +78,14 @@ class ObjectProxy:
         # done by the ZMQ client and not by the Proxy client directly. Proxy client only 
         # bothers mainly about __setattr__ and _getattr__
         self.async_zmq_client = None    
-        self.zmq_client = SyncZMQClient(instance_name, self.identity, client_type=PROXY, protocol=protocol, 
+        if kwargs.get("shared_client", False):
+            self.zmq_client = shared_zmq_clients.get(instance_name, protocol, 
+                                            socket_address=kwargs.get('socket_address', None),
+                                            zmq_serializer=kwargs.get('serializer', None), 
+                                            handshake_timeout=kwargs.get('handshake_timeout', 60000),
+                                            logger=self.logger)
+        else:
+            self.zmq_client = SyncZMQClient(instance_name, self.identity, client_type=PROXY, protocol=protocol, 
                                             zmq_serializer=kwargs.get('serializer', None), handshake=load_thing,
                                             logger=self.logger, **kwargs)
         if kwargs.get("async_mixin", False):
@@ -165,7 +178,7 @@ class ObjectProxy:
 
 
     def invoke_action(self, method : str, oneway : bool = False, noblock : bool = False, 
-                                *args, **kwargs) -> typing.Any:
+                                *args, idempotency_key : typing.Optional[str] = None, **kwargs) -> typing.Any:
         """
         call a method specified by name on the server with positional/keyword arguments
 
@@ -179,6 +192,10 @@ class ObjectProxy:
             request a method call but collect the reply later using a reply id
         *args: Any
             arguments for the method 
+        idempotency_key: str, optional
+            the server executes the method once for all calls with the same key and answers repeated calls 
+            (retries) with the reply of the first call, as long as the reply is kept by the server (see 
+            ``idempotency_cache_size`` of ``RPCServer``). Not supported with oneway.
         **kwargs: Dict[str, Any]
             keyword arguments for the method
 
@@ -194,17 +211,25 @@ class ObjectProxy:
         Exception:
             server raised exception are propagated 
         """
-        method = getattr(self, method, None) # type: _RemoteMethod 
-        if not isinstance(method, _RemoteMethod):
+        remote_method = getattr(self, method, None) # type: _RemoteMethod 
+        if not isinstance(remote_method, _RemoteMethod):
             raise AttributeError(f"No remote method named {method}")
+        if idempotency_key is not None:
+            if oneway:
+                raise ValueError("idempotency key cannot be used for oneway calls, there is no reply to be repeated")
+            if not noblock:
+                return remote_method.idempotent(idempotency_key, *args, **kwargs)
+            msg_id = remote_method.idempotent(idempotency_key, *args, noblock=True, **kwargs)
+            self._noblock_messages[msg_id] = remote_method
+            return msg_id
         if oneway:
-            method.oneway(*args, **kwargs)
+            remote_method.oneway(*args, **kwargs)
         elif noblock:
-            msg_id = method.noblock(*args, **kwargs)
-            self._noblock_messages[msg_id] = method
+            msg_id = remote_method.noblock(*args, **kwargs)
+            self._noblock_messages[msg_id] = remote_method
             return msg_id
         else:
-            return method(*args, **kwargs)
+            return remote_method(*args, **kwargs)
 
 
     async def async_invoke_action(self, method : str, *args, **kwargs) -> typing.Any:
@@ -235,10 +260,10 @@ class ObjectProxy:
         Exception:
             server raised exception are propagated
         """
-        method = getattr(self, method, None) # type: _RemoteMethod 
-        if not isinstance(method, _RemoteMethod):
+        remote_method = getattr(self, method, None) # type: _RemoteMethod 
+        if not isinstance(remote_method, _RemoteMethod):
             raise AttributeError(f"No remote method named {method}")
-        return await method.async_call(*args, **kwargs)
+        return await remote_method.async_call(*args, **kwargs)
 
 
     def read_property(self, name : str, noblock : bool = False) -> typing.Any:
@@ -261,7 +286,7 @@ class ObjectProxy:
         """
         prop = self.__dict__.get(name, None) # type: _Property
         if not isinstance(prop, _Property):
-            raise AttributeError(f"No property named {prop}")
+            raise AttributeError(f"No property named {name}")
         if noblock:
             msg_id = prop.noblock_get()
             self._noblock_messages[msg_id] = prop
@@ -296,7 +321,7 @@ class ObjectProxy:
         """
         prop = self.__dict__.get(name, None) # type: _Property
         if not isinstance(prop, _Property):
-            raise AttributeError(f"No property named {prop}")
+            raise AttributeError(f"No property named {name}")
         if oneway:
             prop.oneway_set(value)
         elif noblock:
@@ -325,7 +350,7 @@ class ObjectProxy:
         """
         prop = self.__dict__.get(name, None) # type: _Property
         if not isinstance(prop, _Property):
-            raise AttributeError(f"No property named {prop}")
+            raise AttributeError(f"No property named {name}")
         return await prop.async_get()
     
 
@@ -350,7 +375,7 @@ class ObjectProxy:
         """
         prop = self.__dict__.get(name, None) # type: _Property
         if not isinstance(prop, _Property):
-            raise AttributeError(f"No property named {prop}")
+            raise AttributeError(f"No property named {name}")
         await prop.async_set(value)
 
 
@@ -462,6 +487,21 @@ class ObjectProxy:
         await method.async_call(**properties)
 
 
+    def batch(self) -> "_Batch":
+        """
+        collect action calls and property reads/writes to be sent in a single message and executed in order in one 
+        pass on the server, for example to poll many properties at once:
+        ::
+            values = client.batch().read_property('x').read_property('y').invoke_action('reset').execute()
+
+        Returns
+        -------
+        _Batch
+            batch on which instructions are added and executed 
+        """
+        return _Batch(self)
+
+
     def subscribe_event(self, name : str, callbacks : typing.Union[typing.List[typing.Callable], typing.Callable],
                         thread_callbacks : bool = False, deserialize : bool = True) -> None:
         """
@@ -523,18 +563,18 @@ class ObjectProxy:
         obj = self._noblock_messages.get(message_id, None) 
         if not obj:
             raise ValueError('given message id not a one way call or invalid.')
-        reply = self.zmq_client._reply_cache.get(message_id, None)
+        reply = self.zmq_client._reply_cache.pop(message_id, None)
         if not reply: 
             reply = self.zmq_client.recv_reply(message_id=message_id, timeout=timeout,
                                     raise_client_side_exception=True)
         if not reply:
             raise ReplyNotArrivedError(f"could not fetch reply within timeout for message id '{message_id}'")
+        self._noblock_messages.pop(message_id, None)
         if isinstance(obj, _RemoteMethod):
             obj._last_return_value = reply 
-            return obj.last_return_value # note the missing underscore
         elif isinstance(obj, _Property):
             obj._last_value = reply 
-            return obj.last_read_value
+        return _reply_value(reply)
 
 
     def load_thing(self):
@@ -570,6 +610,11 @@ class ObjectProxy:
                             serialization_specific=data.serialization_specific, serializer=self.zmq_client.zmq_serializer, logger=self.logger)
                 _add_event(self, event, data)
                 self.__dict__[data.name] = event 
+        if f"/{self.instance_name}{CommonRPC.OPCODES}" in reply:
+            # older servers do not publish opcodes
+            self.zmq_client.fetch_opcodes()
+            if self.async_zmq_client is not None and self.async_zmq_client._use_compact_header:
+                self.async_zmq_client.opcodes = self.zmq_client.opcodes
 
 
     
@@ -583,6 +628,16 @@ SM_INDEX_MESSAGE_ID = ServerMessage.MESSAGE_ID.value
 SM_INDEX_DATA = ServerMessage.DATA.value
 SM_INDEX_ENCODED_DATA = ServerMessage.ENCODED_DATA.value
 
+
+def _reply_value(reply : typing.List[typing.Any]) -> typing.Any:
+    """
+    returned value within a reply message, pre-encoded data if present
+    """
+    if len(reply[SM_INDEX_ENCODED_DATA]) > 0:
+        return reply[SM_INDEX_ENCODED_DATA]
+    return reply[SM_INDEX_DATA]
+
+
 class _RemoteMethod:
     
     __slots__ = ['_zmq_client', '_async_zmq_client', '_instruction', '_invokation_timeout', '_execution_timeout',
@@ -617,9 +672,7 @@ class _RemoteMethod:
         """
         cached return value of the last call to the method
         """
-        if len(self._last_return_value[SM_INDEX_ENCODED_DATA]) > 0:
-            return self._last_return_value[SM_INDEX_ENCODED_DATA]
-        return self._last_return_value[SM_INDEX_DATA]
+        return _reply_value(self._last_return_value)
     
     @property
     def last_zmq_message(self) -> typing.List:
@@ -633,10 +686,11 @@ class _RemoteMethod:
             kwargs["__args__"] = args
         elif self._schema_validator:
             self._schema_validator.validate(kwargs)
-        self._last_return_value = self._zmq_client.execute(instruction=self._instruction, arguments=kwargs, 
+        reply = self._zmq_client.execute(instruction=self._instruction, arguments=kwargs, 
                                     invokation_timeout=self._invokation_timeout, execution_timeout=self._execution_timeout,
                                     raise_client_side_exception=True, argument_schema=self._schema)
-        return self.last_return_value # note the missing underscore
+        self._last_return_value = reply
+        return _reply_value(reply) # the last return value may already be of a call from another thread
     
     def oneway(self, *args, **kwargs) -> None:
         """
@@ -659,6 +713,24 @@ class _RemoteMethod:
         return self._zmq_client.send_instruction(instruction=self._instruction, arguments=kwargs, 
                                 invokation_timeout=self._invokation_timeout, execution_timeout=self._execution_timeout,
                                 argument_schema=self._schema)
+    
+    def idempotent(self, idempotency_key : str, *args, noblock : bool = False, **kwargs) -> typing.Any:
+        """
+        execute method on server once for all calls with the same idempotency key, repeated calls are answered 
+        with the reply of the first call. Returns the message id instead of the return value if noblock is True.
+        """
+        if len(args) > 0: 
+            kwargs["__args__"] = args
+        elif self._schema_validator:
+            self._schema_validator.validate(kwargs)
+        msg_id = self._zmq_client.send_instruction(instruction=self._instruction, arguments=kwargs, 
+                                invokation_timeout=self._invokation_timeout, execution_timeout=self._execution_timeout,
+                                context=dict(idempotency_key=idempotency_key), argument_schema=self._schema)
+        if noblock:
+            return msg_id
+        reply = self._zmq_client.recv_reply(msg_id, raise_client_side_exception=True)
+        self._last_return_value = reply
+        return _reply_value(reply)
      
     async def async_call(self, *args, **kwargs):
         """
@@ -670,11 +742,12 @@ class _RemoteMethod:
             kwargs["__args__"] = args
         elif self._schema_validator:
             self._schema_validator.validate(kwargs)
-        self._last_return_value = await self._async_zmq_client.async_execute(instruction=self._instruction, 
+        reply = await self._async_zmq_client.async_execute(instruction=self._instruction, 
                                         arguments=kwargs, invokation_timeout=self._invokation_timeout, 
                                         raise_client_side_exception=True,
                                         argument_schema=self._schema)
-        return self.last_return_value # note the missing underscore
+        self._last_return_value = reply
+        return _reply_value(reply)
 
     
 class _Property:
@@ -698,9 +771,7 @@ class _Property:
         """
         cache of last read value
         """
-        if len(self._last_value[SM_INDEX_ENCODED_DATA]) > 0:
-            return self._last_value[SM_INDEX_ENCODED_DATA]
-        return self._last_value[SM_INDEX_DATA]
+        return _reply_value(self._last_value)
     
     @property
     def last_zmq_message(self) -> typing.List:
@@ -714,10 +785,11 @@ class _Property:
                                                         raise_client_side_exception=True)
      
     def get(self) -> typing.Any:
-        self._last_value = self._zmq_client.execute(self._read_instruction, 
+        reply = self._zmq_client.execute(self._read_instruction, 
                                                 invokation_timeout=self._invokation_timeout, 
                                                 raise_client_side_exception=True)
-        return self.last_read_value 
+        self._last_value = reply
+        return _reply_value(reply)
     
     async def async_set(self, value : typing.Any) -> None:
         if not self._async_zmq_client:
@@ -730,11 +802,12 @@ class _Property:
     async def async_get(self) -> typing.Any:
         if not self._async_zmq_client:
             raise RuntimeError("async calls not possible as async_mixin was not set at __init__()")
-        self._last_value = await self._async_zmq_client.async_execute(self._read_instruction,
+        reply = await self._async_zmq_client.async_execute(self._read_instruction,
                                                 invokation_timeout=self._invokation_timeout, 
                                                 execution_timeout=self._execution_timeout,
                                                 raise_client_side_exception=True)
-        return self.last_read_value 
+        self._last_value = reply
+        return _reply_value(reply)
     
     def noblock_get(self) -> None:
         return self._zmq_client.send_instruction(self._read_instruction,
@@ -753,6 +826,107 @@ class _Property:
   
 
 
+class _Batch:
+    """
+    Instructions collected by ``ObjectProxy.batch()``. Each add method returns the batch itself so that calls 
+    can be chained. The batch can be executed more than once.
+    """
+
+    __slots__ = ['_proxy', '_instructions']
+
+    def __init__(self, proxy : ObjectProxy) -> None:
+        self._proxy = proxy 
+        self._instructions = [] # type: typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]]
+
+    def __len__(self) -> int:
+        return len(self._instructions)
+    
+    def add(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT) -> "_Batch":
+        """
+        add an instruction as such, for example of a resource of a sub-thing which is not an attribute of the proxy
+        """
+        self._instructions.append((instruction, arguments))
+        return self
+
+    def invoke_action(self, method : str, *args, **kwargs) -> "_Batch":
+        """
+        add a call of a method specified by name with positional/keyword arguments
+        """
+        remote_method = self._proxy.__dict__.get(method, None) # type: _RemoteMethod 
+        if not isinstance(remote_method, _RemoteMethod):
+            raise AttributeError(f"No remote method named {method}")
+        if len(args) > 0: 
+            kwargs["__args__"] = args
+        elif remote_method._schema_validator:
+            remote_method._schema_validator.validate(kwargs)
+        return self.add(remote_method._instruction, kwargs)
+    
+    def read_property(self, name : str) -> "_Batch":
+        """
+        add a read of a property specified by name 
+        """
+        prop = self._proxy.__dict__.get(name, None) # type: _Property
+        if not isinstance(prop, _Property):
+            raise AttributeError(f"No property named {name}")
+        return self.add(prop._read_instruction)
+    
+    def write_property(self, name : str, value : typing.Any) -> "_Batch":
+        """
+        add a write of a property specified by name 
+        """
+        prop = self._proxy.__dict__.get(name, None) # type: _Property
+        if not isinstance(prop, _Property):
+            raise AttributeError(f"No property named {name}")
+        return self.add(prop._write_instruction, dict(value=value))
+
+    def execute(self, raise_client_side_exception : bool = True) -> typing.List[typing.Any]:
+        """
+        send the batch and wait for the results
+
+        Parameters
+        ----------
+        raise_client_side_exception: bool, default True
+            raise the first exception raised by an instruction on the server, otherwise the exception 
+            takes the place of the return value in the results. 
+
+        Returns
+        -------
+        List[Any]
+            return value of each instruction in order
+        """
+        reply = self._proxy.zmq_client.execute_batch(self._instructions, 
+                                                invokation_timeout=self._proxy.invokation_timeout, 
+                                                raise_client_side_exception=True)
+        return self._results(reply[SM_INDEX_DATA], raise_client_side_exception)
+    
+    async def async_execute(self, raise_client_side_exception : bool = True) -> typing.List[typing.Any]:
+        """
+        async(io) send the batch and wait for the results, see ``execute()``
+        """
+        if not self._proxy.async_zmq_client:
+            raise RuntimeError("async calls not possible as async_mixin was not set at __init__()")
+        reply = await self._proxy.async_zmq_client.async_execute_batch(self._instructions, 
+                                                invokation_timeout=self._proxy.invokation_timeout, 
+                                                raise_client_side_exception=True)
+        return self._results(reply[SM_INDEX_DATA], raise_client_side_exception)
+    
+    def _results(self, items : typing.List[typing.Dict[str, typing.Any]], 
+                raise_client_side_exception : bool) -> typing.List[typing.Any]:
+        results = []
+        for item in items:
+            if item.get('exception', None) is None:
+                results.append(item['returnValue'])
+                continue
+            try:
+                self._proxy.zmq_client.raise_local_exception(item['exception'])
+            except Exception as ex:
+                if raise_client_side_exception:
+                    raise 
+                results.append(ex)
+        return results
+
+
+
 class _Event:
     
     __slots__ = ['_zmq_client', '_name', '_obj_name', '_unique_identifier', '_socket_address', '_callbacks', '_serialization_specific',
@@ -274,6 +274,7 @@ class HTTPServer(Parameterized):
             return 
         self.logger.info(f"attempting to update router with thing {client.instance_name}.")
         self._lost_things[client.instance_name] = client
+        retry_interval = 0.1 # doubled after each failure upto 5 seconds
         while True:
             try:
                 await client.handshake_complete()
@@ -283,6 +284,9 @@ class HTTPServer(Parameterized):
                                 raise_client_side_exception=True
                             ))[ServerMessage.DATA]
                 resources.update(reply)
+                if f"/{client.instance_name}{CommonRPC.OPCODES}" in resources:
+                    # older servers do not publish opcodes
+                    await client.async_fetch_opcodes()
 
                 handlers = []
                 for instruction, http_resource in resources.items():
@@ -338,10 +342,10 @@ class HTTPServer(Parameterized):
                 self.logger.info(f"updated router with thing {client.instance_name}.")
                 break
             except Exception as ex:
-                print("error", ex)
                 self.logger.error(f"error while trying to update router with thing - {str(ex)}. " +
-                                  "Trying again in 5 seconds")
-                await asyncio.sleep(5)
+                                  f"Trying again in {retry_interval} seconds")
+                await asyncio.sleep(retry_interval)
+                retry_interval = min(2 * retry_interval, 5)
        
         try:
             reply = (await client.async_execute(
@@ -361,7 +365,7 @@ class HTTPServer(Parameterized):
         except Exception as ex:
             self.logger.error(f"error while trying to update thing with HTTP server details - {str(ex)}. " +
                                 "Trying again in 5 seconds")
-        self.zmq_client_pool.poller.register(client.socket, zmq.POLLIN)
+        self.zmq_client_pool.register_client(client)
         self._lost_things.pop(client.instance_name)
 
 
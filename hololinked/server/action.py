@@ -7,7 +7,7 @@ from inspect import iscoroutinefunction, getfullargspec
 from ..param.parameterized import ParameterizedFunction
 from .utils import issubklass, pep8_to_URL_path, isclassmethod
 from .dataklasses import ActionInfoValidator
-from .constants import USE_OBJECT_NAME, UNSPECIFIED, HTTP_METHODS, JSON
+from .constants import USE_OBJECT_NAME, UNSPECIFIED, HTTP_METHODS, JSON, Priority
 from .config import global_config
 
 
@@ -16,7 +16,10 @@ __action_kw_arguments__ = ['safe', 'idempotent', 'synchronous']
    
 def action(URL_path : str = USE_OBJECT_NAME, http_method : str = HTTP_METHODS.POST, 
             state : typing.Optional[typing.Union[str, Enum]] = None, input_schema : typing.Optional[JSON] = None,
-            output_schema : typing.Optional[JSON] = None, create_task : bool = False, **kwargs) -> typing.Callable:
+            output_schema : typing.Optional[JSON] = None, create_task : bool = False, 
+            max_concurrency : typing.Optional[int] = None, priority : int = Priority.NORMAL, 
+            threaded : bool = False, lock : typing.Optional[str] = None, process_pool : bool = False, 
+            **kwargs) -> typing.Callable:
     """
     Use this function as a decorate on your methods to make them accessible remotely. For WoT, an action affordance schema 
     for the method is generated.
@@ -34,6 +37,26 @@ def action(URL_path : str = USE_OBJECT_NAME, http_method : str = HTTP_METHODS.PO
         schema for arguments to validate them.
     output_schema: JSON 
         schema for return value, currently only used to inform clients which is supposed to validate on its won. 
+    create_task: bool, default False
+        for async methods, schedule the execution as a task and reply when it finishes, so that other 
+        instructions (for example, property reads) are executed meanwhile instead of waiting for the action to 
+        complete. Not applicable to sync methods, and not within a batch of instructions. 
+    max_concurrency: int, optional
+        maximum number of concurrent executions of an action with ``create_task=True``, further invokations wait 
+        in order of arrival. For example, 1 allows one scan at a time while other instructions are still served.
+    priority: int, default Priority.NORMAL
+        priority in the queue of the RPC server, higher priorities are served first. For example, an action which 
+        stops an acquisition may be ``Priority.HIGH`` so that it is not queued behind property reads. 
+    threaded: bool, default False
+        for sync methods, execute in the thread pool of the ``Thing`` (see ``thread_pool_size`` in ``Thing.run()``) 
+        and reply when it finishes, so that a blocking call does not stall other instructions. 
+    lock: str, optional
+        name of a lock held during execution, actions & properties sharing a lock are never executed concurrently, 
+        for example, to serialize the access to a device among threaded actions. 
+    process_pool: bool, default False
+        for CPU bound sync classmethods, execute in the process pool of the ``Thing`` (see ``process_pool_size`` in 
+        ``Thing.run()``) and reply when it finishes, so that the GIL of the process serving the clients is not held. 
+        Arguments and return value must be picklable, large numpy arrays are returned through shared memory. 
     **kwargs:
         safe: bool 
             indicate in thing description if action is safe to execute 
@@ -49,10 +72,10 @@ def action(URL_path : str = USE_OBJECT_NAME, http_method : str = HTTP_METHODS.PO
     
     def inner(obj):
         original = obj
-        if (not isinstance(obj, (FunctionType, MethodType)) and not isclassmethod(obj) and 
+        if (not isinstance(obj, (FunctionType, MethodType, classmethod)) and not isclassmethod(obj) and 
             not issubklass(obj, ParameterizedFunction)):
                 raise TypeError(f"target for action or is not a function/method. Given type {type(obj)}") from None 
-        if isclassmethod(obj):
+        if isclassmethod(obj) or isinstance(obj, classmethod):
             obj = obj.__func__
         if obj.__name__.startswith('__'):
             raise ValueError(f"dunder objects cannot become remote : {obj.__name__}")
@@ -99,6 +122,11 @@ def action(URL_path : str = USE_OBJECT_NAME, http_method : str = HTTP_METHODS.PO
         obj._remote_info.return_value_schema = output_schema
         obj._remote_info.obj = original
         obj._remote_info.create_task = create_task
+        obj._remote_info.max_concurrency = max_concurrency
+        obj._remote_info.priority = priority
+        obj._remote_info.threaded = threaded
+        obj._remote_info.lock = lock
+        obj._remote_info.process_pool = process_pool
         obj._remote_info.safe = kwargs.get('safe', False)
         obj._remote_info.idempotent = kwargs.get('idempotent', False)
         obj._remote_info.synchronous = kwargs.get('synchronous', False)
@@ -109,6 +137,9 @@ def action(URL_path : str = USE_OBJECT_NAME, http_method : str = HTTP_METHODS.PO
         else:
             obj._remote_info.iscoroutine = iscoroutinefunction(obj)
             obj._remote_info.isparameterized = False 
+        if process_pool and (threaded or obj._remote_info.iscoroutine or obj._remote_info.isparameterized):
+            raise ValueError(f"process_pool is only supported for sync classmethods and not along with threaded, " +
+                            f"given {obj.__qualname__}")
         if global_config.validate_schemas and input_schema:
             jsonschema.Draft7Validator.check_schema(input_schema)
         if global_config.validate_schemas and output_schema:
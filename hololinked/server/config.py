@@ -47,10 +47,12 @@ class Configuration:
     default - tempfile.gettempdir().
     
     TCP_SOCKET_SEARCH_START_PORT - starting port number for automatic port searching 
-    for TCP socket binding, used for event addresses. default 60000.
+    for TCP socket binding when no socket address is given, used for event addresses. default None, 
+    i.e. the port is assigned by the operating system. Clients find these ports in the registry of the host 
+    (``hololinked.server.registry.ThingRegistry``). 
     
     TCP_SOCKET_SEARCH_END_PORT - ending port number for automatic port searching 
-    for TCP socket binding, used for event addresses. default 65535.
+    for TCP socket binding, used when TCP_SOCKET_SEARCH_START_PORT is set. default 65535.
 
     DB_CONFIG_FILE - file path for database configuration. default None. 
 
@@ -64,6 +66,12 @@ class Configuration:
 
     USE_UVLOOP - signicantly faster event loop for Linux systems. Reads data from network faster. default False. 
 
+    ZMQ_ZERO_COPY_THRESHOLD - size in bytes of a message frame above which ZMQ messages are sent without copying 
+    the frames, None to always copy. default 65536. 
+
+    ZMQ_CLIENT_POOL_WIDTH - number of clients per server shared by proxies created with ``shared_client=True``. 
+    default 1.
+
     Parameters
     ----------
     use_environment: bool
@@ -86,6 +94,8 @@ class Configuration:
         "PWD_HASHER_TIME_COST", "PWD_HASHER_MEMORY_COST",
         # Eventloop
         "USE_UVLOOP", "TRACE_MALLOC",
+        # ZMQ
+        "ZMQ_ZERO_COPY_THRESHOLD", "ZMQ_CLIENT_POOL_WIDTH",
         'validate_schema_on_client', 'validate_schemas'
     ]
 
@@ -99,11 +109,13 @@ class Configuration:
         Set use_environment to False to not use environment file. 
         """
         self.TEMP_DIR = f"{tempfile.gettempdir()}{os.sep}hololinked"
-        self.TCP_SOCKET_SEARCH_START_PORT = 60000
+        self.TCP_SOCKET_SEARCH_START_PORT = None
         self.TCP_SOCKET_SEARCH_END_PORT = 65535
         self.PWD_HASHER_TIME_COST = 15
         self.USE_UVLOOP = False
         self.TRACE_MALLOC = False
+        self.ZMQ_ZERO_COPY_THRESHOLD = 65536
+        self.ZMQ_CLIENT_POOL_WIDTH = 1
         self.validate_schema_on_client = False
         self.validate_schemas = True 
 
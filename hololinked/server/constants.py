@@ -36,6 +36,7 @@ class CommonRPC(StrEnum):
     ZMQ_RESOURCES = '/resources/zmq-object-proxy'
     HTTP_RESOURCES = '/resources/http-server'
     OBJECT_INFO = '/object-info'
+    OPCODES = '/resources/opcodes'
     PING = '/ping'
 
     @classmethod
@@ -46,6 +47,10 @@ class CommonRPC(StrEnum):
     def http_resource_read(cls, instance_name : str) -> str:
         return f"/{instance_name}{cls.HTTP_RESOURCES}/read"
     
+    @classmethod
+    def opcodes_read(cls, instance_name : str) -> str:
+        return f"/{instance_name}{cls.OPCODES}/read"
+
     @classmethod
     def object_info_read(cls, instance_name : str) -> str: 
         return f"/{instance_name}{cls.OBJECT_INFO}/read"
@@ -75,6 +80,17 @@ class HTTP_METHODS(StrEnum):
 http_methods = [member for member in HTTP_METHODS._member_map_]
 
 
+class Priority(IntEnum):
+    """
+    priority of the instructions of an action or property in the queue of the RPC server, higher values are 
+    served first. Any integer may be used.
+    """
+    LOW = -1
+    NORMAL = 0
+    HIGH = 1
+    CRITICAL = 2
+
+
 # Logging 
 class LOGLEVEL(IntEnum):
     """``logging.Logger`` log levels"""
@@ -195,5 +211,6 @@ for name in dir(zmq):
 __all__ = [
     Serializers.__name__, 
     HTTP_METHODS.__name__,
-    ZMQ_PROTOCOLS.__name__
+    ZMQ_PROTOCOLS.__name__,
+    Priority.__name__
 ]
\ No newline at end of file
@@ -9,9 +9,9 @@ from enum import Enum
 from dataclasses import dataclass, asdict, field, fields
 from types import FunctionType, MethodType
 
-from ..param.parameters import String, Boolean, Tuple, TupleSelector, ClassSelector, Parameter
+from ..param.parameters import String, Boolean, Integer, Tuple, TupleSelector, ClassSelector, Parameter
 from ..param.parameterized import ParameterizedMetaclass, ParameterizedFunction
-from .constants import JSON, USE_OBJECT_NAME, UNSPECIFIED, HTTP_METHODS, REGEX, ResourceTypes, http_methods 
+from .constants import JSON, USE_OBJECT_NAME, UNSPECIFIED, HTTP_METHODS, REGEX, Priority, ResourceTypes, http_methods 
 from .utils import get_signature, getattr_without_descriptor_read, pep8_to_URL_path
 from .config import global_config
 from .schema_validators import BaseSchemaValidator
@@ -45,6 +45,12 @@ class RemoteResourceInfoValidator:
         True for a method or function or callable
     isproperty : bool, default False
         True for a property
+    priority : int, default Priority.NORMAL
+        priority of the instructions in the queue of the RPC server, higher values are served first
+    threaded : bool, default False
+        execute the callable (or the property accessors) in the thread pool of the ``Thing``
+    lock : str, default None
+        name of a lock held during execution, resources sharing a lock are not executed concurrently
     """
     URL_path = String(default=USE_OBJECT_NAME,
                     doc="the path in the URL under which the object is accesible.") # type: str
@@ -60,6 +66,12 @@ class RemoteResourceInfoValidator:
                     doc="True for a method or function or callable") # type: bool
     isproperty = Boolean(default=False,
                     doc="True for a property") # type: bool
+    priority = Integer(default=Priority.NORMAL, 
+                    doc="priority of the instructions in the queue of the RPC server, higher values are served first") # type: int
+    threaded = Boolean(default=False,
+                    doc="execute the callable (or the property accessors) in the thread pool of the Thing") # type: bool
+    lock = String(default=None, allow_None=True,
+                    doc="name of a lock held during execution, resources sharing a lock are not executed concurrently") # type: typing.Optional[str]
     
     def __init__(self, **kwargs) -> None:
         """   
@@ -95,7 +107,8 @@ class RemoteResourceInfoValidator:
         return RemoteResource(
                     state=tuple(self.state) if self.state is not None else None, 
                     obj_name=self.obj_name, isaction=self.isaction, 
-                    isproperty=self.isproperty, obj=obj, bound_obj=bound_obj, 
+                    isproperty=self.isproperty, obj=obj, bound_obj=bound_obj, priority=self.priority,
+                    threaded=self.threaded, lock=self.lock
                 ) 
         # http method is manually always stored as a tuple
     
@@ -111,6 +124,10 @@ class ActionInfoValidator(RemoteResourceInfoValidator):
         schema for return value of a callable. Assumption is therefore return value will be JSON complaint.
     create_task: bool, default True
         default for async methods/actions 
+    max_concurrency: int, default None
+        maximum number of concurrent executions of an async action executed as a task, None for no limit
+    process_pool: bool, default False
+        execute the classmethod in the process pool of the ``Thing``
     safe: bool, default True
         metadata information whether the action is safe to execute
     idempotent: bool, default False
@@ -128,6 +145,10 @@ class ActionInfoValidator(RemoteResourceInfoValidator):
                     doc="schema for return value of a callable")
     create_task = Boolean(default=True, 
                         doc="should a coroutine be tasked or run in the same loop?") # type: bool
+    max_concurrency = Integer(default=None, allow_None=True, bounds=(1, None),
+                        doc="maximum number of concurrent executions of an async action executed as a task") # type: typing.Optional[int]
+    process_pool = Boolean(default=False,
+                        doc="execute the classmethod in the process pool of the Thing") # type: bool
     iscoroutine = Boolean(default=False, # not sure if isFuture or isCoroutine is correct, something to fix later
                     doc="whether the callable should be awaited") # type: bool
     safe = Boolean(default=True,
@@ -144,9 +165,11 @@ class ActionInfoValidator(RemoteResourceInfoValidator):
         return ActionResource(
                     state=tuple(self.state) if self.state is not None else None, 
                     obj_name=self.obj_name, isaction=self.isaction, iscoroutine=self.iscoroutine,
-                    isproperty=self.isproperty, obj=obj, bound_obj=bound_obj, 
+                    isproperty=self.isproperty, obj=obj, bound_obj=bound_obj, priority=self.priority,
+                    threaded=self.threaded, lock=self.lock,
                     schema_validator=(bound_obj.schema_validator)(self.argument_schema) if not global_config.validate_schema_on_client and self.argument_schema else None,
-                    create_task=self.create_task, isparameterized=self.isparameterized
+                    create_task=self.create_task, max_concurrency=self.max_concurrency, process_pool=self.process_pool,
+                    isparameterized=self.isparameterized
                 ) 
     
 
@@ -196,6 +219,12 @@ class RemoteResource(SerializableDataclass):
             property or method/action
     bound_obj : owner instance
         ``Thing`` instance
+    priority : int
+        priority of the instructions in the queue of the RPC server
+    threaded : bool
+        executed in the thread pool of the ``Thing``
+    lock : str
+        name of the lock held during execution, None for no lock
     """
     state : typing.Optional[typing.Union[typing.Tuple, str]] 
     obj_name : str 
@@ -203,6 +232,9 @@ class RemoteResource(SerializableDataclass):
     isproperty : bool
     obj : typing.Any
     bound_obj : typing.Any
+    priority : int
+    threaded : bool
+    lock : typing.Optional[str]
     
     def json(self):
         """
@@ -228,10 +260,18 @@ class ActionResource(RemoteResource):
         whether the callable should be awaited
     schema_validator : BaseSchemaValidator
         schema validator for the callable if to be validated server side
+    create_task : bool
+        whether a coroutine is scheduled as a task instead of being awaited before the next instruction
+    max_concurrency : int
+        maximum number of concurrent executions as a task, None for no limit
+    process_pool : bool
+        executed in the process pool of the ``Thing``
     """ 
     iscoroutine : bool
     schema_validator : typing.Optional[BaseSchemaValidator]
     create_task : bool 
+    max_concurrency : typing.Optional[int]
+    process_pool : bool
     isparameterized : bool
     # no need safe, idempotent, synchronous
 
@@ -578,4 +618,43 @@ def get_organised_resources(instance):
    
     # The above for-loops can be used only once, the division is only for readability
     # following are in _internal_fixed_attributes - allowed to set only once
-    return zmq_resources, httpserver_resources, instance_resources    
\ No newline at end of file
+    return zmq_resources, httpserver_resources, instance_resources    
+
+
+def get_opcode_table(instance_resources : typing.Dict[str, RemoteResource]) -> typing.Tuple[
+                    typing.Dict[str, int], typing.List[typing.Tuple[RemoteResource, str, str]]]:
+    """
+    assign an integer opcode to each instruction so that clients can send the opcode instead of the instruction 
+    string and the event loop can find the resource & operation by list index. Opcodes are assigned in sorted order 
+    of the instructions and are valid for the lifetime of the ``Thing`` instance. 
+
+    Returns
+    -------
+    opcodes: Dict[str, int]
+        instruction to opcode, published to clients
+    opcode_table: List[Tuple[RemoteResource, str, str]]
+        resource, operation (read, write, delete for properties & invoke for actions) and instruction, indexed by opcode
+    """
+    opcodes = dict() # type: typing.Dict[str, int]
+    opcode_table = [] # type: typing.List[typing.Tuple[RemoteResource, str, str]]
+    for opcode, instruction in enumerate(sorted(instance_resources.keys())):
+        if opcode >= 2**15:
+            break # opcodes are sent as signed 16 bit integers, remaining instructions are sent as strings
+        resource = instance_resources[instruction]
+        opcodes[instruction] = opcode
+        opcode_table.append((resource, instruction.split('/')[-1] if resource.isproperty else 'invoke', instruction))
+    return opcodes, opcode_table
+
+
+def get_priorities(instance_resources : typing.Dict[str, RemoteResource], 
+                opcodes : typing.Dict[str, int]) -> typing.Dict[typing.Union[str, int], int]:
+    """
+    priority of each instruction and its opcode for the RPC server, only those other than ``Priority.NORMAL``
+    """
+    priorities = dict() # type: typing.Dict[typing.Union[str, int], int]
+    for instruction, resource in instance_resources.items():
+        if resource.priority != Priority.NORMAL:
+            priorities[instruction] = int(resource.priority)
+            if instruction in opcodes:
+                priorities[opcodes[instruction]] = int(resource.priority)
+    return priorities
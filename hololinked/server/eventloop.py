@@ -6,6 +6,7 @@ import asyncio
 import importlib
 import typing 
 import threading
+import functools
 import logging
 import tracemalloc
 from uuid import uuid4
@@ -13,13 +14,15 @@ from uuid import uuid4
 from .constants import HTTP_METHODS
 from .utils import format_exception_as_json
 from .config import global_config
-from .zmq_message_brokers import ServerTypes 
+from .zmq_message_brokers import ServerTypes, ACCEPTED, BATCH, EXIT, TIMEOUT
+from .dataklasses import ActionResource, RemoteResource
+from .executors import ResourceThreadPool, ResourceProcessPool
 from .exceptions import *
 from .thing import Thing, ThingMeta
 from .property import Property
 from .properties import ClassSelector, TypedList, List, Boolean, TypedDict
 from .action import action as remote_method
-from .logger import ListHandler
+from .logger import ListHandler, current_list_handler
 
 
 if global_config.TRACE_MALLOC:
@@ -260,66 +263,191 @@ class EventLoop(RemoteObject):
     @classmethod
     async def run_single_target(cls, instance : Thing) -> None: 
         instance_name = instance.instance_name
+        tasks = set() # type: typing.Set[asyncio.Task]
+        semaphores = dict() # type: typing.Dict[str, asyncio.Semaphore]
+        if instance._thread_pool is None:
+            instance._thread_pool = ResourceThreadPool(thread_name_prefix=instance_name)
+        if instance._process_pool is None:
+            instance._process_pool = ResourceProcessPool()
+        thread_pool = instance._thread_pool
         while True:
             instructions = await instance.message_broker.async_recv_instructions()
             for instruction in instructions:
-                client, _, client_type, _, msg_id, _, instruction_str, arguments, context = instruction
-                oneway = context.pop('oneway', False)
-                fetch_execution_logs = context.pop("fetch_execution_logs", False)
-                if fetch_execution_logs:
-                    list_handler = ListHandler([])
-                    list_handler.setLevel(logging.DEBUG)
-                    list_handler.setFormatter(instance.logger.handlers[0].formatter)
-                    instance.logger.addHandler(list_handler)
-                try:
-                    instance.logger.debug(f"client {client} of client type {client_type} issued instruction " +
-                                f"{instruction_str} with message id {msg_id}. starting execution.")
-                    return_value = await cls.execute_once(instance_name, instance, instruction_str, arguments) #type: ignore 
-                    if oneway:
-                        await instance.message_broker.async_send_reply_with_message_type(instruction, b'ONEWAY', None)
+                client, _, client_type, message_type, msg_id, _, instruction_str, arguments, context = instruction
+                if instance.message_broker.has_expired(instruction):
+                    instance.logger.debug(f"instruction {instruction_str} with message id {msg_id} timed out before execution.")
+                    await instance.message_broker.async_send_reply_with_message_type(instruction, TIMEOUT, None)
+                    continue
+                if message_type != BATCH:
+                    try:
+                        resource, _, instruction_str = cls.get_resource(instance, instruction_str)
+                    except AttributeError:
+                        resource = None # reported to the client by execute_once()
+                    if resource is not None and (thread_pool.offloads(resource) or (resource.isaction and (
+                                    resource.process_pool or (resource.iscoroutine and resource.create_task)))):
+                        # other instructions are not blocked while the action runs, the reply is sent when it finishes
+                        if (resource.isaction and resource.max_concurrency is not None and 
+                                                            instruction_str not in semaphores):
+                            semaphores[instruction_str] = asyncio.Semaphore(resource.max_concurrency)
+                        # the RPC server need not count the instruction against max_in_flight until it is answered
+                        await instance.message_broker.async_send_reply_with_message_type(instruction, ACCEPTED, None)
+                        task = asyncio.create_task(cls.execute_as_task(instance_name, instance, instruction, 
+                                                                    semaphores.get(instruction_str, None)))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
                         continue
-                    if fetch_execution_logs:
-                        return_value = {
-                            "returnValue" : return_value,
-                            "execution_logs" : list_handler.log_list
-                        }
-                    await instance.message_broker.async_send_reply(instruction, return_value)
-                    # Also catches exception in sending messages like serialization error
-                except (BreakInnerLoop, BreakAllLoops):
-                    instance.logger.info("Thing {} with instance name {} exiting event loop.".format(
-                                                            instance.__class__.__name__, instance_name))
-                    if oneway:
-                        await instance.message_broker.async_send_reply_with_message_type(instruction, b'ONEWAY', None)
-                        continue
-                    return_value = None
-                    if fetch_execution_logs:
-                        return_value = { 
-                            "returnValue" : None,
-                            "execution_logs" : list_handler.log_list
-                        }
-                    await instance.message_broker.async_send_reply(instruction, return_value)
+                if not await cls.execute_and_reply(instance_name, instance, instruction):
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    # running threaded & process pool calls are waited for without blocking other Things of the loop
+                    loop = asyncio.get_running_loop()
+                    await asyncio.gather(loop.run_in_executor(None, thread_pool.shutdown),
+                                        loop.run_in_executor(None, instance._process_pool.shutdown))
+                    # inform the RPC server that no more instructions will be executed
+                    await instance.message_broker.async_send_reply_with_message_type(instruction, EXIT, None)
                     return 
-                except Exception as ex:
-                    instance.logger.error("Thing {} with instance name {} produced error : {}.".format(
-                                                            instance.__class__.__name__, instance_name, ex))
-                    if oneway:
-                        await instance.message_broker.async_send_reply_with_message_type(instruction, b'ONEWAY', None)
-                        continue
-                    return_value = dict(exception= format_exception_as_json(ex))
-                    if fetch_execution_logs:
-                        return_value["execution_logs"] = list_handler.log_list
-                    await instance.message_broker.async_send_reply_with_message_type(instruction, 
-                                                                    b'EXCEPTION', return_value)
-                finally:
-                    if fetch_execution_logs:
-                        instance.logger.removeHandler(list_handler)
 
     @classmethod
-    async def execute_once(cls, instance_name : str, instance : Thing, instruction_str : str, 
-                           arguments : typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+    async def execute_and_reply(cls, instance_name : str, instance : Thing, instruction : typing.List[typing.Any]) -> bool:
+        """
+        execute an instruction (or a batch of instructions) and send its reply, returns False when the ``Thing`` 
+        exits the event loop.
+        """
+        client, _, client_type, message_type, msg_id, _, instruction_str, arguments, context = instruction
+        oneway = context.pop('oneway', False)
+        fetch_execution_logs = context.pop("fetch_execution_logs", False)
+        list_handler = None
+        if fetch_execution_logs:
+            list_handler = ListHandler([], only_current=True)
+            list_handler.setLevel(logging.DEBUG)
+            list_handler.setFormatter(instance.logger.handlers[0].formatter)
+            instance.logger.addHandler(list_handler)
+        # instructions executed concurrently log to the same logger, records are attributed by the context of the task
+        current_list_handler_token = current_list_handler.set(list_handler)
+        return_value = None
+        try:
+            if message_type == BATCH:
+                instance.logger.debug(f"client {client} of client type {client_type} issued a batch of " +
+                            f"{len(arguments)} instructions with message id {msg_id}. starting execution.")
+                return_value = []
+                await cls.execute_batch(instance_name, instance, arguments, return_value)
+            else:
+                instance.logger.debug(f"client {client} of client type {client_type} issued instruction " +
+                            f"{instruction_str} with message id {msg_id}. starting execution.")
+                return_value = await cls.execute_once(instance_name, instance, instruction_str, arguments) #type: ignore 
+            if oneway:
+                await instance.message_broker.async_send_reply_with_message_type(instruction, b'ONEWAY', None)
+                return True
+            if fetch_execution_logs:
+                return_value = {
+                    "returnValue" : return_value,
+                    "execution_logs" : list_handler.log_list
+                }
+            await instance.message_broker.async_send_reply(instruction, return_value)
+            # Also catches exception in sending messages like serialization error
+        except (BreakInnerLoop, BreakAllLoops):
+            instance.logger.info("Thing {} with instance name {} exiting event loop.".format(
+                                                    instance.__class__.__name__, instance_name))
+            if oneway:
+                await instance.message_broker.async_send_reply_with_message_type(instruction, b'ONEWAY', None)
+                return False
+            # return value is None unless a batch was interrupted, then the results of the items executed so far
+            if fetch_execution_logs:
+                return_value = { 
+                    "returnValue" : return_value,
+                    "execution_logs" : list_handler.log_list
+                }
+            await instance.message_broker.async_send_reply(instruction, return_value)
+            return False
+        except Exception as ex:
+            instance.logger.error("Thing {} with instance name {} produced error : {}.".format(
+                                                    instance.__class__.__name__, instance_name, ex))
+            if oneway:
+                await instance.message_broker.async_send_reply_with_message_type(instruction, b'ONEWAY', None)
+                return True
+            return_value = dict(exception= format_exception_as_json(ex))
+            if fetch_execution_logs:
+                return_value["execution_logs"] = list_handler.log_list
+            await instance.message_broker.async_send_reply_with_message_type(instruction, 
+                                                            b'EXCEPTION', return_value)
+        finally:
+            current_list_handler.reset(current_list_handler_token)
+            if fetch_execution_logs:
+                instance.logger.removeHandler(list_handler)
+        return True
+    
+    @classmethod
+    async def execute_as_task(cls, instance_name : str, instance : Thing, instruction : typing.List[typing.Any],
+                            semaphore : typing.Optional[asyncio.Semaphore] = None) -> None:
+        """
+        execute an async action flagged with ``create_task=True`` (or a ``threaded`` action or property in the 
+        thread pool, or a ``process_pool`` action) concurrently to other instructions, waiting for ``semaphore`` first when the action limits its 
+        number of concurrent executions. If cancelled because the ``Thing`` exits, an exception is replied.  
+        """
+        instruction_str, context = instruction[6], instruction[8]
+        oneway = context.get('oneway', False) # popped by execute_and_reply()
+        try:
+            if semaphore is None:
+                exits = not await cls.execute_and_reply(instance_name, instance, instruction)
+            else:
+                async with semaphore:
+                    exits = not await cls.execute_and_reply(instance_name, instance, instruction)
+            if exits:
+                instance.logger.warning(f"action {instruction_str} executed as a task cannot exit the event loop " +
+                                        f"of Thing {instance_name}, call exit() directly.")
+        except asyncio.CancelledError as ex:
+            if oneway:
+                await instance.message_broker.async_send_reply_with_message_type(instruction, b'ONEWAY', None)
+            else:
+                await instance.message_broker.async_send_reply_with_message_type(instruction, b'EXCEPTION', 
+                                            dict(exception=format_exception_as_json(ex)))
+
+    @classmethod
+    async def execute_batch(cls, instance_name : str, instance : Thing, 
+                            items : typing.List[typing.Tuple[typing.Union[str, int], typing.Dict[str, typing.Any]]],
+                            results : typing.List[typing.Dict[str, typing.Any]]) -> None:
+        """
+        execute the (instruction, arguments) pairs of a batch in order. The result of each item, 
+        ``{"returnValue" : value}`` or ``{"exception" : exception}``, is appended to ``results``, an exception in 
+        one item does not stop the execution of the remaining items. Exiting the event loop stops the batch 
+        (remaining items are not executed) after appending the result of the item that exited.
+        """
+        if not isinstance(items, (list, tuple)):
+            raise TypeError(f"a batch must be a list of (instruction, arguments) pairs, given type {type(items)}")
+        for instruction_str, arguments in items:
+            try:
+                results.append(dict(returnValue=await cls.execute_once(instance_name, instance, instruction_str, 
+                                                                    arguments)))
+            except (BreakInnerLoop, BreakAllLoops):
+                results.append(dict(returnValue=None))
+                raise 
+            except Exception as ex:
+                instance.logger.error(f"Thing {instance.__class__.__name__} with instance name {instance_name} " +
+                                    f"produced error in batch : {ex}.")
+                results.append(dict(exception=format_exception_as_json(ex)))
+
+    @classmethod
+    def get_resource(cls, instance : Thing, instruction_str : typing.Union[str, int]) -> typing.Tuple[
+                                            typing.Union[ActionResource, RemoteResource], typing.Optional[str], str]:
+        """
+        resource of an instruction or its opcode, the operation (read, write or delete for properties, only 
+        known for opcodes) and the instruction string. Raises AttributeError for unknown instructions.
+        """
+        if isinstance(instruction_str, int):
+            # opcode sent by client instead of the instruction string, see Thing.opcodes
+            if instruction_str >= len(instance._opcode_table) or instruction_str < 0:
+                raise AttributeError(f"unknown remote resource represented by opcode {instruction_str}")
+            return instance._opcode_table[instruction_str]
         resource = instance.instance_resources.get(instruction_str, None) 
         if resource is None:
             raise AttributeError(f"unknown remote resource represented by instruction {instruction_str}")
+        return resource, None, instruction_str
+
+    @classmethod
+    async def execute_once(cls, instance_name : str, instance : Thing, instruction_str : typing.Union[str, int], 
+                           arguments : typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+        resource, operation, instruction_str = cls.get_resource(instance, instruction_str)
         if resource.isaction:      
             if resource.state is None or (hasattr(instance, 'state_machine') and 
                             instance.state_machine.current_state in resource.state):
@@ -330,41 +458,50 @@ class EventLoop(RemoteObject):
                     resource.schema_validator.validate(arguments)
                 
                 func = resource.obj
+                if resource.isparameterized:
+                    if len(args) > 0:
+                        raise RuntimeError("parameterized functions cannot have positional arguments")
+                    args = (resource.bound_obj,)
+                if resource.process_pool:
+                    call = functools.partial(instance._process_pool.execute, func, *args, **arguments)
+                    if resource.lock is not None:
+                        return await instance._thread_pool.execute(resource, call)
+                    return await call()
+                if instance._thread_pool is not None and instance._thread_pool.handles(resource):
+                    return await instance._thread_pool.execute(resource, functools.partial(func, *args, **arguments))
                 if resource.iscoroutine:
-                    if resource.isparameterized:
-                        if len(args) > 0:
-                            raise RuntimeError("parameterized functions cannot have positional arguments")
-                        return await func(resource.bound_obj, *args, **arguments)
                     return await func(*args, **arguments) # arguments then become kwargs
-                else:
-                    if resource.isparameterized:
-                        if len(args) > 0:
-                            raise RuntimeError("parameterized functions cannot have positional arguments")
-                        return func(resource.bound_obj, *args, **arguments)
-                    return func(*args, **arguments) # arguments then become kwargs
+                return func(*args, **arguments) # arguments then become kwargs
             else: 
                 raise StateMachineError("Thing '{}' is in '{}' state, however command can be executed only in '{}' state".format(
                         instance_name, instance.state, resource.state))
         
         elif resource.isproperty:
-            action = instruction_str.split('/')[-1]
+            action = operation or instruction_str.split('/')[-1]
             prop = resource.obj # type: Property
             owner_inst = resource.bound_obj # type: Thing
             if action == "write": 
                 if resource.state is None or (hasattr(instance, 'state_machine') and  
                                         instance.state_machine.current_state in resource.state):
                     if isinstance(arguments, dict) and len(arguments) == 1 and 'value' in arguments:
-                        return prop.__set__(owner_inst, arguments['value'])
-                    return prop.__set__(owner_inst, arguments)
+                        access = functools.partial(prop.__set__, owner_inst, arguments['value'])
+                    else:
+                        access = functools.partial(prop.__set__, owner_inst, arguments)
                 else: 
                     raise StateMachineError("Thing {} is in `{}` state, however attribute can be written only in `{}` state".format(
                         instance_name, instance.state_machine.current_state, resource.state))
             elif action == "read":
-                return prop.__get__(owner_inst, type(owner_inst))             
+                access = functools.partial(prop.__get__, owner_inst, type(owner_inst))             
             elif action == "delete":
-                if prop.fdel is not None:
-                    return prop.fdel() # this may not be correct yet
-                raise NotImplementedError("This property does not support deletion")
+                if prop.fdel is None:
+                    raise NotImplementedError("This property does not support deletion")
+                access = prop.fdel # this may not be correct yet
+            else:
+                raise NotImplementedError("Unimplemented execution path for Thing {} for instruction {}".format(
+                                                                                        instance_name, instruction_str))
+            if instance._thread_pool is not None and instance._thread_pool.handles(resource):
+                return await instance._thread_pool.execute(resource, access)
+            return access()
         raise NotImplementedError("Unimplemented execution path for Thing {} for instruction {}".format(instance_name, instruction_str))
 
 
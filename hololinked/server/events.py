@@ -108,7 +108,7 @@ class EventDispatcher:
         else:
             raise AttributeError("cannot reassign publisher attribute of event {}".format(self.name)) 
 
-    def push(self, data : typing.Any = None, *, serialize : bool = True, **kwargs) -> None:
+    def push(self, data : typing.Any = None, *, serialize : bool = True, **kwargs) -> typing.Optional["zmq.MessageTracker"]:
         """
         publish the event. 
 
@@ -117,7 +117,8 @@ class EventDispatcher:
         data: Any
             payload of the event
         serialize: bool, default True
-            serialize the payload before pushing, set to False when supplying raw bytes
+            serialize the payload before pushing, set to False when supplying raw bytes or any object supporting
+            the buffer protocol (for example, a numpy array of a camera frame), which are sent without copying when large.
         **kwargs:
             zmq_clients: bool, default True
                 pushes event to RPC clients, irrelevant if ``Thing`` uses only one type of serializer (refer to 
@@ -125,9 +126,13 @@ class EventDispatcher:
             http_clients: bool, default True
                 pushed event to HTTP clients, irrelevant if ``Thing`` uses only one type of serializer (refer to 
                 difference between zmq_serializer and http_serializer).
+            track: bool, default False
+                return a ``zmq.MessageTracker`` if the payload was not copied, the buffer of the payload must not be 
+                modified until the tracker is done. 
         """
-        self.publisher.publish(self._unique_identifier, data, zmq_clients=kwargs.get('zmq_clients', True), 
-                                    http_clients=kwargs.get('http_clients', True), serialize=serialize)
+        return self.publisher.publish(self._unique_identifier, data, zmq_clients=kwargs.get('zmq_clients', True), 
+                                    http_clients=kwargs.get('http_clients', True), serialize=serialize, 
+                                    track=kwargs.get('track', False))
 
 
 
@@ -16,6 +16,19 @@ class StateMachineError(Exception):
     """
     pass 
 
+class ServerBusyError(Exception):
+    """
+    raised on the client when the server rejected an instruction as its queue is full 
+    """
+    pass 
+
+class OpcodeMismatchError(Exception):
+    """
+    raised on the client when the server rejected an instruction sent with opcodes of another opcode table, 
+    for example of the ``Thing`` before it was restarted with other resources. The instruction was not executed.
+    """
+    pass 
+
 class DatabaseError(Exception):
     """
     raise to show database related errors
@@ -23,4 +36,4 @@ class DatabaseError(Exception):
 
 
 
-__all__ = ['BreakInnerLoop', 'BreakAllLoops', 'StateMachineError']
\ No newline at end of file
+__all__ = ['BreakInnerLoop', 'BreakAllLoops', 'StateMachineError', 'ServerBusyError', 'OpcodeMismatchError']
\ No newline at end of file
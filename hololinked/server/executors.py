@@ -0,0 +1,321 @@
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+import typing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+try:
+    import numpy 
+except ImportError:
+    pass 
+
+from .dataklasses import RemoteResource
+
+
+
+class ResourceThreadPool:
+    """
+    Bounded pool of threads executing the synchronous actions and property accessors of a ``Thing`` which are
+    marked ``threaded``, so that a blocking call (for example, a slow hardware read) does not stall the event loop
+    executing the ``Thing``. Also holds the locks named by the ``lock`` of resources, resources sharing a lock
+    are never executed concurrently. Threads are created on first use.
+
+    Parameters
+    ----------
+    max_workers: int, default 4
+        maximum number of threads, further calls wait for a free thread
+    thread_name_prefix: str, default ''
+        prefix of the names of the threads
+    """
+
+    def __init__(self, max_workers : int = 4, thread_name_prefix : str = '') -> None:
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError(f"max_workers must be an integer greater than 0, given value : {max_workers}")
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._executor = None # type: typing.Optional[ThreadPoolExecutor]
+        self._locks = dict() # type: typing.Dict[str, asyncio.Lock]
+        self._counter_lock = threading.Lock() # counters are also updated by the threads
+        self._active = 0
+        self._queued = 0
+        self._peak_active = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._saturated = 0
+
+    def handles(self, resource : RemoteResource) -> bool:
+        """
+        True if the resource is executed in a thread or holds a lock
+        """
+        return resource.threaded or resource.lock is not None
+
+    def offloads(self, resource : RemoteResource) -> bool:
+        """
+        True if the resource is executed in a thread, async actions are never executed in a thread
+        """
+        return resource.threaded and not (resource.isaction and resource.iscoroutine)
+
+    async def execute(self, resource : RemoteResource, call : typing.Callable[[], typing.Any]) -> typing.Any:
+        """
+        execute a call of the resource, in a thread if ``threaded`` and holding its lock if any. The call
+        is awaited if it returns a coroutine.
+        """
+        if resource.lock is None:
+            return await self._execute(resource, call)
+        lock = self._locks.get(resource.lock, None)
+        if lock is None:
+            lock = self._locks[resource.lock] = asyncio.Lock()
+        async with lock:
+            return await self._execute(resource, call)
+
+    async def _execute(self, resource : RemoteResource, call : typing.Callable[[], typing.Any]) -> typing.Any:
+        if self.offloads(resource):
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=self.thread_name_prefix)
+            with self._counter_lock:
+                if self._active + self._queued >= self.max_workers:
+                    self._saturated += 1
+                self._queued += 1
+                if self._queued > self._peak_queued:
+                    self._peak_queued = self._queued
+            # context variables of the task are visible in the thread, like for the logs of the call
+            future = self._executor.submit(contextvars.copy_context().run, self._run, call)
+            future.add_done_callback(self._dequeue_if_cancelled)
+            return await asyncio.wrap_future(future)
+        ret = call()
+        if asyncio.iscoroutine(ret):
+            return await ret
+        return ret
+
+    def _dequeue_if_cancelled(self, future : Future) -> None:
+        # only calls not yet started by a thread can be cancelled, they are still counted as queued
+        if future.cancelled():
+            with self._counter_lock:
+                self._queued -= 1
+
+    def _run(self, call : typing.Callable[[], typing.Any]) -> typing.Any:
+        with self._counter_lock:
+            self._queued -= 1
+            self._active += 1
+            if self._active > self._peak_active:
+                self._peak_active = self._active
+        try:
+            return call()
+        finally:
+            with self._counter_lock:
+                self._active -= 1
+                self._completed += 1
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        number of busy threads and of calls waiting for a thread, their peaks, the number of completed calls and
+        the number of calls which found all threads busy (saturated)
+        """
+        with self._counter_lock:
+            return dict(
+                max_workers=self.max_workers,
+                active=self._active,
+                queued=self._queued,
+                peak_active=self._peak_active,
+                peak_queued=self._peak_queued,
+                completed=self._completed,
+                saturated=self._saturated
+            )
+
+    def shutdown(self) -> None:
+        """
+        wait for the running calls to complete and stop the threads, calls not yet started are cancelled. 
+        Blocks until then, therefore not to be called in the thread of a running event loop.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+
+class SharedArray(typing.NamedTuple):
+    """
+    reference to a numpy array copied into shared memory by a process pool worker
+    """
+    name : str
+    shape : typing.Tuple[int, ...]
+    dtype : str
+
+
+def _share_arrays(value : typing.Any, threshold : int) -> typing.Any:
+    """
+    replace numpy arrays of at least ``threshold`` bytes (also within lists, tuples & dicts) by their copy in 
+    shared memory. Called in the worker process. If an array cannot be shared, the shared memory created for the 
+    arrays of the value so far is released before raising.
+    """
+    names = [] # type: typing.List[str]
+    try:
+        return _share_arrays_in(value, threshold, names)
+    except BaseException:
+        _unlink_shared_memory(names)
+        raise
+
+
+def _share_arrays_in(value : typing.Any, threshold : int, names : typing.List[str]) -> typing.Any:
+    # names of the created shared memory are appended to names
+    if 'numpy' in globals() and isinstance(value, numpy.ndarray):
+        if value.nbytes < threshold or value.dtype.hasobject:
+            return value
+        shm = SharedMemory(create=True, size=value.nbytes)
+        names.append(shm.name)
+        try:
+            numpy.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+            return SharedArray(shm.name, value.shape, value.dtype.str)
+        finally:
+            shm.close() # unlinked by the owner process after reading, see ResourceProcessPool
+    if type(value) in (list, tuple):
+        return type(value)(_share_arrays_in(item, threshold, names) for item in value)
+    if type(value) is dict:
+        return {key : _share_arrays_in(item, threshold, names) for key, item in value.items()}
+    return value
+
+
+def _restore_arrays(value : typing.Any) -> typing.Any:
+    """
+    replace references to shared memory by numpy arrays & release the shared memory. Called in the owner process.
+    """
+    if isinstance(value, SharedArray):
+        shm = SharedMemory(name=value.name)
+        try:
+            return numpy.ndarray(value.shape, dtype=numpy.dtype(value.dtype), buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+    if type(value) in (list, tuple):
+        return type(value)(_restore_arrays(item) for item in value)
+    if type(value) is dict:
+        return {key : _restore_arrays(item) for key, item in value.items()}
+    return value
+
+
+def _shared_memory_names(value : typing.Any) -> typing.List[str]:
+    """
+    names of the shared memory referenced within a return value of a worker
+    """
+    if isinstance(value, SharedArray):
+        return [value.name]
+    if type(value) in (list, tuple):
+        return [name for item in value for name in _shared_memory_names(item)]
+    if type(value) is dict:
+        return [name for item in value.values() for name in _shared_memory_names(item)]
+    return []
+
+
+def _unlink_shared_memory(names : typing.List[str]) -> None:
+    """
+    release shared memory of return values which are never restored
+    """
+    for name in names:
+        try:
+            shm = SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+
+
+def _execute_in_worker(func : typing.Callable, args : typing.Tuple, kwargs : typing.Dict[str, typing.Any], 
+                    threshold : int) -> typing.Any:
+    return _share_arrays(func(*args, **kwargs), threshold)
+
+
+
+class ResourceProcessPool:
+    """
+    Pool of processes executing the CPU bound actions of a ``Thing`` marked ``process_pool``, so that they do not 
+    hold the GIL of the process running the RPC & HTTP servers. Only classmethods can be executed, as the ``Thing`` 
+    instance cannot be sent to another process; arguments and return values must be picklable. Large numpy arrays 
+    in the return value are copied through shared memory instead of being pickled through a pipe, the shared memory
+    is released once the arrays are restored, or when the caller stopped waiting (for example, the call was cancelled)
+    or the pool shuts down. Processes are started (with the 'spawn' method) on first use.
+
+    Parameters
+    ----------
+    max_workers: int, default None
+        maximum number of processes, defaults to the number of CPUs
+    shared_memory_threshold: int, default 65536
+        size in bytes above which numpy arrays are returned through shared memory
+    """
+
+    def __init__(self, max_workers : typing.Optional[int] = None, shared_memory_threshold : int = 65536) -> None:
+        if max_workers is not None and (not isinstance(max_workers, int) or max_workers < 1):
+            raise ValueError(f"max_workers must be None or an integer greater than 0, given value : {max_workers}")
+        self.max_workers = max_workers
+        self.shared_memory_threshold = shared_memory_threshold
+        self._executor = None # type: typing.Optional[ProcessPoolExecutor]
+        self._shared_memory = dict() # type: typing.Dict[Future, typing.List[str]] # of results not yet restored
+        self._abandoned = set() # type: typing.Set[Future] # calls not done whose result is not awaited anymore
+        self._shared_memory_lock = threading.Lock() # futures are done in a thread of the executor
+
+    async def execute(self, func : typing.Callable, /, *args, **kwargs) -> typing.Any:
+        """
+        execute a classmethod in a worker process and return its return value
+        """
+        if not isinstance(getattr(func, '__self__', None), type):
+            raise TypeError(f"only classmethods can be executed in a process pool, given {func}")
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, 
+                                                mp_context=multiprocessing.get_context('spawn'))
+        future = self._executor.submit(_execute_in_worker, func, args, kwargs, self.shared_memory_threshold)
+        future.add_done_callback(self._track_shared_memory)
+        try:
+            value = await asyncio.wrap_future(future)
+        except BaseException:
+            self._abandon(future)
+            raise
+        with self._shared_memory_lock:
+            self._shared_memory.pop(future, None)
+        return _restore_arrays(value)
+
+    def _track_shared_memory(self, future : Future) -> None:
+        # runs before the result is passed to the awaiting task, as it is the first callback
+        if future.cancelled() or future.exception() is not None:
+            names = []
+        else:
+            names = _shared_memory_names(future.result())
+        with self._shared_memory_lock:
+            if future not in self._abandoned:
+                self._shared_memory[future] = names
+                return 
+            self._abandoned.discard(future)
+        _unlink_shared_memory(names)
+
+    def _abandon(self, future : Future) -> None:
+        # worker processes cannot be interrupted, a running call completes and its result is dropped
+        with self._shared_memory_lock:
+            if future not in self._shared_memory:
+                self._abandoned.add(future) # callback yet to run
+                return 
+            names = self._shared_memory.pop(future)
+        _unlink_shared_memory(names)
+
+    def shutdown(self) -> None:
+        """
+        wait for the running calls to complete and stop the processes, calls not yet started are cancelled. 
+        Shared memory of results not restored is released. Blocks until then, therefore not to be called in the 
+        thread of a running event loop.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        with self._shared_memory_lock:
+            names = [name for names in self._shared_memory.values() for name in names]
+            self._shared_memory.clear()
+            self._abandoned.clear()
+        _unlink_shared_memory(names)
+
+
+
+__all__ = [
+    ResourceThreadPool.__name__,
+    ResourceProcessPool.__name__
+]
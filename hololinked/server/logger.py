@@ -3,6 +3,7 @@ import typing
 import datetime
 import threading
 import asyncio
+import contextvars
 import time 
 from collections import deque
 
@@ -15,15 +16,24 @@ from .action import action as remote_method
 
 
 
+# ListHandler collecting the logs of the instruction executed by the current task (or thread of the thread pool)
+current_list_handler = contextvars.ContextVar('current_list_handler', default=None) 
+
+
 class ListHandler(logging.Handler):
     """
     Log history handler. Add and remove this handler to hold a bunch of specific logs. Currently used by execution context
     within ``EventLoop`` where one can fetch the execution logs while an action is being executed. 
+    With ``only_current``, only records logged while the handler is set in ``current_list_handler`` are kept, so that 
+    logs of other instructions executed concurrently (in tasks or threads) are left out. Records of threads started
+    by the action itself are left out as well.
     """
 
-    def __init__(self, log_list : typing.Optional[typing.List] = None):
+    def __init__(self, log_list : typing.Optional[typing.List] = None, only_current : bool = False):
         super().__init__()
         self.log_list : typing.List[typing.Dict] = [] if not log_list else log_list
+        if only_current:
+            self.addFilter(lambda record: current_list_handler.get() is self)
     
     def emit(self, record : logging.LogRecord):
         log_entry = self.format(record)
@@ -6,7 +6,7 @@ from enum import Enum
 from ..param.parameterized import Parameter, ClassParameters, Parameterized, ParameterizedMetaclass
 from .utils import issubklass, pep8_to_URL_path
 from .dataklasses import RemoteResourceInfoValidator
-from .constants import USE_OBJECT_NAME, HTTP_METHODS
+from .constants import USE_OBJECT_NAME, HTTP_METHODS, Priority
 from .events import Event, EventDispatcher
 from .schema_validators import JsonSchemaValidator
 
@@ -109,6 +109,16 @@ class Property(Parameter):
         a numeric value, usually in the range 0.0 to 1.0, which allows the order of Properties in a class to be defined in
         a listing or e.g. in GUI menus. A negative precedence indicates a property that should be hidden in such listings.
 
+    priority: int, default Priority.NORMAL
+        priority of reads & writes in the queue of the RPC server, higher priorities are served first.
+
+    threaded: bool, default False
+        execute reads & writes in the thread pool of the ``Thing``, useful when ``fget`` or ``fset`` block, 
+        for example, on hardware access. 
+
+    lock: str, default None
+        name of a lock held during reads & writes, actions & properties sharing a lock are never executed concurrently. 
+
     """
 
     __slots__ = ['db_persist', 'db_init', 'db_commit', 'metadata', 'model', 'validator', '_remote_info', 
@@ -150,7 +160,8 @@ class Property(Parameter):
                 fset : typing.Optional[typing.Callable] = None, fdel : typing.Optional[typing.Callable] = None, 
                 fcomparator : typing.Optional[typing.Callable] = None, 
                 deepcopy_default : bool = False, per_instance_descriptor : bool = False, 
-                precedence : typing.Optional[float] = None, metadata : typing.Optional[typing.Dict] = None
+                precedence : typing.Optional[float] = None, metadata : typing.Optional[typing.Dict] = None,
+                priority : int = Priority.NORMAL, threaded : bool = False, lock : typing.Optional[str] = None
             ) -> None:
         ...
  
@@ -166,7 +177,8 @@ class Property(Parameter):
                 fget : typing.Optional[typing.Callable] = None, fset : typing.Optional[typing.Callable] = None, 
                 fdel : typing.Optional[typing.Callable] = None, fcomparator : typing.Optional[typing.Callable] = None,  
                 deepcopy_default : bool = False, per_instance_descriptor : bool = False, remote : bool = True, 
-                precedence : typing.Optional[float] = None, metadata : typing.Optional[typing.Dict] = None
+                precedence : typing.Optional[float] = None, metadata : typing.Optional[typing.Dict] = None,
+                priority : int = Priority.NORMAL, threaded : bool = False, lock : typing.Optional[str] = None
             ) -> None:
         super().__init__(default=default, doc=doc, constant=constant, readonly=readonly, allow_None=allow_None,
                     label=label, per_instance_descriptor=per_instance_descriptor, deepcopy_default=deepcopy_default,
@@ -184,7 +196,10 @@ class Property(Parameter):
                 http_method=http_method,
                 URL_path=URL_path,
                 state=state,
-                isproperty=True
+                isproperty=True,
+                priority=priority,
+                threaded=threaded,
+                lock=lock
             )
         self.model = None
         self.validator = None
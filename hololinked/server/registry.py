@@ -0,0 +1,188 @@
+import os
+import socket
+import time
+import typing
+from urllib.parse import quote
+
+from .config import global_config
+from .serializers import PythonBuiltinJSONSerializer
+
+
+_serializer = PythonBuiltinJSONSerializer()
+
+
+class ThingRegistry:
+    """
+    Registry of the ``Thing`` (s) served on this host, recording the socket addresses (endpoints) of each instance
+    name, so that clients find TCP sockets bound to ports assigned by the operating system without searching for them.
+    ``RPCServer`` registers its sockets once bound and deregisters them when it stops polling.
+
+    The registry is a directory of one JSON file per instance name, written atomically, so that it needs
+    no server process and any process of the host can read it. Entries of processes which exited without
+    deregistering are dropped when looked up, an entry registered again meanwhile is kept.
+
+    An entry is removed only if it is still the entry which was read (same pid and registration time), it is then
+    moved aside atomically and put back should it have been replaced just before the move. Only in this case, a 
+    registration racing the removal, a lookup in between may not find the new entry, retry the lookup if an 
+    instance name is expected to be registered.
+
+    Parameters
+    ----------
+    directory: str, optional
+        directory of the registry, default "registry" under TEMP_DIR of global configuration
+    """
+
+    def __init__(self, directory : typing.Optional[str] = None) -> None:
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        """directory of the registry, created when absent"""
+        directory = self._directory or f"{global_config.TEMP_DIR}{os.sep}registry"
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _path(self, instance_name : str) -> str:
+        return f"{self.directory}{os.sep}{quote(instance_name, safe='')}.json"
+
+    def register(self, instance_name : str, endpoints : typing.Dict[str, str],
+                events : typing.Optional[str] = None) -> None:
+        """
+        record the endpoints of an instance name, replacing any previous entry
+
+        Parameters
+        ----------
+        instance_name: str
+            instance name of the ``Thing``
+        endpoints: Dict[str, str]
+            socket address per protocol, like {"TCP": "tcp://0.0.0.0:41234", "IPC": "ipc:///tmp/..."}
+        events: str, optional
+            socket address of the event publisher
+        """
+        entry = dict(
+            instance_name=instance_name,
+            endpoints=endpoints,
+            events=events,
+            pid=os.getpid(),
+            hostname=socket.gethostname(),
+            registered_at=time.time()
+        )
+        path = self._path(instance_name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as file:
+            _serializer.dump(entry, file)
+        os.replace(temp_path, path) # readers never see a partially written entry
+
+    def deregister(self, instance_name : str) -> None:
+        """
+        remove the entry of an instance name if registered by this process
+        """
+        entry = self._read(instance_name)
+        if entry is not None and entry.get('pid', None) == os.getpid():
+            self._remove(instance_name, entry)
+
+    def lookup(self, instance_name : str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """
+        entry of an instance name, None if not registered or if the registering process exited
+        """
+        entry = self._read(instance_name)
+        if entry is None:
+            return None
+        if not _is_alive(entry.get('pid', None)):
+            self._remove(instance_name, entry)
+            return None
+        return entry
+
+    def resolve(self, instance_name : str, protocol : str = 'TCP') -> typing.Optional[str]:
+        """
+        socket address to connect to the ``Thing`` with given protocol, None if unknown. Sockets bound to all
+        interfaces are connected through localhost.
+        """
+        entry = self.lookup(instance_name)
+        if entry is None:
+            return None
+        socket_address = entry['endpoints'].get(str(protocol).upper(), None)
+        if socket_address is not None and socket_address.startswith('tcp://'):
+            socket_address = socket_address.replace('0.0.0.0', 'localhost').replace('*', 'localhost')
+        return socket_address
+
+    def list(self) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        entries of all instance names registered by running processes
+        """
+        entries = dict()
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(f"{self.directory}{os.sep}{file_name}", 'r') as file:
+                    instance_name = _serializer.load(file)['instance_name']
+            except (FileNotFoundError, ValueError, KeyError):
+                continue # removed or replaced meanwhile
+            entry = self.lookup(instance_name)
+            if entry is not None:
+                entries[instance_name] = entry
+        return entries
+
+    def _read(self, instance_name : str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        try:
+            with open(self._path(instance_name), 'r') as file:
+                return _serializer.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _remove(self, instance_name : str, entry : typing.Dict[str, typing.Any]) -> None:
+        # the entry may have been replaced by a new registration since it was read, which is left in place. 
+        # Otherwise the entry is moved aside atomically and put back if replaced between the comparison & the move
+        if not _is_same_entry(self._read(instance_name), entry):
+            return
+        path = self._path(instance_name)
+        removed_path = f"{path}.{os.getpid()}.removed"
+        try:
+            os.replace(path, removed_path)
+        except FileNotFoundError:
+            return 
+        try:
+            with open(removed_path, 'r') as file:
+                removed = _serializer.load(file)
+        except ValueError:
+            removed = None
+        try:
+            if removed is not None and not _is_same_entry(removed, entry):
+                try:
+                    os.link(removed_path, path) # does not overwrite an entry registered meanwhile
+                except FileExistsError:
+                    pass
+        finally:
+            os.remove(removed_path)
+
+
+
+def _is_same_entry(entry : typing.Optional[typing.Dict[str, typing.Any]], 
+                other : typing.Dict[str, typing.Any]) -> bool:
+    return entry is not None and (entry.get('pid', None) == other.get('pid', None) and 
+                                entry.get('registered_at', None) == other.get('registered_at', None))
+
+
+def _is_alive(pid : typing.Optional[int]) -> bool:
+    if not isinstance(pid, int):
+        return False
+    if os.name == 'nt':
+        return True # os.kill() terminates the process on Windows, entries are removed at exit only
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # process of another user
+    return True
+
+
+thing_registry = ThingRegistry()
+
+
+__all__ = [
+    ThingRegistry.__name__,
+    'thing_registry'
+]
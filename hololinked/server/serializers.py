@@ -46,6 +46,61 @@ from .utils import format_exception_as_json
 
 
 
+ARRAY_PLACEHOLDER = '__ndarray__'
+
+def _array_frames(arrays : typing.List["numpy.ndarray"]) -> typing.List[typing.Any]:
+    """
+    a header (JSON with dtype, shape & strides) and a raw buffer frame for each array. Contiguous arrays 
+    (C or Fortran order) are sent from their own buffer, others are copied to a contiguous one first.
+    """
+    frames = []
+    for array in arrays:
+        if not (array.flags.c_contiguous or array.flags.f_contiguous):
+            array = numpy.ascontiguousarray(array)
+        frames.append(msgspecjson.encode(dict(dtype=array.dtype.str, shape=array.shape, strides=array.strides)))
+        frames.append(array)
+    return frames
+
+
+def _restore_arrays(value : typing.Any, frames : typing.Sequence[typing.Any]) -> typing.Any:
+    """
+    replace the placeholders ``{"__ndarray__": index}`` by the arrays reconstructed from the header and buffer 
+    frames, which share the memory of the frames
+    """
+    arrays = []
+    for index in range(0, len(frames), 2):
+        header = msgspecjson.decode(frames[index])
+        arrays.append(numpy.ndarray(tuple(header['shape']), dtype=numpy.dtype(header['dtype']), 
+                                    buffer=frames[index + 1], strides=tuple(header['strides'])))
+    return _replace_placeholders(value, arrays)
+
+
+def _replace_placeholders(value : typing.Any, arrays : typing.List["numpy.ndarray"]) -> typing.Any:
+    if type(value) is dict:
+        if len(value) == 1 and ARRAY_PLACEHOLDER in value:
+            return arrays[value[ARRAY_PLACEHOLDER]]
+        return {key : _replace_placeholders(item, arrays) for key, item in value.items()}
+    if type(value) is list:
+        return [_replace_placeholders(item, arrays) for item in value]
+    return value
+
+
+def _array_capturing_hook(arrays : typing.List["numpy.ndarray"], 
+                        default : typing.Optional[typing.Callable] = None) -> typing.Callable:
+    """
+    msgspec ``enc_hook`` replacing numpy arrays by placeholders & collecting them in ``arrays``
+    """
+    def enc_hook(obj):
+        if 'numpy' in globals() and isinstance(obj, numpy.ndarray) and not obj.dtype.hasobject:
+            arrays.append(obj)
+            return {ARRAY_PLACEHOLDER : len(arrays) - 1}
+        if default is None:
+            raise TypeError(f"Given type cannot be serialized : {type(obj)}")
+        return default(obj)
+    return enc_hook
+
+
+
 class BaseSerializer(object):
     """
     Base class for (de)serializer implementations. All serializers must inherit this class 
@@ -67,14 +122,34 @@ class BaseSerializer(object):
         "method called by ZMQ message brokers to serialize data"
         raise NotImplementedError("implement in subclass")
     
+    def dumps_out_of_band(self, data) -> typing.Tuple[bytes, typing.List[typing.Any]]:
+        """
+        serialize data, numpy arrays within the data are returned as separate frames (objects supporting the 
+        buffer protocol) to be sent after the serialized data instead of being serialized, when the serializer 
+        supports it. Reconstruct with ``loads_out_of_band()``.
+        """
+        return self.dumps(data), []
+    
+    def loads_out_of_band(self, data, frames : typing.Sequence[typing.Any]) -> typing.Any:
+        """
+        deserialize data serialized with ``dumps_out_of_band()``, numpy arrays share the memory of the frames.
+        """
+        return self.loads(data)
+
     def convert_to_bytes(self, data) -> bytes:
+        """
+        copy any object supporting the buffer protocol to bytes, for deserializers which accept only bytes. 
+        Deserializers which accept buffers directly (msgspec, pickle) skip this copy.
+        """
         if isinstance(data, bytes):
             return data
         if isinstance(data, bytearray):
             return bytes(data)
-        if isinstance(data, memoryview):
-            return data.tobytes()
-        raise TypeError("serializer convert_to_bytes accepts only bytes, bytearray or memoryview")
+        try:
+            return memoryview(data).tobytes()
+        except TypeError:
+            raise TypeError("serializer convert_to_bytes accepts only bytes or objects supporting the buffer protocol, " +
+                            f"given type {type(data)}") from None
     
 
 dict_keys = type(dict().keys())
@@ -90,11 +165,22 @@ class JSONSerializer(BaseSerializer):
 
     def loads(self, data : typing.Union[bytearray, memoryview, bytes]) -> JSONSerializable:
         "method called by ZMQ message brokers to deserialize data"
-        return msgspecjson.decode(self.convert_to_bytes(data))
+        return msgspecjson.decode(data) # accepts any buffer, no copy
     
     def dumps(self, data) -> bytes:
         "method called by ZMQ message brokers to serialize data"
         return msgspecjson.encode(data, enc_hook=self.default)
+    
+    def dumps_out_of_band(self, data) -> typing.Tuple[bytes, typing.List[typing.Any]]:
+        "numpy arrays are replaced by ``{\"__ndarray__\": index}`` & sent as a header and a raw buffer frame each"
+        arrays = []
+        data = msgspecjson.encode(data, enc_hook=_array_capturing_hook(arrays, self.default))
+        return data, _array_frames(arrays)
+    
+    def loads_out_of_band(self, data, frames : typing.Sequence[typing.Any]) -> typing.Any:
+        if len(frames) == 0:
+            return self.loads(data)
+        return _restore_arrays(self.loads(data), frames)
       
     @classmethod
     def default(cls, obj) -> JSONSerializable:
@@ -153,6 +239,10 @@ class PythonBuiltinJSONSerializer(JSONSerializer):
         "method called by ZMQ message brokers to serialize data"
         data = pythonjson.dumps(data, ensure_ascii=False, allow_nan=True, default=self.default)
         return data.encode("utf-8")
+    
+    # numpy arrays are converted to lists
+    dumps_out_of_band = BaseSerializer.dumps_out_of_band
+    loads_out_of_band = BaseSerializer.loads_out_of_band
        
     def dump(self, data : typing.Dict[str, typing.Any], file_desc) -> None:
         "write JSON to file"
@@ -174,9 +264,18 @@ class PickleSerializer(BaseSerializer):
         "method called by ZMQ message brokers to serialize data"
         return pickle.dumps(data)
     
+    def dumps_out_of_band(self, data) -> typing.Tuple[bytes, typing.List[typing.Any]]:
+        "large buffers (like those of contiguous numpy arrays) are sent as raw frames with pickle protocol 5"
+        buffers = []
+        data = pickle.dumps(data, protocol=5, buffer_callback=buffers.append)
+        return data, [buffer.raw() for buffer in buffers]
+    
+    def loads_out_of_band(self, data, frames : typing.Sequence[typing.Any]) -> typing.Any:
+        return pickle.loads(data, buffers=frames)
+    
     def loads(self, data) -> typing.Any:
         "method called by ZMQ message brokers to deserialize data"
-        return pickle.loads(self.convert_to_bytes(data))
+        return pickle.loads(data) # accepts any buffer, no copy
     
 
 
@@ -193,9 +292,20 @@ class MsgpackSerializer(BaseSerializer):
 
     def dumps(self, value) -> bytes:
         return msgpack.encode(value)
+    
+    def dumps_out_of_band(self, data) -> typing.Tuple[bytes, typing.List[typing.Any]]:
+        "numpy arrays are replaced by ``{\"__ndarray__\": index}`` & sent as a header and a raw buffer frame each"
+        arrays = []
+        data = msgpack.encode(data, enc_hook=_array_capturing_hook(arrays))
+        return data, _array_frames(arrays)
+    
+    def loads_out_of_band(self, data, frames : typing.Sequence[typing.Any]) -> typing.Any:
+        if len(frames) == 0:
+            return self.loads(data)
+        return _restore_arrays(self.loads(data), frames)
 
     def loads(self, value) -> typing.Any:
-        return msgpack.decode(self.convert_to_bytes(value))
+        return msgpack.decode(value) # accepts any buffer, no copy
     
 serializers = {
     None      : JSONSerializer,
@@ -243,6 +353,7 @@ except ImportError:
 
 
 
+
 def _get_serializer_from_user_given_options(
         zmq_serializer : typing.Union[str, BaseSerializer], 
         http_serializer : typing.Union[str, JSONSerializer]
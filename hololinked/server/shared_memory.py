@@ -0,0 +1,243 @@
+import os
+import struct
+import sys
+import time
+import typing
+import weakref
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from .registry import _is_alive
+
+try:
+    import numpy
+except ImportError:
+    pass
+
+
+
+class _SharedMemory(SharedMemory):
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except BufferError:
+            pass # arrays over the memory still exist, unmapped when the process exits
+
+
+
+def _attach_untracked(name : str) -> SharedMemory:
+    """
+    attach to an existing segment without registering it with the resource tracker, which would remove the 
+    segment when the attaching process exits (or unregister the creating process if both share the tracker)
+    """
+    if sys.version_info >= (3, 13):
+        return _SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype : None if rtype == 'shared_memory' else register(name, rtype)
+    try:
+        return _SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+
+class SharedMemoryRing:
+    """
+    Ring of fixed size slots in a shared memory segment, through which a server passes large out-of-band frames
+    (for example, the buffers of numpy arrays) to clients on the same host, sending only a small handle over ZMQ.
+    Created by the server (``create()``), clients ``attach()`` with the parameters advertised at handshake.
+
+    A slot is held from the moment the server wrote a frame until the client released it, which happens
+    once the client dropped all objects using the memory of the slot (reference counted by the array over
+    the slot, see ``read()``). Frames too small or too large, or written while all slots are held, are sent
+    inline instead. The state of each slot is a byte at the start of the segment, written only by the server
+    when taking a free slot and only by the client when releasing it. 
+    
+    Clients claim a slot with their process ID when they receive the frame, so that a slot held longer than 
+    ``lease`` is taken back by the server if it was never claimed (the reply was lost) or if the claiming 
+    process exited without releasing it. Slots of running clients are never taken back. 
+
+    Parameters
+    ----------
+    name: str
+        name of the shared memory segment
+    slots: int
+        number of slots
+    slot_size: int
+        size of a slot in bytes, the largest frame which can be passed through the ring
+    threshold: int, default 1 MiB
+        frames smaller than this are sent inline
+    create: bool, default False
+        create the segment instead of attaching to it
+    lease: float, default None
+        seconds after which the server takes back a slot not claimed by a running client, None to never take 
+        back slots. Only used by the server.
+    """
+
+    handle_struct = struct.Struct('!IQ') # slot, number of bytes
+    claim_struct = struct.Struct('=I') # process ID of the client which received the frame of a slot
+    FREE = 0
+    HELD = 1
+
+    def __init__(self, name : typing.Optional[str], slots : int, slot_size : int, threshold : int = 1024**2,
+                create : bool = False, lease : typing.Optional[float] = None) -> None:
+        if not isinstance(slots, int) or slots < 1:
+            raise ValueError(f"slots must be an integer greater than 0, given value : {slots}")
+        if not isinstance(slot_size, int) or slot_size < 1:
+            raise ValueError(f"slot_size must be an integer greater than 0, given value : {slot_size}")
+        self.slots = slots
+        self.slot_size = slot_size
+        self.threshold = threshold
+        self.lease = lease
+        self._claims_offset = (slots + 3) // 4 * 4 # slot states, then claims
+        self._data_offset = (self._claims_offset + slots * self.claim_struct.size + 63) // 64 * 64 # aligned to 64 bytes
+        if create:
+            self._shm = _SharedMemory(create=True, size=self._data_offset + slots * slot_size)
+        else:
+            self._shm = _attach_untracked(name)
+        self.name = self._shm.name
+        self._owner = create
+        self._states = self._shm.buf # first bytes, indexed directly as exported slices prevent closing
+        self._cursor = 0
+        self._written_at = [0.0] * slots # type: typing.List[float]
+        self._writes = 0
+        self._fallbacks = 0
+        self._reclaimed = 0
+
+    @classmethod
+    def create(cls, slots : int, slot_size : int, threshold : int = 1024**2, 
+            lease : typing.Optional[float] = None) -> "SharedMemoryRing":
+        """
+        create a new ring (server side)
+        """
+        return cls(None, slots, slot_size, threshold, create=True, lease=lease)
+
+    @classmethod
+    def attach(cls, name : str, slots : int, slot_size : int) -> "SharedMemoryRing":
+        """
+        attach to a ring created by a server (client side)
+        """
+        return cls(name, slots, slot_size)
+
+    @property
+    def capabilities(self) -> typing.Dict[str, typing.Any]:
+        """
+        parameters of the ring advertised to clients at handshake
+        """
+        return dict(name=self.name, slots=self.slots, slot_size=self.slot_size)
+
+    def write(self, frame : typing.Any) -> typing.Optional[bytes]:
+        """
+        copy a frame (bytes or an object supporting the buffer protocol) to a free slot and return its handle,
+        or None if the frame is to be sent inline. Called by the server from a single thread.
+        """
+        nbytes = len(frame) if isinstance(frame, (bytes, bytearray)) else memoryview(frame).nbytes
+        if nbytes < self.threshold or nbytes > self.slot_size:
+            return None
+        now = time.monotonic()
+        for _ in range(self.slots):
+            slot = self._cursor
+            self._cursor = (self._cursor + 1) % self.slots
+            if self._states[slot] == self.FREE:
+                break
+            if self.lease is not None and now - self._written_at[slot] > self.lease:
+                claim = self.claim_struct.unpack_from(self._shm.buf, self._claim_offset(slot))[0]
+                if claim == 0 or not _is_alive(claim):
+                    self._reclaimed += 1
+                    break
+        else:
+            self._fallbacks += 1
+            return None
+        start = self._data_offset + slot * self.slot_size
+        if 'numpy' in globals() and isinstance(frame, numpy.ndarray):
+            # keeps the memory layout (C or Fortran order) described by the header of the array
+            numpy.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf, offset=start,
+                        strides=frame.strides)[...] = frame
+        else:
+            self._shm.buf[start:start + nbytes] = memoryview(frame).cast('B')
+        self.claim_struct.pack_into(self._shm.buf, self._claim_offset(slot), 0)
+        self._written_at[slot] = now
+        self._states[slot] = self.HELD
+        self._writes += 1
+        return self.handle_struct.pack(slot, nbytes)
+
+    def read(self, handle : bytes) -> "numpy.ndarray":
+        """
+        the frame written to a slot as a byte array sharing the memory of the slot. The slot is released when
+        the array and all objects created over its memory (like the numpy arrays of a reply) are garbage
+        collected. Called by the client.
+        """
+        slot, nbytes = self.handle_struct.unpack(handle)
+        self.claim(handle)
+        frame = numpy.frombuffer(self._shm.buf, dtype=numpy.uint8, count=nbytes,
+                                offset=self._data_offset + slot * self.slot_size)
+        weakref.finalize(frame, self._release, slot)
+        return frame
+
+    def claim(self, handle : bytes) -> None:
+        """
+        mark the slot of a received frame as held by this process, so that the server does not take it back 
+        after the lease. Called by the client.
+        """
+        slot, _ = self.handle_struct.unpack(handle)
+        self.claim_struct.pack_into(self._shm.buf, self._claim_offset(slot), os.getpid())
+
+    def release(self, handle : bytes) -> None:
+        """
+        release the slot of a frame which is not read, for example when a reply is dropped. Called by the client.
+        """
+        self._release(self.handle_struct.unpack(handle)[0])
+
+    def copy(self, handle : bytes) -> bytes:
+        """
+        copy of the frame written to a slot which is still held, called by the server
+        """
+        slot, nbytes = self.handle_struct.unpack(handle)
+        start = self._data_offset + slot * self.slot_size
+        return bytes(self._shm.buf[start:start + nbytes])
+
+    def _claim_offset(self, slot : int) -> int:
+        return self._claims_offset + slot * self.claim_struct.size
+
+    def _release(self, slot : int) -> None:
+        try:
+            self._states[slot] = self.FREE
+        except (ValueError, TypeError):
+            pass # already closed
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        number of held slots, frames written to the ring, frames sent inline as all slots were held and slots 
+        taken back after the lease
+        """
+        return dict(
+            slots=self.slots,
+            slot_size=self.slot_size,
+            held=sum(1 for slot in range(self.slots) if self._states[slot] != self.FREE),
+            writes=self._writes,
+            fallbacks=self._fallbacks,
+            reclaimed=self._reclaimed
+        )
+
+    def close(self) -> None:
+        """
+        detach from the segment, the creating server also removes it. Memory still used by objects of a
+        client remains mapped until they are garbage collected.
+        """
+        try:
+            self._shm.close()
+        except BufferError:
+            pass # frames still in use, unmapped when the process exits
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+
+__all__ = [
+    SharedMemoryRing.__name__
+]
@@ -732,7 +732,7 @@ class ThingDescription(Schema):
     securityDefinitions : SecurityScheme
     schemaDefinitions : typing.Optional[typing.List[DataSchema]]
     
-    skip_properties = ['expose', 'httpserver_resources', 'zmq_resources', 'gui_resources',
+    skip_properties = ['expose', 'httpserver_resources', 'zmq_resources', 'opcodes', 'gui_resources',
                     'events', 'thing_description', 'GUI', 'object_info' ]
 
     skip_actions = ['_set_properties', '_get_properties', '_add_property', '_get_properties_in_db', 
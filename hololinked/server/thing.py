@@ -8,17 +8,18 @@ import zmq
 import zmq.asyncio
 
 from ..param.parameterized import Parameterized, ParameterizedMetaclass, edit_constant as edit_constant_parameters
-from .constants import (JSON, LOGLEVEL, ZMQ_PROTOCOLS, HTTP_METHODS, JSONSerializable)
+from .constants import (JSON, LOGLEVEL, ZMQ_PROTOCOLS, HTTP_METHODS, JSONSerializable, Priority)
 from .database import ThingDB, ThingInformation
 from .serializers import _get_serializer_from_user_given_options, BaseSerializer, JSONSerializer
 from .schema_validators import BaseSchemaValidator, JsonSchemaValidator
 from .exceptions import BreakInnerLoop
 from .action import action
-from .dataklasses import HTTPResource, ZMQResource, build_our_temp_TD, get_organised_resources
+from .dataklasses import HTTPResource, ZMQResource, build_our_temp_TD, get_organised_resources, get_opcode_table, get_priorities
 from .utils import get_default_logger, getattr_without_descriptor_read
 from .property import Property, ClassProperties
-from .properties import String, ClassSelector, Selector, TypedKeyMappingsConstrainedDict
-from .zmq_message_brokers import RPCServer, ServerTypes, EventPublisher
+from .properties import String, ClassSelector, Selector, TypedDict, TypedKeyMappingsConstrainedDict
+from .zmq_message_brokers import RPCServer, ServerTypes, EventPublisher, get_opcode_epoch
+from .executors import ResourceThreadPool, ResourceProcessPool
 from .state_machine import StateMachine
 from .events import Event
 
@@ -118,6 +119,10 @@ class Thing(Parameterized, metaclass=ThingMeta):
     zmq_resources = Property(readonly=True, URL_path='/resources/zmq-object-proxy', 
                         doc="object's resources exposed to RPC client, similar to HTTP resources but differs in details.", 
                         fget=lambda self: self._zmq_resources) # type: typing.Dict[str, ZMQResource]
+    opcodes = Property(readonly=True, URL_path='/resources/opcodes', 
+                        doc="""integer opcode of each instruction, RPC clients may send the opcode instead of the instruction 
+                        string. Valid for the lifetime of the object.""",
+                        fget=lambda self: self._opcodes) # type: typing.Dict[str, int]
     gui_resources = Property(readonly=True, URL_path='/resources/portal-app', 
                         doc="""object's data read by hololinked-portal GUI client, similar to http_resources but differs 
                         in details.""",
@@ -126,6 +131,15 @@ class Thing(Parameterized, metaclass=ThingMeta):
                         doc="GUI specified here will become visible at GUI tab of hololinked-portal dashboard tool")     
     object_info = Property(doc="contains information about this object like the class name, script location etc.",
                         URL_path='/object-info') # type: ThingInformation
+    queue_stats = TypedDict(key_type=str, readonly=True, URL_path='/queue-stats',
+                        doc="""depth of the queue of instructions waiting to be executed, its peak and the number of
+                        instructions rejected as the queue was full, see ``RPCServer``. None when not running.""",
+                        fget=lambda self: self.rpc_server.queue_stats if self.rpc_server is not None else None) # type: typing.Dict[str, typing.Any]
+    thread_pool_stats = TypedDict(key_type=str, readonly=True, URL_path='/thread-pool-stats',
+                        doc="""busy threads of the pool executing threaded actions & properties, calls waiting for a thread, 
+                        their peaks and the number of calls which found all threads busy, see ``ResourceThreadPool``. 
+                        None when not running.""",
+                        fget=lambda self: self._thread_pool.stats if self._thread_pool is not None else None) # type: typing.Dict[str, typing.Any]
     
 
     def __init__(self, *, instance_name : str, logger : typing.Optional[logging.Logger] = None, 
@@ -177,6 +191,8 @@ class Thing(Parameterized, metaclass=ThingMeta):
         self._gui = None # filler for a future feature
         self._event_publisher = None # type : typing.Optional[EventPublisher]
         self.rpc_server  = None # type: typing.Optional[RPCServer]
+        self._thread_pool = None # type: typing.Optional[ResourceThreadPool]
+        self._process_pool = None # type: typing.Optional[ResourceProcessPool]
         self.message_broker = None # type : typing.Optional[AsyncPollingZMQServer]
         # serializer
         if not isinstance(serializer, JSONSerializer) and serializer != 'json' and serializer is not None:
@@ -214,6 +230,7 @@ class Thing(Parameterized, metaclass=ThingMeta):
         """
         # The following dict is to be given to the HTTP server
         self._zmq_resources, self._httpserver_resources, self.instance_resources = get_organised_resources(self)
+        self._opcodes, self._opcode_table = get_opcode_table(self.instance_resources)
 
 
     def _prepare_logger(self, log_level : int, log_file : str, remote_access : bool = False):
@@ -293,7 +310,7 @@ class Thing(Parameterized, metaclass=ThingMeta):
     def _get_properties(self, **kwargs) -> typing.Dict[str, typing.Any]:
         """
         """
-        skip_props = ["httpserver_resources", "zmq_resources", "gui_resources", "GUI", "object_info"]
+        skip_props = ["httpserver_resources", "zmq_resources", "opcodes", "gui_resources", "GUI", "object_info"]
         for prop_name in skip_props:
             if prop_name in kwargs:
                 raise RuntimeError("GUI, httpserver resources, RPC resources , object info etc. cannot be queried" + 
@@ -485,7 +502,7 @@ class Thing(Parameterized, metaclass=ThingMeta):
                                     allow_loose_schema=False, ignore_errors=ignore_errors).produce() #allow_loose_schema)   
 
 
-    @action(URL_path='/exit', http_method=HTTP_METHODS.POST)                                                                                                                                          
+    @action(URL_path='/exit', http_method=HTTP_METHODS.POST, priority=Priority.HIGH)                                                                                                                                          
     def exit(self) -> None:
         """
         Exit the object without killing the eventloop that runs this object. If Thing was 
@@ -533,6 +550,40 @@ class Thing(Parameterized, metaclass=ThingMeta):
             context: zmq.asyncio.Context, optional
                 zmq context to be used. If not supplied, a new context is created.
                 For INPROC clients, you need to provide a context.
+            max_in_flight: int, optional, default 8
+                number of instructions tunneled to the ``Thing`` before a reply is awaited, see ``RPCServer``. 
+                Threaded resources and actions executed in a task or in the process pool are not counted once accepted, 
+                their concurrency is bounded by ``thread_pool_size``, ``max_concurrency`` and ``process_pool_size``.
+            direct_dispatch: bool, optional, default False
+                pass instructions to the ``Thing`` through a thread-safe queue instead of inproc ZMQ sockets, 
+                see ``RPCServer``.
+            queue_high_water_mark: int, optional, default 1024
+                number of queued instructions above which further instructions are rejected with a BUSY reply, 
+                see ``RPCServer``.
+            client_high_water_mark: int, optional, default None
+                same as ``queue_high_water_mark`` for each client separately. Instructions of higher than normal 
+                priority are rejected only beyond twice ``queue_high_water_mark``.
+            starvation_limit: int, optional, default 32
+                number of consecutive higher priority instructions served before the longest waiting instruction 
+                is served irrespective of its priority, see ``RPCServer``.
+            thread_pool_size: int, optional, default 4
+                number of threads executing ``threaded`` actions & properties, see ``ResourceThreadPool``.
+            process_pool_size: int, optional, default None
+                number of processes executing ``process_pool`` actions, defaults to the number of CPUs, 
+                see ``ResourceProcessPool``.
+            shared_memory_slots: int, optional, default 0
+                number of slots of the shared memory ring passing large numpy arrays of replies to IPC clients, 
+                0 for no ring, see ``RPCServer``.
+            shared_memory_slot_size: int, optional, default 16 MiB
+                size of a slot of the shared memory ring, i.e. the largest array passed through it.
+            shared_memory_threshold: int, optional, default 1 MiB
+                size of the smallest array passed through the shared memory ring, smaller arrays are sent through 
+                the socket.
+            shared_memory_lease: float, optional, default 60
+                seconds after which a slot not held by a running client is taken back, see ``RPCServer``.
+            idempotency_cache_size: int, optional, default 1024
+                number of recent replies kept to answer retries of instructions with an idempotency key without 
+                executing them again, see ``RPCServer``.
         """
         # expose_eventloop: bool, False
         #     expose the associated Eventloop which executes the object. This is generally useful for remotely 
@@ -552,10 +603,25 @@ class Thing(Parameterized, metaclass=ThingMeta):
                                 zmq_serializer=self.zmq_serializer, 
                                 http_serializer=self.http_serializer, 
                                 tcp_socket_address=kwargs.get('tcp_socket_address', None),
+                                max_in_flight=kwargs.get('max_in_flight', 8),
+                                direct_dispatch=kwargs.get('direct_dispatch', False),
+                                queue_high_water_mark=kwargs.get('queue_high_water_mark', 1024),
+                                client_high_water_mark=kwargs.get('client_high_water_mark', None),
+                                priorities=get_priorities(self.instance_resources, self._opcodes),
+                                starvation_limit=kwargs.get('starvation_limit', 32),
+                                opcode_epoch=get_opcode_epoch(self._opcodes),
+                                shared_memory_slots=kwargs.get('shared_memory_slots', 0),
+                                shared_memory_slot_size=kwargs.get('shared_memory_slot_size', 16 * 1024**2),
+                                shared_memory_threshold=kwargs.get('shared_memory_threshold', 1024**2),
+                                shared_memory_lease=kwargs.get('shared_memory_lease', 60),
+                                idempotency_cache_size=kwargs.get('idempotency_cache_size', 1024),
                                 logger=self.logger
                             ) 
         self.message_broker = self.rpc_server.inner_inproc_server
         self.event_publisher = self.rpc_server.event_publisher 
+        self._thread_pool = ResourceThreadPool(max_workers=kwargs.get('thread_pool_size', 4), 
+                                            thread_name_prefix=self.instance_name)
+        self._process_pool = ResourceProcessPool(max_workers=kwargs.get('process_pool_size', None))
 
         from .eventloop import EventLoop
         self.event_loop = EventLoop(
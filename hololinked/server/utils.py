@@ -178,7 +178,7 @@ def getattr_without_descriptor_read(instance, key):
     for base in mro:
         if key in base.__dict__:
             value = base.__dict__[key]
-            if isinstance(value, types.FunctionType):
+            if isinstance(value, (types.FunctionType, classmethod)):
                 method = getattr(instance, key, None)
                 if isinstance(method, types.MethodType):
                     return method 
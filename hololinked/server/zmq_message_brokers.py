@@ -1,22 +1,39 @@
 import builtins
 import os
+import struct
+import concurrent.futures
+import functools
+import hashlib
+import heapq
+import itertools
 import threading
 import time
 import warnings
+import weakref
+import zlib
 import zmq
 import zmq.asyncio
 import asyncio
 import logging
 import typing
 from uuid import uuid4
-from collections import deque
+from collections import deque, OrderedDict
 from enum import Enum
 from zmq.utils.monitor import parse_monitor_message
 
+try:
+    import numpy # arrays sent as out-of-band frames can be reconstructed
+except ImportError:
+    pass
+
 from .utils import *
 from .config import global_config
-from .constants import JSON, ZMQ_PROTOCOLS, CommonRPC, ServerTypes, ZMQSocketType, ZMQ_EVENT_MAP
+from .constants import (JSON, ZMQ_PROTOCOLS, CommonRPC, Priority, ResourceTypes, ServerTypes, ZMQSocketType, 
+                        ZMQ_EVENT_MAP)
 from .serializers import BaseSerializer, JSONSerializer, _get_serializer_from_user_given_options
+from .shared_memory import SharedMemoryRing
+from .registry import thing_registry
+from .exceptions import ServerBusyError, OpcodeMismatchError
 
 
 
@@ -24,7 +41,10 @@ from .serializers import BaseSerializer, JSONSerializer, _get_serializer_from_us
 HANDSHAKE   = b'HANDSHAKE'
 INVALID_MESSAGE = b'INVALID_MESSAGE'
 TIMEOUT = b'TIMEOUT'
+BUSY = b'BUSY' # instruction rejected as the queue of the server is full
+ACCEPTED = b'ACCEPTED' # instruction handed over to a task by the Thing, only between RPC server & inner server
 INSTRUCTION = b'INSTRUCTION'
+BATCH = b'BATCH' # list of (instruction, arguments) pairs executed in one pass with a single reply
 REPLY       = b'REPLY'
 EXCEPTION   = b'EXCEPTION'
 INTERRUPT   = b'INTERRUPT'
@@ -53,8 +73,13 @@ client's message to server: |br|
 [address, bytes(), client type, message type, message id, timeout, instruction, arguments, execution_context] |br|
 [ 0     ,   1    ,     2      ,      3      ,   4   ,   5        ,    6       ,     7    ,        8         ] |br|
 
-[address, bytes(), server_type, message_type, message id, data]|br|
-[   0   ,   1    ,    2       ,      3      ,      4    ,  5  ]|br|
+[address, bytes(), server_type, message_type, message id, data, pre-encoded data, (out-of-band frames)]|br|
+[   0   ,   1    ,    2       ,      3      ,      4    ,  5  ,        6        ,          7...        ]|br|
+
+Out-of-band frames carry the numpy arrays of the data as raw buffers, in the layout of the serializer 
+(``BaseSerializer.dumps_out_of_band()``), when the client requested them. If the client also requested the 
+shared memory ring of the server (``SharedMemoryRing``), the first out-of-band frame is a map with a byte for 
+each following frame, 1 if the frame is a handle to a slot of the ring, 0 if sent inline. 
 """
 # CM = Client Message
 CM_INDEX_ADDRESS = 0
@@ -72,19 +97,145 @@ SM_INDEX_SERVER_TYPE = 2
 SM_INDEX_MESSAGE_TYPE = 3
 SM_INDEX_MESSAGE_ID = 4
 SM_INDEX_DATA = 5
+SM_INDEX_ENCODED_DATA = 6
+SM_INDEX_OUT_OF_BAND_DATA = 7
 
 # Server types - currently useless metadata
 
+# absolute deadline (time.monotonic()) replacing the timeout of an instruction tunneled by the RPC server
+DEADLINE = struct.Struct('!d')
+
+# suffix of the instruction of Thing.exit(), which is of high priority
+_EXIT_INSTRUCTION = '/exit/invoke-on-POST'
+
+"""
+Compact client message, used when the server advertised it during handshake: |br|
+[address, bytes(), header, arguments, (execution context)] |br|
+[ 0     ,   1    ,   2   ,     3    ,           4          ] |br|
+
+header: |br|
+[version, client type, message type, flags, timeout, opcode, opcode epoch, message id length, message id, instruction (UTF-8)] |br|
+[  u8   ,     u8     ,      u8     ,  u8  ,   f64  ,  i16  ,     u32     ,        u8        ,   bytes   ,      bytes         ] |br|
+
+Only the arguments (and the execution context, if it has keys other than the ones in flags) go through the serializer.
+Timeout is NaN when absent and opcode is -1 when the instruction string is to be used. Opcode epoch identifies the 
+opcode table the opcodes of the message were taken from (see ``get_opcode_epoch()``), 0 when the client has none. 
+"""
+COMPACT_HEADER = struct.Struct('!BBBBdhIB')
+COMPACT_HEADER_VERSION = 2
+_COMPACT_HEADER_EPOCH_OFFSET = 14 # offset of the opcode epoch field in COMPACT_HEADER
+CM_INDEX_HEADER = 2
+CM_INDEX_COMPACT_ARGUMENTS = 3
+CM_INDEX_COMPACT_EXECUTION_CONTEXT = 4
+LEGACY_MESSAGE_LENGTH = 9
+
+# compact header flags
+FLAG_ONEWAY = 0x01
+FLAG_FETCH_EXECUTION_LOGS = 0x02
+FLAG_DEADLINE = 0x04 # timeout field holds an absolute deadline stamped by the RPC server
+FLAG_EXECUTION_CONTEXT = 0x08 # execution context frame present
+FLAG_ARRAY_FRAMES = 0x10 # client accepts numpy arrays of the reply as out-of-band frames
+FLAG_SHARED_MEMORY = 0x20 # client reads large out-of-band frames from the shared memory ring of the server
+IDEMPOTENCY_KEY = b'idempotency_key' # searched in the execution context frame before deserializing it
+
+# sent with the handshake reply as pre-encoded data to advertise the compact header
+HANDSHAKE_CAPABILITIES = bytes(f'{{"compact_header": {COMPACT_HEADER_VERSION}, "array_frames": 1}}', encoding='utf-8')
+
+_CLIENT_TYPES = (EMPTY_BYTE, HTTP_SERVER, PROXY, TUNNELER)
+_CLIENT_TYPE_CODES = {client_type : code for code, client_type in enumerate(_CLIENT_TYPES)}
+_MESSAGE_TYPES = (EMPTY_BYTE, INSTRUCTION, HANDSHAKE, EXIT, BATCH) # append only, codes are sent on the wire
+_MESSAGE_TYPE_CODES = {message_type : code for code, message_type in enumerate(_MESSAGE_TYPES)}
+_NO_TIMEOUT = float('nan')
+
+
 byte_types = (bytes, bytearray, memoryview)
 
 
+def copy_frames(frames : typing.Sequence[typing.Any]) -> bool:
+    """
+    ``copy`` argument of ``send_multipart()`` for the frames of a message. A message with a frame of at least 
+    ``global_config.ZMQ_ZERO_COPY_THRESHOLD`` bytes is sent without copying, ZeroMQ then reads the frames from 
+    the buffers of the given objects (bytes or any object supporting the buffer protocol) which must not be 
+    modified until sent. Smaller messages are copied, which is faster than creating ``zmq.Frame`` objects. 
+    """
+    threshold = global_config.ZMQ_ZERO_COPY_THRESHOLD
+    if threshold is None:
+        return True
+    for frame in frames:
+        if (len(frame) if isinstance(frame, (bytes, bytearray)) else memoryview(frame).nbytes) >= threshold:
+            return False
+    return True
+
+
 # Function to get the socket type name from the enum
 def get_socket_type_name(socket_type):
     try:
         return ZMQSocketType(socket_type).name
     except ValueError:
         return "UNKNOWN"
-    
+
+
+def get_opcode_epoch(opcodes : typing.Dict[str, int]) -> int:
+    """
+    epoch of an opcode table (``Thing.opcodes``), a checksum of its instructions & opcodes which both the client and 
+    the server compute. A restarted ``Thing`` whose resources changed has another epoch, so that opcodes of the 
+    previous table are rejected instead of executing another instruction. 0 for an empty table.
+    """
+    if not opcodes:
+        return 0
+    table = '\n'.join(f"{opcode} {instruction}" for instruction, opcode in sorted(opcodes.items(), key=lambda item: item[1]))
+    return zlib.crc32(table.encode('utf-8')) or 1 # 0 is reserved for clients without opcodes
+
+
+def pack_compact_header(client_type : bytes, message_type : bytes, message_id : bytes, instruction : str,
+                        timeout : typing.Optional[float] = None, flags : int = 0, opcode : int = -1, 
+                        opcode_epoch : int = 0) -> bytes:
+    """
+    pack the header of a compact client message, see ``COMPACT_HEADER``
+    """
+    return b''.join((
+        COMPACT_HEADER.pack(COMPACT_HEADER_VERSION, _CLIENT_TYPE_CODES[client_type], _MESSAGE_TYPE_CODES[message_type],
+                            flags, _NO_TIMEOUT if timeout is None else timeout, opcode, opcode_epoch, len(message_id)),
+        message_id,
+        instruction.encode('utf-8')
+    ))
+
+
+def unpack_compact_header(header : bytes) -> typing.Tuple[bytes, bytes, int, typing.Optional[float], int, bytes, str]:
+    """
+    unpack the header of a compact client message
+
+    Returns
+    -------
+    header: Tuple
+        client type, message type, flags, timeout (None if absent), opcode, message id and instruction
+    """
+    version, client_type, message_type, flags, timeout, opcode, _, id_length = COMPACT_HEADER.unpack_from(header)
+    if version != COMPACT_HEADER_VERSION:
+        raise ValueError(f"unsupported compact header version {version}, supported version is {COMPACT_HEADER_VERSION}")
+    start = COMPACT_HEADER.size
+    end = start + id_length
+    return (_CLIENT_TYPES[client_type], _MESSAGE_TYPES[message_type], flags, None if timeout != timeout else timeout,
+            opcode, header[start:end], header[end:].decode()) # NaN timeout is not equal to itself
+
+
+def unpack_opcode_epoch(header : bytes) -> int:
+    """
+    opcode epoch of the header of a compact client message, see ``get_opcode_epoch()``
+    """
+    return struct.unpack_from('!I', header, _COMPACT_HEADER_EPOCH_OFFSET)[0]
+
+
+def get_message_id(message : typing.List[bytes]) -> bytes:
+    """
+    message id of a client message in either the compact or the original (9 frame) format, without parsing it
+    """
+    if len(message) == LEGACY_MESSAGE_LENGTH:
+        return message[CM_INDEX_MESSAGE_ID]
+    header = message[CM_INDEX_HEADER]
+    start = COMPACT_HEADER.size
+    return header[start:start + header[start - 1]] # last field of the header struct is the message id length
+
 
 
 class BaseZMQ: 
@@ -179,21 +330,23 @@ class BaseZMQ:
                 self.socket.connect(socket_address)
         elif protocol == ZMQ_PROTOCOLS.TCP or protocol == "TCP":
             if bind:
-                if not socket_address:
-                    for i in range(global_config.TCP_SOCKET_SEARCH_START_PORT, global_config.TCP_SOCKET_SEARCH_END_PORT):
-                        socket_address = "tcp://0.0.0.0:{}".format(i)
-                        try:
-                            self.socket.bind(socket_address)
-                            break 
-                        except zmq.error.ZMQError as ex:
-                            if not ex.strerror.startswith('Address in use'):
-                                raise ex from None
+                if not socket_address and global_config.TCP_SOCKET_SEARCH_START_PORT is None:
+                    self.socket.bind("tcp://*:*") # port assigned by the operating system
+                    socket_address = self.socket.getsockopt_string(zmq.LAST_ENDPOINT)
+                elif not socket_address:
+                    port = self.socket.bind_to_random_port("tcp://*", 
+                                                    min_port=global_config.TCP_SOCKET_SEARCH_START_PORT, 
+                                                    max_port=global_config.TCP_SOCKET_SEARCH_END_PORT)
+                    socket_address = "tcp://0.0.0.0:{}".format(port)
                 else:                   
                     self.socket.bind(socket_address)
-            elif socket_address: 
-                self.socket.connect(socket_address)
             else:
-                raise RuntimeError(f"Socket address not supplied for TCP connection to identity - {identity}")
+                # servers on this host register their TCP socket, see ThingRegistry
+                socket_address = socket_address or thing_registry.resolve(self.instance_name, ZMQ_PROTOCOLS.TCP)
+                if not socket_address:
+                    raise RuntimeError(f"Socket address not supplied for TCP connection to identity - {identity}" + 
+                                    f" and '{self.instance_name}' is not registered on this host")
+                self.socket.connect(socket_address)
         elif protocol == ZMQ_PROTOCOLS.INPROC or protocol == "INPROC":
             # inproc_instance_name = instance_name.replace('/', '_').replace('-', '_')
             if socket_address is None:
@@ -267,6 +420,11 @@ class BaseZMQServer(BaseZMQ):
         
         timeout, instruction, arguments, execution context] 
           5    ,      6     ,     7    ,       8          ]
+
+    or, if the server advertised it during handshake, the compact client message (see ``COMPACT_HEADER``):
+    ::
+        [address, bytes(), header, arguments, (execution context)]
+        [   0   ,   1    ,   2   ,     3    ,          4         ]
         
     server's message to client: 
     ::
@@ -291,6 +449,7 @@ class BaseZMQServer(BaseZMQ):
         self.instance_name = instance_name 
         self.server_type = server_type if isinstance(server_type, bytes) else bytes(server_type, encoding='utf-8') 
         self.logger = logger
+        self.shared_memory_ring = None # type: typing.Optional[SharedMemoryRing] # set by RPCServer if any
 
 
     def parse_client_message(self, message : typing.List[bytes]) -> typing.List[typing.Union[bytes, typing.Any]]:
@@ -311,6 +470,12 @@ class BaseZMQServer(BaseZMQ):
         Execution Context Definitions (typing.Dict[str, typing.Any] or JSON):
             - "oneway" - does not reply to client after executing the instruction 
             - "fetch_execution_logs" - fetches logs that were accumulated while execution
+            - "array_frames" - numpy arrays of the reply are sent as out-of-band frames (RPC clients only)
+            - "shared_memory" - large out-of-band frames are passed through the shared memory ring of the server
+            - "idempotency_key" - str, instructions with the same key are executed once by ``RPCServer``, see 
+            ``idempotency_cache_size``
+
+        Compact client messages are returned in the same (9 element) layout as above. 
 
         Parameters
         ----------
@@ -323,9 +488,11 @@ class BaseZMQServer(BaseZMQ):
             message with instruction, arguments and execution context deserialized
 
         """
+        if len(message) != LEGACY_MESSAGE_LENGTH:
+            return self.parse_compact_client_message(message)
         try:
             message_type = message[CM_INDEX_MESSAGE_TYPE]
-            if message_type == INSTRUCTION:
+            if message_type == INSTRUCTION or message_type == BATCH:
                 client_type = message[CM_INDEX_CLIENT_TYPE]
                 if client_type == PROXY:
                     message[CM_INDEX_INSTRUCTION] = self.zmq_serializer.loads(message[CM_INDEX_INSTRUCTION]) # type: ignore
@@ -342,6 +509,62 @@ class BaseZMQServer(BaseZMQ):
             self.handle_invalid_message(message, ex)
 
 
+    def parse_compact_client_message(self, message : typing.List[bytes]) -> typing.List[typing.Union[bytes, typing.Any]]:
+        """
+        unpacks the header and deserializes the arguments (and execution context, if any) of a compact client message. 
+        The returned message has the layout of the original messaging contract (see ``parse_client_message()``), 
+        the timeout being replaced by the deadline stamped by ``RPCServer`` if any and the instruction by the opcode 
+        (int) if one was sent. Messages whose header cannot 
+        be unpacked cannot be replied and are dropped. 
+
+        Parameters
+        ----------
+        message: List[bytes]
+            compact message received from client
+
+        Returns
+        -------
+        message: List[bytes | Any]
+            message with instruction, arguments and execution context deserialized
+        """
+        try:
+            client_type, message_type, flags, timeout, opcode, message_id, instruction = unpack_compact_header(
+                                                                                        message[CM_INDEX_HEADER])
+        except Exception as ex:
+            self.logger.error(f"dropping message from client '{message[CM_INDEX_ADDRESS]}' with invalid header - {str(ex)}")
+            return None
+        parsed_message = [
+            message[CM_INDEX_ADDRESS],
+            EMPTY_BYTE,
+            client_type,
+            message_type,
+            message_id,
+            DEADLINE.pack(timeout) if flags & FLAG_DEADLINE else EMPTY_BYTE,
+            opcode if opcode >= 0 else instruction,
+            message[CM_INDEX_COMPACT_ARGUMENTS],
+            None
+        ]
+        try:
+            serializer = self.zmq_serializer if client_type == PROXY else self.http_serializer
+            parsed_message[CM_INDEX_ARGUMENTS] = serializer.loads(message[CM_INDEX_COMPACT_ARGUMENTS]) # type: ignore
+            if flags & FLAG_EXECUTION_CONTEXT:
+                context = serializer.loads(message[CM_INDEX_COMPACT_EXECUTION_CONTEXT]) # type: dict
+            else:
+                context = dict()
+            if flags & FLAG_ONEWAY:
+                context['oneway'] = True
+            if flags & FLAG_FETCH_EXECUTION_LOGS:
+                context['fetch_execution_logs'] = True
+            if flags & FLAG_ARRAY_FRAMES:
+                context['array_frames'] = True
+            if flags & FLAG_SHARED_MEMORY:
+                context['shared_memory'] = True
+            parsed_message[CM_INDEX_EXECUTION_CONTEXT] = context
+            return parsed_message
+        except Exception as ex:
+            self.handle_invalid_message(parsed_message, ex)
+
+
     def craft_reply_from_arguments(self, address : bytes, client_type: bytes, message_type : bytes, 
                             message_id : bytes = b'', data : typing.Any = None, 
                             pre_encoded_data : typing.Optional[bytes] = EMPTY_BYTE) -> typing.List[bytes]:
@@ -393,8 +616,11 @@ class BaseZMQServer(BaseZMQ):
 
         server's message to client:
         ::
-            [address, bytes(), server_type, message_type, message id, data]
-            [   0   ,   1    ,    2       ,      3      ,      4    ,  5  ]
+            [address, bytes(), server_type, message_type, message id, data, pre-encoded data, (out-of-band frames)]
+            [   0   ,   1    ,    2       ,      3      ,      4    ,  5  ,        6        ,          7...        ]
+
+        Numpy arrays within the data are sent as out-of-band frames if the RPC client requested it in the execution 
+        context ("array_frames"), large ones through ``shared_memory_ring`` if also requested ("shared_memory"). 
 
         Parameters
         ----------
@@ -409,14 +635,21 @@ class BaseZMQServer(BaseZMQ):
             the crafted reply with information in the correct positions within the list
         """
         client_type = original_client_message[CM_INDEX_CLIENT_TYPE]
+        out_of_band_frames = None
         if client_type == HTTP_SERVER:
             data = self.http_serializer.dumps(data)
         elif client_type == PROXY:
-            data = self.zmq_serializer.dumps(data)
+            context = original_client_message[CM_INDEX_EXECUTION_CONTEXT]
+            if isinstance(context, dict) and context.get('array_frames', False):
+                data, out_of_band_frames = self.zmq_serializer.dumps_out_of_band(data)
+                if out_of_band_frames and context.get('shared_memory', False):
+                    out_of_band_frames = self._pass_through_shared_memory(out_of_band_frames)
+            else:
+                data = self.zmq_serializer.dumps(data)
         else:
             raise ValueError(f"invalid client type given '{client_type}' for preparing message to send from " +
                             f"'{self.identity}' of type {self.__class__}.")
-        return [
+        reply = [
             original_client_message[CM_INDEX_ADDRESS],
             EMPTY_BYTE,
             self.server_type,
@@ -425,8 +658,45 @@ class BaseZMQServer(BaseZMQ):
             data,
             pre_encoded_data
         ]
+        if out_of_band_frames:
+            reply.extend(out_of_band_frames)
+        return reply
     
 
+    def _pass_through_shared_memory(self, frames : typing.List[typing.Any]) -> typing.List[typing.Any]:
+        """
+        replace the frames written to the shared memory ring by their handles and prepend the frame map
+        """
+        frame_map = bytearray(len(frames))
+        if self.shared_memory_ring is not None:
+            for index, frame in enumerate(frames):
+                handle = self.shared_memory_ring.write(frame)
+                if handle is not None:
+                    frames[index] = handle
+                    frame_map[index] = 1
+        return [bytes(frame_map), *frames]
+
+
+    def has_expired(self, original_client_message : typing.List[bytes]) -> bool:
+        """
+        whether the invokation timeout of an instruction tunneled by ``RPCServer`` elapsed before it could be executed.
+        ``RPCServer`` replaces the timeout by the absolute deadline when passing the instruction to the ``Thing``, 
+        as instructions may wait to be executed after they were tunneled. 
+
+        Parameters
+        ----------
+        original_client_message: List[bytes]
+            the client message as tunneled by ``RPCServer``
+
+        Returns
+        -------
+        expired: bool
+            True if the deadline passed and the instruction must not be executed 
+        """
+        deadline = original_client_message[CM_INDEX_TIMEOUT]
+        return len(deadline) == DEADLINE.size and DEADLINE.unpack(deadline)[0] < time.monotonic()
+
+
     def handshake(self, original_client_message : typing.List[bytes]) -> None:
         """
         pass a handshake message to client. Absolutely mandatory to ensure initial messages do not get lost 
@@ -503,7 +773,7 @@ class BaseAsyncZMQServer(BaseZMQServer):
         """
         await self.socket.send_multipart(self.craft_reply_from_arguments(original_client_message[CM_INDEX_ADDRESS], 
                 original_client_message[CM_INDEX_CLIENT_TYPE], HANDSHAKE, original_client_message[CM_INDEX_MESSAGE_ID],
-                EMPTY_BYTE))
+                EMPTY_BYTE, HANDSHAKE_CAPABILITIES))
         self.logger.info(f"sent handshake to client '{original_client_message[CM_INDEX_ADDRESS]}'")
 
 
@@ -597,7 +867,8 @@ class AsyncZMQServer(BaseAsyncZMQServer, BaseAsyncZMQ):
         -------
         None
         """
-        await self.socket.send_multipart(self.craft_reply_from_client_message(original_client_message, data))
+        reply = self.craft_reply_from_client_message(original_client_message, data)
+        await self.socket.send_multipart(reply, copy=copy_frames(reply))
         self.logger.debug(f"sent reply to client '{original_client_message[CM_INDEX_ADDRESS]}' with msg-ID {original_client_message[CM_INDEX_MESSAGE_ID]}")
         
     
@@ -617,9 +888,10 @@ class AsyncZMQServer(BaseAsyncZMQServer, BaseAsyncZMQ):
         -------
         None
         """
-        await self.socket.send_multipart(self.craft_reply_from_arguments(original_client_message[CM_INDEX_ADDRESS], 
+        reply = self.craft_reply_from_arguments(original_client_message[CM_INDEX_ADDRESS], 
                                                         original_client_message[CM_INDEX_CLIENT_TYPE], message_type, 
-                                                        original_client_message[CM_INDEX_MESSAGE_ID], data))
+                                                        original_client_message[CM_INDEX_MESSAGE_ID], data)
+        await self.socket.send_multipart(reply, copy=copy_frames(reply))
         self.logger.debug(f"sent reply to client '{original_client_message[CM_INDEX_ADDRESS]}' with msg-ID {original_client_message[CM_INDEX_MESSAGE_ID]}")
         
 
@@ -644,9 +916,107 @@ class AsyncZMQServer(BaseAsyncZMQServer, BaseAsyncZMQ):
 
     
 
+class SocketReceiver:
+    """
+    Receives the messages of a set of asyncio sockets with one task per socket awaiting ``recv_multipart()``, 
+    instead of polling the sockets with a timeout. Idle sockets do not wake up the event loop and ``stop()`` 
+    ends receiving immediately by cancelling the tasks. Sockets can be registered and unregistered while running.
+
+    Parameters
+    ----------
+    on_message: Callable[[zmq.asyncio.Socket, List[bytes]], None]
+        called with the socket and the message for each received message. Exceptions are logged and 
+        receiving continues.
+    logger: logging.Logger
+        logger for exceptions raised by ``on_message``
+    """
+
+    def __init__(self, on_message : typing.Callable[[zmq.asyncio.Socket, typing.List[bytes]], None], 
+                logger : logging.Logger) -> None:
+        self.on_message = on_message
+        self.logger = logger
+        self._tasks = dict() # type: typing.Dict[zmq.asyncio.Socket, typing.Optional[asyncio.Task]]
+        self._loop = None # type: typing.Optional[asyncio.AbstractEventLoop]
+        self._stopped = None # type: typing.Optional[asyncio.Event]
+
+    def __contains__(self, socket : zmq.asyncio.Socket) -> bool:
+        return socket in self._tasks
+
+    @property
+    def running(self) -> bool:
+        """
+        True when ``run()`` is receiving messages
+        """
+        return self._stopped is not None and not self._stopped.is_set()
+
+    def register(self, socket : zmq.asyncio.Socket) -> None:
+        """
+        receive the messages of a socket, starting immediately if running
+        """
+        if socket in self._tasks:
+            return
+        self._tasks[socket] = self._loop.create_task(self._receive(socket)) if self.running else None
+
+    def unregister(self, socket : zmq.asyncio.Socket) -> None:
+        """
+        stop receiving the messages of a socket
+        """
+        task = self._tasks.pop(socket, None)
+        if task is not None:
+            task.cancel()
+
+    async def run(self) -> None:
+        """
+        receive the messages of all registered sockets until ``stop()`` is called
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        for socket in self._tasks:
+            self._tasks[socket] = self._loop.create_task(self._receive(socket))
+        try:
+            await self._stopped.wait()
+        finally:
+            self._stopped.set()
+            tasks = [task for task in self._tasks.values() if task is not None]
+            for socket in self._tasks:
+                self._tasks[socket] = None
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        """
+        stop receiving and return from ``run()``, can be called from any thread
+        """
+        if self._stopped is None or self._loop.is_closed():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._stopped.set()
+        else:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+
+    async def _receive(self, socket : zmq.asyncio.Socket) -> None:
+        while True:
+            try:
+                message = await socket.recv_multipart()
+            except zmq.ZMQError as ex:
+                # socket closed or context terminated
+                self.logger.debug(f"stopped receiving messages of socket - {str(ex)}")
+                return
+            try:
+                self.on_message(socket, message)
+            except Exception as ex:
+                self.logger.error(f"error while handling received message - {type(ex).__name__} : {str(ex)}")
+
+
+
 class AsyncPollingZMQServer(AsyncZMQServer):
     """
-    Identical to AsyncZMQServer, except that instructions are received in non-blocking/polling form. 
+    Identical to AsyncZMQServer, except that instructions are received in batches by ``poll_instructions()``. 
     This server can be stopped from server side by calling ``stop_polling()`` unlike ``AsyncZMQServer`` which 
     cannot be stopped manually unless an instruction arrives.
 
@@ -663,8 +1033,8 @@ class AsyncPollingZMQServer(AsyncZMQServer):
     protocol: Enum, default ZMQ_PROTOCOLS.IPC
         Use TCP for network access, IPC for multi-process applications, and INPROC for multi-threaded applications.  
     poll_timeout: int, default 25
-        time in milliseconds to poll the sockets specified under ``procotols``. Useful for calling ``stop_polling()``
-        where the max delay to stop polling will be ``poll_timeout``
+        unused, kept for backwards compatibility. Instructions are awaited without a timeout and 
+        ``stop_polling()`` returns immediately. 
   
     **kwargs:
         http_serializer: hololinked.server.serializers.JSONSerializer
@@ -678,14 +1048,14 @@ class AsyncPollingZMQServer(AsyncZMQServer):
                 poll_timeout = 25, **kwargs) -> None:
         super().__init__(instance_name=instance_name, server_type=server_type, context=context, 
                         socket_type=socket_type, protocol=protocol, **kwargs)
-        self.poller = zmq.asyncio.Poller()
-        self.poller.register(self.socket, zmq.POLLIN)
         self.poll_timeout = poll_timeout
+        self.stop_poll = False
+        self._receive_future = None # type: typing.Optional[asyncio.Future]
 
     @property
     def poll_timeout(self) -> int:
         """
-        socket polling timeout in milliseconds greater than 0. 
+        socket polling timeout in milliseconds greater than 0, unused. 
         """
         return self._poll_timeout
 
@@ -697,51 +1067,231 @@ class AsyncPollingZMQServer(AsyncZMQServer):
 
     async def poll_instructions(self) -> typing.List[typing.List[bytes]]:
         """
-        poll for instructions with specified timeout (``poll_timeout``) and return if any instructions are available.
-        This method blocks, so make sure other methods are scheduled which can stop polling. 
+        wait for instructions and return all available ones once at least one arrived. This method blocks until 
+        then or until ``stop_polling()`` is called, which cancels the pending receive, so make sure other methods 
+        are scheduled which can stop polling. 
 
         Returns
         -------
         instructions: List[List[bytes]]
             list of received instructions with important content (instruction, arguments, execution context) deserialized.
+            Empty when polling was stopped.
         """
         self.stop_poll = False
         instructions = []
-        while not self.stop_poll:
-            sockets = await self.poller.poll(self._poll_timeout) # type hints dont work in this line
-            for socket, _ in sockets:
-                while True:
-                    try:
-                        instruction = self.parse_client_message(await socket.recv_multipart(zmq.NOBLOCK))
-                    except zmq.Again:
-                        break
-                    else:
-                        if instruction:
-                            self.logger.debug(f"received instruction from client '{instruction[CM_INDEX_ADDRESS]}' with msg-ID {instruction[CM_INDEX_MESSAGE_ID]}")
-                            instructions.append(instruction)
-            if len(instructions) > 0:
-                break
+        while not self.stop_poll and len(instructions) == 0:
+            self._receive_future = self.socket.recv_multipart()
+            try:
+                message = await self._receive_future
+            except asyncio.CancelledError:
+                if self.stop_poll:
+                    break
+                raise
+            finally:
+                self._receive_future = None
+            while True:
+                instruction = self.parse_client_message(message)
+                if instruction:
+                    self.logger.debug(f"received instruction from client '{instruction[CM_INDEX_ADDRESS]}' with msg-ID {instruction[CM_INDEX_MESSAGE_ID]}")
+                    instructions.append(instruction)
+                try:
+                    message = await self.socket.recv_multipart(zmq.NOBLOCK)
+                except zmq.Again:
+                    break
         return instructions
 
     def stop_polling(self) -> None:
         """
-        stop polling and unblock ``poll_instructions()`` method
+        stop polling and unblock ``poll_instructions()`` method, can be called from any thread
         """
         self.stop_poll = True 
+        future = self._receive_future
+        if future is None or future.done():
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is future.get_loop():
+            future.cancel()
+        else:
+            future.get_loop().call_soon_threadsafe(future.cancel)
 
     def exit(self) -> None:
         """
-        unregister socket from poller and terminate socket and context.
+        stop polling and terminate socket and context.
         """
-        try:
-            BaseZMQ.exit(self)
-            self.poller.unregister(self.socket)
-        except Exception as ex:
-            self.logger.warning(f"could not unregister socket {self.identity} from polling - {str(ex)}")
+        self.stop_polling()
         return super().exit()
         
 
 
+class ThreadsafeQueueServer(BaseZMQServer):
+    """
+    Replaces the inner inproc ZMQ server of a ``Thing`` when ``RPCServer`` dispatches instructions directly. 
+    Instructions are handed over from the event loop of the ``RPCServer`` to the event loop executing the ``Thing`` 
+    through a thread-safe queue, and the replies are returned as futures instead of being sent through an inproc 
+    socket pair. Messages keep the format of the messaging contract, only the transport differs. The executor 
+    side has the same API as ``AsyncZMQServer``.
+
+    Parameters
+    ----------
+    instance_name: str
+        ``instance_name`` of the Thing which the server serves
+    server_type: str
+        server type metadata - currently not useful/important
+    """
+
+    def __init__(self, *, instance_name : str, server_type : Enum, **kwargs) -> None:
+        super().__init__(instance_name=instance_name, server_type=server_type, **kwargs)
+        self.identity = instance_name
+        if self.logger is None:
+            self.logger = get_default_logger('{}|{}'.format(self.__class__.__name__, self.identity), 
+                                            kwargs.get('log_level', logging.INFO))
+        self._queue = deque() # type: deque[typing.List[bytes]]
+        self._pending_replies = dict() # type: typing.Dict[typing.Tuple[bytes, bytes], concurrent.futures.Future]
+        self._consumer_loop = None # type: typing.Optional[asyncio.AbstractEventLoop]
+        self._instructions_available = None # type: typing.Optional[asyncio.Event]
+        self.on_accepted = None # type: typing.Optional[typing.Callable[[bytes], None]]
+
+
+    def put_instruction(self, message : typing.List[bytes]) -> concurrent.futures.Future:
+        """
+        queue an instruction for execution, thread-safe. 
+
+        Parameters
+        ----------
+        message: List[bytes]
+            message received from client, address is not replaced
+
+        Returns
+        -------
+        reply: concurrent.futures.Future
+            resolves to the reply crafted by the ``Thing`` (which may also be an ONEWAY message), or cancelled 
+            if the ``Thing`` stopped executing before the instruction was executed.  
+        """
+        future = concurrent.futures.Future()
+        self._pending_replies[(message[CM_INDEX_ADDRESS], get_message_id(message))] = future
+        self._queue.append(message)
+        if self._consumer_loop is not None: 
+            self._consumer_loop.call_soon_threadsafe(self._instructions_available.set)
+        return future
+
+
+    async def async_recv_instruction(self) -> typing.Any:
+        """
+        Receive one instruction, the remaining queued instructions are left for later. 
+
+        Returns
+        -------
+        instruction: List[bytes | Any]
+            received instruction with important content (instruction, arguments, execution context) deserialized. 
+        """
+        return (await self.async_recv_instructions(max_count=1))[0]
+    
+
+    async def async_recv_instructions(self, max_count : typing.Optional[int] = None) -> typing.List[typing.Any]:
+        """
+        Receive all currently queued instructions, waits until at least one is available. 
+
+        Returns
+        -------
+        instructions: List[List[bytes | Any]]
+            list of received instructions with important content (instruction, arguments, execution context) deserialized.
+        """
+        if self._consumer_loop is None:
+            self._instructions_available = asyncio.Event()
+            self._consumer_loop = asyncio.get_running_loop()
+        instructions = []
+        while True:
+            while len(self._queue) > 0 and (max_count is None or len(instructions) < max_count):
+                instruction = self.parse_client_message(self._queue.popleft())
+                if instruction:
+                    self.logger.debug(f"received instruction from client '{instruction[CM_INDEX_ADDRESS]}' with msg-ID {instruction[CM_INDEX_MESSAGE_ID]}")
+                    instructions.append(instruction)
+            if len(instructions) > 0:
+                return instructions
+            self._instructions_available.clear()
+            if len(self._queue) == 0: 
+                await self._instructions_available.wait()
+
+
+    def _resolve(self, original_client_message : typing.List[bytes], reply : typing.List[bytes]) -> None:
+        future = self._pending_replies.pop((original_client_message[CM_INDEX_ADDRESS], 
+                                            original_client_message[CM_INDEX_MESSAGE_ID]), None)
+        if future is not None:
+            future.set_result(reply)
+
+
+    async def async_send_reply(self, original_client_message : typing.List[bytes], data : typing.Any) -> None:
+        """
+        Send reply for an instruction. 
+
+        Parameters
+        ----------
+        original_client_message: List[bytes]
+            original message so that the reply can be properly crafted and routed
+        data: Any
+            serializable data to be sent as reply
+
+        Returns
+        -------
+        None
+        """
+        self._resolve(original_client_message, self.craft_reply_from_client_message(original_client_message, data))
+        self.logger.debug(f"sent reply to client '{original_client_message[CM_INDEX_ADDRESS]}' with msg-ID {original_client_message[CM_INDEX_MESSAGE_ID]}")
+
+
+    async def async_send_reply_with_message_type(self, original_client_message : typing.List[bytes], 
+                                                message_type: bytes, data : typing.Any) -> None:
+        """
+        Send reply for an instruction. An EXIT message type cancels the replies of all instructions 
+        that are yet to be executed. An ACCEPTED message type does not resolve the reply, ``on_accepted`` 
+        is called with the message id instead (in the thread of the executor). 
+
+        Parameters
+        ----------
+        original_client_message: List[bytes]
+            original message so that the reply can be properly crafted and routed
+        data: Any
+            serializable data to be sent as reply
+
+        Returns
+        -------
+        None
+        """
+        if message_type == EXIT:
+            # Thing stopped executing, whatever remains will never be answered
+            for future in list(self._pending_replies.values()):
+                future.cancel()
+            self._pending_replies.clear()
+            return 
+        if message_type == ACCEPTED:
+            if self.on_accepted is not None:
+                self.on_accepted(original_client_message[CM_INDEX_MESSAGE_ID])
+            return
+        self._resolve(original_client_message, self.craft_reply_from_arguments(original_client_message[CM_INDEX_ADDRESS], 
+                                                        original_client_message[CM_INDEX_CLIENT_TYPE], message_type, 
+                                                        original_client_message[CM_INDEX_MESSAGE_ID], data))
+        self.logger.debug(f"sent reply to client '{original_client_message[CM_INDEX_ADDRESS]}' with msg-ID {original_client_message[CM_INDEX_MESSAGE_ID]}")
+
+
+    async def _handle_invalid_message(self, original_client_message : typing.List[bytes], exception : Exception) -> None:
+        self._resolve(original_client_message, self.craft_reply_from_arguments(original_client_message[CM_INDEX_ADDRESS], 
+                                            original_client_message[CM_INDEX_CLIENT_TYPE], INVALID_MESSAGE, 
+                                            original_client_message[CM_INDEX_MESSAGE_ID], 
+                                            dict(exception=format_exception_as_json(exception))))
+        self.logger.info(f"sent exception message to client '{original_client_message[CM_INDEX_ADDRESS]}'." +
+                            f" exception - {str(exception)}") 	
+
+
+    def exit(self) -> None:
+        for future in list(self._pending_replies.values()):
+            future.cancel()
+        self._pending_replies.clear()
+
+
+
 class ZMQServerPool(BaseZMQServer):
     """
     Implements pool of async ZMQ servers (& their sockets)
@@ -749,18 +1299,20 @@ class ZMQServerPool(BaseZMQServer):
 
     def __init__(self, *, instance_names : typing.Union[typing.List[str], None] = None, **kwargs) -> None:
         self.context = zmq.asyncio.Context()
-        self.poller = zmq.asyncio.Poller()
         self.pool = dict() # type: typing.Dict[str, typing.Union[AsyncZMQServer, AsyncPollingZMQServer]]
         if instance_names:
             for instance_name in instance_names:
                 self.pool[instance_name] = AsyncZMQServer(instance_name=instance_name, 
                                     server_type=ServerTypes.UNKNOWN_TYPE.value, context=self.context, **kwargs)
-            for server in self.pool.values():
-                self.poller.register(server.socket, zmq.POLLIN)
         super().__init__(instance_name="pool", server_type=ServerTypes.POOL.value, **kwargs)
         self.identity = "pool"
         if self.logger is None:
             self.logger = get_default_logger("pool|polling", kwargs.get('log_level',logging.INFO))
+        self.stop_poll = False
+        self._polled_instructions = [] # type: typing.List[typing.List[typing.Any]]
+        self._receiver = SocketReceiver(self._on_instruction, self.logger)
+        for server in self.pool.values():
+            self._receiver.register(server.socket)
 
     def create_socket(self, *, identity : str, bind: bool, context : typing.Union[zmq.asyncio.Context, zmq.Context], 
                 protocol : ZMQ_PROTOCOLS = ZMQ_PROTOCOLS.IPC, socket_type : zmq.SocketType = zmq.ROUTER, **kwargs) -> None:
@@ -774,10 +1326,10 @@ class ZMQServerPool(BaseZMQServer):
             raise TypeError("registration possible for servers only subclass of AsyncZMQServer or AsyncPollingZMQServer." +
                            f" Given type {type(server)}")
         self.pool[server.instance_name] = server 
-        self.poller.register(server.socket, zmq.POLLIN)
+        self._receiver.register(server.socket)
 
     def deregister_server(self, server : typing.Union[AsyncZMQServer, AsyncPollingZMQServer]) -> None:
-        self.poller.unregister(server.socket)
+        self._receiver.unregister(server.socket)
         self.pool.pop(server.instance_name)
 
     @property
@@ -833,30 +1385,28 @@ class ZMQServerPool(BaseZMQServer):
     
     async def poll(self) -> typing.List[typing.List[typing.Any]]:
         """
-        Pool for instruction in the entire server pool. Map the instruction to the correct instance 
-        using the 0th index of the instruction.  
+        Pool for instruction in the entire server pool until ``stop_polling()`` is called. Map the instruction 
+        to the correct instance using the 0th index of the instruction. Each socket is awaited by its own task, 
+        idle sockets are not polled.  
         """
         self.stop_poll = False
-        instructions = []
-        while not self.stop_poll:
-            sockets = await self.poller.poll(self._poll_timeout) 
-            for socket, _ in sockets:
-                while True:
-                    try:
-                        instruction = self.parse_client_message(await socket.recv_multipart(zmq.NOBLOCK))
-                    except zmq.Again:
-                        break
-                    else:
-                        if instruction:
-                            self.logger.debug(f"received instruction from client '{instruction[CM_INDEX_ADDRESS]}' with msg-ID {instruction[CM_INDEX_MESSAGE_ID]}")
-                            instructions.append(instruction)
+        self._polled_instructions = []
+        await self._receiver.run()
+        instructions, self._polled_instructions = self._polled_instructions, []
         return instructions
+    
+    def _on_instruction(self, socket : zmq.asyncio.Socket, message : typing.List[bytes]) -> None:
+        instruction = self.parse_client_message(message)
+        if instruction:
+            self.logger.debug(f"received instruction from client '{instruction[CM_INDEX_ADDRESS]}' with msg-ID {instruction[CM_INDEX_MESSAGE_ID]}")
+            self._polled_instructions.append(instruction)
         
     def stop_polling(self) -> None:
         """
-        stop polling method ``poll()``
+        stop polling method ``poll()``, can be called from any thread
         """
         self.stop_poll = True 
+        self._receiver.stop()
 
     def __getitem__(self, key) -> typing.Union[AsyncZMQServer, AsyncPollingZMQServer]:
         return self.pool[key]
@@ -868,9 +1418,10 @@ class ZMQServerPool(BaseZMQServer):
         return name in self.pool.keys()
     
     def exit(self) -> None:
+        self._receiver.stop()
         for server in self.pool.values():       
             try:
-                self.poller.unregister(server.socket)
+                self._receiver.unregister(server.socket)
                 server.exit()
             except Exception as ex:
                 self.logger.warning(f"could not unregister poller and exit server {server.identity} - {str(ex)}")
@@ -883,6 +1434,181 @@ class ZMQServerPool(BaseZMQServer):
 
     
     
+class IdempotencyKey(typing.NamedTuple):
+    """
+    scope of an idempotency key given by a client in the execution context of an instruction
+    """
+    address : bytes
+    client_type : bytes
+    shared_memory : bool
+    instruction : typing.Union[str, int] # or opcode
+    key : str
+
+
+
+class QueuedInstruction:
+    """
+    An instruction waiting in the queue of ``RPCServer`` to be passed to the ``Thing``. Client type and 
+    message id are kept aside as their position depends on the message format (original or compact).
+    """
+    __slots__ = ['message', 'origin_socket', 'client_type', 'message_id', 'deadline', 'dispatched', 'expired', 
+                'priority', 'idempotency_key']
+
+    def __init__(self, message : typing.List[bytes], origin_socket : zmq.Socket, client_type : bytes, 
+                message_id : bytes) -> None:
+        self.message = message 
+        self.origin_socket = origin_socket
+        self.client_type = client_type
+        self.message_id = message_id
+        self.deadline = None # type: typing.Optional[float]
+        self.dispatched = False
+        self.expired = False
+        self.priority = Priority.NORMAL
+        self.idempotency_key = None # type: typing.Optional[IdempotencyKey]
+
+
+
+class PriorityInstructionQueue:
+    """
+    Queue of ``RPCServer`` with a FIFO lane per priority. The head of the highest priority lane is served first, 
+    unless lower priority instructions were passed over ``starvation_limit`` times in a row, then the instruction 
+    waiting the longest among the heads of all lanes is served, so that bulk instructions still make progress under 
+    a steady load of high priority instructions. 
+
+    Parameters
+    ----------
+    starvation_limit: int, default 32
+        number of consecutive instructions served from the highest lane while other lanes are waiting
+    """
+
+    def __init__(self, starvation_limit : int = 32) -> None:
+        if not isinstance(starvation_limit, int) or starvation_limit < 1:
+            raise ValueError(f"starvation_limit must be an integer greater than 0, given value : {starvation_limit}")
+        self.starvation_limit = starvation_limit
+        self._lanes = dict() # type: typing.Dict[int, deque[typing.Tuple[int, QueuedInstruction]]]
+        self._priorities = [] # of non empty lanes, highest first
+        self._counter = itertools.count() # arrival order across lanes
+        self._passed_over = 0
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+    
+    def append(self, instruction : QueuedInstruction, priority : int = Priority.NORMAL) -> None:
+        lane = self._lanes.get(priority, None)
+        if lane is None:
+            lane = self._lanes[priority] = deque()
+        if len(lane) == 0:
+            self._priorities.append(priority)
+            self._priorities.sort(reverse=True)
+        lane.append((next(self._counter), instruction))
+        self._length += 1
+
+    def _next_lane(self) -> typing.Tuple[int, deque]:
+        priority = self._priorities[0]
+        if len(self._priorities) > 1 and self._passed_over >= self.starvation_limit:
+            priority = min(self._priorities, key=lambda priority: self._lanes[priority][0][0])
+        return priority, self._lanes[priority]
+
+    def peek(self) -> QueuedInstruction:
+        """
+        instruction to be served next, raises IndexError when empty
+        """
+        if self._length == 0:
+            raise IndexError("peek from an empty instruction queue")
+        return self._next_lane()[1][0][1]
+
+    def popleft(self) -> QueuedInstruction:
+        """
+        remove and return the instruction to be served next, raises IndexError when empty
+        """
+        if self._length == 0:
+            raise IndexError("pop from an empty instruction queue")
+        priority, lane = self._next_lane()
+        if len(self._priorities) > 1 and priority == self._priorities[0]:
+            self._passed_over += 1
+        else:
+            self._passed_over = 0
+        _, instruction = lane.popleft()
+        if len(lane) == 0:
+            self._priorities.remove(priority)
+        self._length -= 1
+        return instruction
+
+
+
+class DeadlineScheduler:
+    """
+    Expires queued instructions whose invokation timeout elapsed before they were passed to the ``Thing``. 
+    Deadlines (in ``time.monotonic()`` seconds) are kept in a heap and a single timer is armed for the earliest one, 
+    so that scheduling and expiring a deadline is O(log n) without a task per instruction. Dispatched instructions 
+    are removed lazily. 
+
+    Parameters
+    ----------
+    on_expiry: Callable[[QueuedInstruction], Awaitable]
+        coroutine function called with the expired instruction, for example to send a TIMEOUT to the client 
+    """
+
+    def __init__(self, on_expiry : typing.Callable[[QueuedInstruction], typing.Awaitable[None]]) -> None:
+        self.on_expiry = on_expiry
+        self._heap = [] # type: typing.List[typing.Tuple[float, int, QueuedInstruction]]
+        self._counter = itertools.count() # tie breaker for equal deadlines
+        self._settled = 0 # number of dispatched instructions still in the heap
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._settled
+
+    def schedule(self, instruction : QueuedInstruction, timeout : float) -> None:
+        """
+        expire the instruction after ``timeout`` seconds unless it was dispatched before 
+        """
+        instruction.deadline = time.monotonic() + timeout
+        heapq.heappush(self._heap, (instruction.deadline, next(self._counter), instruction))
+        if self._heap[0][2] is instruction:
+            self._wakeup.set() # new earliest deadline, rearm the timer
+
+    def discard(self, instruction : QueuedInstruction) -> None:
+        """
+        mark an instruction as dispatched, it will not be expired anymore
+        """
+        instruction.dispatched = True
+        if instruction.deadline is None:
+            return 
+        self._settled += 1
+        if self._settled > 64 and self._settled > len(self._heap) // 2:
+            # compact when mostly dispatched instructions remain
+            self._heap = [entry for entry in self._heap if not entry[2].dispatched]
+            heapq.heapify(self._heap)
+            self._settled = 0
+
+    async def run(self) -> None:
+        """
+        expire instructions whose deadline passed, run as a single task until cancelled 
+        """
+        eventloop = asyncio.get_running_loop()
+        while True:
+            now = time.monotonic()
+            while len(self._heap) > 0 and (self._heap[0][2].dispatched or self._heap[0][0] <= now):
+                _, _, instruction = heapq.heappop(self._heap)
+                if instruction.dispatched:
+                    self._settled -= 1
+                    continue
+                instruction.expired = True
+                await self.on_expiry(instruction)
+            timer = None
+            if len(self._heap) > 0:
+                timer = eventloop.call_later(max(self._heap[0][0] - now, 0), self._wakeup.set)
+            try:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+            finally:
+                if timer is not None:
+                    timer.cancel()
+
+
+
 class RPCServer(BaseZMQServer):
     """
     Top level ZMQ RPC server used by ``Thing`` and ``Eventloop``. 
@@ -901,6 +1627,54 @@ class RPCServer(BaseZMQServer):
     poll_timeout: int, default 25
         time in milliseconds to poll the sockets specified under ``procotols``. Useful for calling ``stop_polling()``
         where the max delay to stop polling will be ``poll_timeout``
+    max_in_flight: int, default 8
+        maximum number of instructions tunneled to the ``Thing``'s inproc server before a reply is awaited. 
+        Replies are matched to their origin by message id. Instructions are still executed one after the other 
+        by the ``Thing``, only the tunneling is pipelined. Set to 1 to tunnel strictly one instruction at a time.
+        Instructions which the ``Thing`` hands over to a task (async actions with ``create_task``, threaded and 
+        process pool resources) release their slot once accepted, their concurrency is bounded by the ``Thing``. 
+    direct_dispatch: bool, default False
+        hand over instructions to the ``Thing``'s executor through a thread-safe queue (``ThreadsafeQueueServer``)
+        instead of the inner inproc client & server sockets. Saves one ZMQ round trip within the process per 
+        instruction, the messaging contract with clients remains the same. 
+    queue_high_water_mark: int, default 1024
+        maximum number of instructions waiting to be passed to the ``Thing``, further instructions are rejected 
+        with a BUSY reply (``ServerBusyError`` on the client) until the queue drains. None for no limit. 
+    client_high_water_mark: int, default None
+        same as ``queue_high_water_mark`` but counted for each client (socket identity) separately, so that one 
+        client cannot fill the queue of all. None for no limit. High water marks apply only to instructions of 
+        priority up to ``Priority.NORMAL``, higher priority instructions are queued until the queue holds twice 
+        ``queue_high_water_mark`` instructions.
+    priorities: Dict[str | int, int], default None
+        priority of instructions (and their opcodes) other than ``Priority.NORMAL``, usually generated from the 
+        ``priority`` of the actions and properties of the ``Thing``. Instructions are served highest priority first, 
+        however, a high priority instruction may still wait for up to ``max_in_flight`` instructions already 
+        tunneled to the ``Thing``. 
+    starvation_limit: int, default 32
+        number of consecutive higher priority instructions after which the longest waiting instruction is served 
+        irrespective of its priority, see ``PriorityInstructionQueue``.
+    opcode_epoch: int, default None
+        epoch of the opcode table of the ``Thing`` (see ``get_opcode_epoch()``). Compact messages carrying the opcode 
+        epoch of another table are answered with an invalid message (``OpcodeMismatchError`` on the client) without 
+        being executed. None to pass all messages.
+    shared_memory_slots: int, default 0
+        number of slots of a ``SharedMemoryRing`` offered to IPC & INPROC clients at handshake, through which 
+        out-of-band frames of replies (like numpy arrays) of at least ``shared_memory_threshold`` bytes are passed 
+        instead of the socket. 0 for no ring. 
+    shared_memory_slot_size: int, default 16 MiB
+        size of a slot, larger frames are sent through the socket
+    shared_memory_threshold: int, default 1 MiB
+        smaller frames are sent through the socket
+    shared_memory_lease: float, default 60
+        seconds after which a slot is taken back unless a running client received its frame, so that lost replies 
+        and clients which exited do not hold slots. Replies are to be received by clients within the lease. 
+    idempotency_cache_size: int, default 1024
+        number of recent replies of instructions with an idempotency key (in the execution context) kept to answer 
+        retries. An instruction whose key is known (for the same client, instruction & client type) is not executed 
+        again, it is answered with the reply of the first instruction, or once that reply arrives if it is still being 
+        executed. A key reused with other arguments is answered with an invalid message (``ValueError``). Replies of 
+        instructions which were not executed (timeout, invalid message) are not kept. Frames of a kept reply passed 
+        through the shared memory ring are copied, so that retries receive them inline. 0 to execute every instruction. 
     **kwargs:
         tcp_socket_address: str
             address of the TCP socket, if not given, a random port is chosen
@@ -908,8 +1682,31 @@ class RPCServer(BaseZMQServer):
 
     def __init__(self, instance_name : str, *, server_type : Enum, context : typing.Union[zmq.asyncio.Context, None] = None, 
                 protocols : typing.Union[ZMQ_PROTOCOLS, str, typing.List[ZMQ_PROTOCOLS]] = ZMQ_PROTOCOLS.IPC, 
-                poll_timeout = 25, **kwargs) -> None:
+                poll_timeout = 25, max_in_flight : int = 8, direct_dispatch : bool = False, 
+                queue_high_water_mark : typing.Optional[int] = 1024, client_high_water_mark : typing.Optional[int] = None,
+                priorities : typing.Optional[typing.Dict[typing.Union[str, int], int]] = None, starvation_limit : int = 32,
+                opcode_epoch : typing.Optional[int] = None, shared_memory_slots : int = 0, 
+                shared_memory_slot_size : int = 16 * 1024**2, shared_memory_threshold : int = 1024**2, 
+                shared_memory_lease : typing.Optional[float] = 60, idempotency_cache_size : int = 1024, **kwargs) -> None:
         super().__init__(instance_name=instance_name, server_type=server_type, **kwargs)
+        if not isinstance(max_in_flight, int) or max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be an integer greater than 0, given value : {max_in_flight}")
+        self.max_in_flight = max_in_flight
+        if not isinstance(idempotency_cache_size, int) or idempotency_cache_size < 0:
+            raise ValueError(f"idempotency_cache_size must be an integer not less than 0, given value : {idempotency_cache_size}")
+        self.idempotency_cache_size = idempotency_cache_size
+        for name, value in [('queue_high_water_mark', queue_high_water_mark), 
+                            ('client_high_water_mark', client_high_water_mark)]:
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError(f"{name} must be None or an integer greater than 0, given value : {value}")
+        self.queue_high_water_mark = queue_high_water_mark
+        self.client_high_water_mark = client_high_water_mark
+        self.priorities = priorities or dict() 
+        # instructions of original format messages are deserialized for their priority only when other instructions 
+        # than exit() (of high priority for every Thing) have one, exit() is found in the serialized instruction 
+        self._priorities_of_instructions = any(isinstance(instruction, str) and not instruction.endswith(_EXIT_INSTRUCTION) 
+                                                for instruction in self.priorities)
+        self.opcode_epoch = opcode_epoch
         
         self.identity = f"{instance_name}/rpc-server"
         if isinstance(protocols, list): 
@@ -955,7 +1752,16 @@ class RPCServer(BaseZMQServer):
                             logger=self.logger
                         )        
         # instruction serializing broker
-        self.inner_inproc_client = AsyncZMQClient(
+        self.direct_dispatch = direct_dispatch
+        if direct_dispatch:
+            self.inner_inproc_client = None
+            self.inner_inproc_server = ThreadsafeQueueServer(
+                                        instance_name=f'{self.instance_name}/inner',
+                                        server_type=server_type,
+                                        **kwargs
+                                    ) 
+        else:
+            self.inner_inproc_client = AsyncZMQClient(
                                         server_instance_name=f'{instance_name}/inner', 
                                         identity=f'{instance_name}/tunneler',
                                         client_type=TUNNELER, 
@@ -964,22 +1770,69 @@ class RPCServer(BaseZMQServer):
                                         handshake=False, # handshake manually done later when event loop is run
                                         logger=self.logger
                                     )
-        self.inner_inproc_server = AsyncZMQServer(
+            self.inner_inproc_server = AsyncZMQServer(
                                         instance_name=f'{self.instance_name}/inner', # hardcoded be very careful
                                         server_type=server_type,
                                         context=self.context,
                                         protocol=ZMQ_PROTOCOLS.INPROC, 
                                         **kwargs
                                     )       
-        self._instructions = deque() # type: deque[typing.Tuple[typing.List[bytes], asyncio.Event, asyncio.Future, zmq.Socket]]
+        self.shared_memory_ring = None
+        self._local_handshake_capabilities = HANDSHAKE_CAPABILITIES
+        if shared_memory_slots and (self.ipc_server is not None or self.inproc_server is not None):
+            self.shared_memory_ring = SharedMemoryRing.create(shared_memory_slots, shared_memory_slot_size, 
+                                                            shared_memory_threshold, shared_memory_lease)
+            # replies are crafted by the inner server
+            self.inner_inproc_server.shared_memory_ring = self.shared_memory_ring 
+            capabilities = self.http_serializer.loads(HANDSHAKE_CAPABILITIES)
+            capabilities['shared_memory'] = self.shared_memory_ring.capabilities
+            self._local_handshake_capabilities = self.http_serializer.dumps(capabilities)
+            self.logger.info(f"created shared memory ring '{self.shared_memory_ring.name}' with {shared_memory_slots} " +
+                            f"slots of {shared_memory_slot_size} bytes")
+        self._instructions = PriorityInstructionQueue(starvation_limit)
         self._instructions_event = asyncio.Event()
+        self._deadlines = DeadlineScheduler(self._send_timeout)
+        self._queue_depth = 0 # queued instructions not expired, expired ones leave the deque lazily
+        self._queue_depth_per_client = dict() # type: typing.Dict[bytes, int]
+        self._peak_queue_depth = 0
+        self._rejected = 0
+        self._rejected_per_client = 0 # rejected due to client_high_water_mark
+        self._in_flight = dict() # type: typing.Dict[bytes, typing.Tuple[bytes, zmq.Socket]]
+        self._accepted = set() # type: typing.Set[bytes] # message ids in flight which do not hold a slot
+        self._direct_replies = deque() # type: deque[typing.Tuple[bytes, asyncio.Future]]
+        self._direct_replies_event = asyncio.Event()
+        # replies and retries waiting for a reply are kept along with the digest of the arguments of the first instruction
+        self._idempotent_replies = OrderedDict() # type: OrderedDict[IdempotencyKey, typing.Tuple[bytes, typing.List[bytes]]]
+        self._idempotency_waiters = dict() # type: typing.Dict[IdempotencyKey, typing.Tuple[bytes, typing.List[QueuedInstruction]]]
+        self._idempotency_keys = dict() # type: typing.Dict[bytes, IdempotencyKey] # message id of tunneled instructions
+        self._replayed = 0
+        self._register()
+
+    def _register(self) -> None:
+        """
+        record the sockets of the TCP & IPC servers in the registry of this host (``ThingRegistry``), so that clients 
+        can find the TCP socket bound to a port assigned by the operating system
+        """
+        endpoints = dict()
+        for server in (self.tcp_server, self.ipc_server):
+            if server is not None:
+                endpoints[server.socket_address.split('://', 1)[0].upper()] = server.socket_address
+        if len(endpoints) == 0:
+            return
+        events = self.event_publisher.socket_address
+        try:
+            thing_registry.register(self.instance_name, endpoints, 
+                                    events=events if not events.startswith('inproc://') else None)
+        except OSError as ex:
+            self.logger.warning(f"could not register '{self.instance_name}' in registry of this host - {str(ex)}")
         
 
     async def handshake_complete(self):
         """
         handles inproc client's handshake with ``Thing``'s inproc server
         """
-        await self.inner_inproc_client.handshake_complete()
+        if self.inner_inproc_client is not None:
+            await self.inner_inproc_client.handshake_complete()
 
 
     def prepare(self):
@@ -1016,6 +1869,36 @@ class RPCServer(BaseZMQServer):
             return self.zmq_serializer.loads(message[CM_INDEX_TIMEOUT]) 
         elif client_type == HTTP_SERVER:
             return self.http_serializer.loads(message[CM_INDEX_TIMEOUT])
+
+    def _get_priority_from_instruction(self, message : typing.Tuple[bytes]) -> int:
+        """
+        priority of the instruction (or its opcode) of an original format message
+        """
+        if not self._priorities_of_instructions and _EXIT_INSTRUCTION.encode('utf-8') not in message[CM_INDEX_INSTRUCTION]:
+            return Priority.NORMAL
+        client_type = message[CM_INDEX_CLIENT_TYPE]
+        if client_type == PROXY:
+            instruction = self.zmq_serializer.loads(message[CM_INDEX_INSTRUCTION])
+        elif client_type == HTTP_SERVER:
+            instruction = self.http_serializer.loads(message[CM_INDEX_INSTRUCTION])
+        else:
+            return Priority.NORMAL
+        return self.priorities.get(instruction, Priority.NORMAL)
+
+    def _stamp_deadline(self, instruction : QueuedInstruction) -> None:
+        """
+        replace the timeout of the instruction by its absolute deadline, so that the ``Thing`` can check it once more 
+        before executing (see ``has_expired()``)
+        """
+        message = instruction.message
+        if len(message) == LEGACY_MESSAGE_LENGTH:
+            message[CM_INDEX_TIMEOUT] = DEADLINE.pack(instruction.deadline) if instruction.deadline is not None else EMPTY_BYTE
+        elif instruction.deadline is not None:
+            header = bytearray(message[CM_INDEX_HEADER])
+            version, client_type, message_type, flags, _, opcode, opcode_epoch, id_length = COMPACT_HEADER.unpack_from(header)
+            COMPACT_HEADER.pack_into(header, 0, version, client_type, message_type, flags | FLAG_DEADLINE, 
+                                    instruction.deadline, opcode, opcode_epoch, id_length)
+            message[CM_INDEX_HEADER] = bytes(header)
        
 
     async def poll(self):
@@ -1025,8 +1908,9 @@ class RPCServer(BaseZMQServer):
         """
         self.stop_poll = False
         eventloop = asyncio.get_event_loop()
-        self.inner_inproc_client.handshake()
-        await self.inner_inproc_client.handshake_complete()
+        if self.inner_inproc_client is not None:
+            self.inner_inproc_client.handshake()
+            await self.inner_inproc_client.handshake_complete()
         if self.inproc_server:
             eventloop.call_soon(lambda : asyncio.create_task(self.recv_instruction(self.inproc_server)))
         if self.ipc_server:
@@ -1041,6 +1925,7 @@ class RPCServer(BaseZMQServer):
         """
         self.stop_poll = True
         self._instructions_event.set()
+        thing_registry.deregister(self.instance_name)
         if self.inproc_server is not None:
             def kill_inproc_server(instance_name, context, logger):
                 # this function does not work when written fully async - reason is unknown
@@ -1078,71 +1963,396 @@ class RPCServer(BaseZMQServer):
         eventloop = asyncio.get_event_loop()
         socket = server.socket
         while True:
+            original_instruction = None # only a message received in this iteration is replied on errors
             try:
                 original_instruction = await socket.recv_multipart()
-                if original_instruction[CM_INDEX_MESSAGE_TYPE] == HANDSHAKE:
-                    handshake_task = asyncio.create_task(self._handshake(original_instruction, socket))
-                    eventloop.call_soon(lambda : handshake_task)
+                if len(original_instruction) != LEGACY_MESSAGE_LENGTH:
+                    # compact message, only the header is unpacked, rest is parsed by the Thing
+                    client_type, _, _, timeout, opcode, message_id, instruction_name = unpack_compact_header(
+                                                                                original_instruction[CM_INDEX_HEADER])
+                    instruction = QueuedInstruction(original_instruction, socket, client_type, message_id)
+                    if self.opcode_epoch is not None and unpack_opcode_epoch(original_instruction[CM_INDEX_HEADER]) not in (
+                                                                                        0, self.opcode_epoch):
+                        await self._send_opcode_mismatch(instruction)
+                        continue
+                    if len(self.priorities) > 0:
+                        instruction.priority = self.priorities.get(opcode if opcode >= 0 else instruction_name, 
+                                                                Priority.NORMAL)
+                else:
+                    if original_instruction[CM_INDEX_MESSAGE_TYPE] == HANDSHAKE:
+                        handshake_task = asyncio.create_task(self._handshake(original_instruction, socket))
+                        eventloop.call_soon(lambda : handshake_task)
+                        continue
+                    if original_instruction[CM_INDEX_MESSAGE_TYPE] == EXIT:
+                        break
+                    instruction = QueuedInstruction(original_instruction, socket, original_instruction[CM_INDEX_CLIENT_TYPE],
+                                                    original_instruction[CM_INDEX_MESSAGE_ID])
+                    timeout = self._get_timeout_from_instruction(original_instruction)
+                    if len(self.priorities) > 0:
+                        instruction.priority = self._get_priority_from_instruction(original_instruction)
+                if self.idempotency_cache_size > 0 and await self._replay(instruction):
+                    continue
+                if not self._enqueue(instruction):
+                    self._idempotency_waiters.pop(instruction.idempotency_key, None)
+                    await self._send_busy(instruction)
                     continue
-                if original_instruction[CM_INDEX_MESSAGE_TYPE] == EXIT:
-                    break
-                timeout = self._get_timeout_from_instruction(original_instruction)
-                ready_to_process_event = None
-                timeout_task = None
                 if timeout is not None:
-                    ready_to_process_event = asyncio.Event()
-                    timeout_task = asyncio.create_task(self.process_timeouts(original_instruction, 
-                                                ready_to_process_event, timeout, socket))
-                    eventloop.call_soon(lambda : timeout_task)
+                    self._deadlines.schedule(instruction, timeout)
             except Exception as ex:
+                if original_instruction is None:
+                    # the socket failed, not a message of a client
+                    self.logger.error(f"could not receive message for server '{server.identity}' - {str(ex)}")
+                    raise
+                if len(original_instruction) != LEGACY_MESSAGE_LENGTH:
+                    # cannot be replied without a valid header
+                    self.logger.error(f"dropping message from client '{original_instruction[CM_INDEX_ADDRESS]}' " +
+                                        f"with invalid header - {str(ex)}")
+                    continue
                 # handle invalid message
                 self.logger.error(f"exception occurred for message id {original_instruction[CM_INDEX_MESSAGE_ID]} - {str(ex)}")
                 invalid_message_task = asyncio.create_task(self._handle_invalid_message(original_instruction,
                                                                                 ex, socket))
                 eventloop.call_soon(lambda: invalid_message_task)
             else:
-                self._instructions.append((original_instruction, ready_to_process_event, 
-                                                            timeout_task, socket))
+                self._instructions.append(instruction, instruction.priority)
             self._instructions_event.set()
         self.logger.info(f"stopped polling for server '{server.identity}' {server.socket_address[0:3].upper() if server.socket_address[0:3] in ['ipc', 'tcp'] else 'INPROC'}")
            
 
     async def tunnel_message_to_things(self):
         """
-        message tunneler between external sockets and interal inproc client
+        message tunneler between external sockets and interal inproc client. Up to ``max_in_flight`` instructions 
+        are sent to the inner inproc server without waiting for their replies, which are forwarded by 
+        ``forward_replies_to_clients()``.
         """
+        if self.direct_dispatch:
+            loop = asyncio.get_running_loop()
+            self.inner_inproc_server.on_accepted = lambda message_id: loop.call_soon_threadsafe(self._accept, message_id)
+        reply_forwarder = asyncio.create_task(self.forward_replies_to_clients())
+        deadline_scheduler = asyncio.create_task(self._deadlines.run())
         while not self.stop_poll:
-            if len(self._instructions) > 0:
-                message, ready_to_process_event, timeout_task, origin_socket = self._instructions.popleft()
-                timeout = True 
-                if ready_to_process_event is not None: 
-                    ready_to_process_event.set()
-                    timeout = await timeout_task
-                if ready_to_process_event is None or not timeout:
-                    original_address = message[CM_INDEX_ADDRESS]
-                    message[CM_INDEX_ADDRESS] = self.inner_inproc_client.server_address # replace address
-                    await self.inner_inproc_client.socket.send_multipart(message)
-                    reply = await self.inner_inproc_client.socket.recv_multipart()
-                    reply[SM_INDEX_ADDRESS] = original_address
-                    if reply[SM_INDEX_MESSAGE_TYPE] != ONEWAY:
-                        await origin_socket.send_multipart(reply)
+            if (len(self._instructions) > 0 and len(self._in_flight) - len(self._accepted) < self.max_in_flight and 
+                    self._instructions.peek().message_id not in self._in_flight):
+                # an instruction whose message id is already in flight is held back until its predecessor is answered
+                instruction = self._instructions.popleft()
+                if not instruction.expired: 
+                    self._dequeue(instruction)
+                    self._deadlines.discard(instruction)
+                    message, origin_socket = instruction.message, instruction.origin_socket
+                    self._stamp_deadline(instruction)
+                    self._in_flight[instruction.message_id] = (message[CM_INDEX_ADDRESS], origin_socket)
+                    if instruction.idempotency_key is not None:
+                        self._idempotency_keys[instruction.message_id] = instruction.idempotency_key
+                    if self.direct_dispatch:
+                        reply = asyncio.wrap_future(self.inner_inproc_server.put_instruction(message))
+                        reply.add_done_callback(functools.partial(self._direct_reply_done, instruction.message_id))
+                    else:
+                        message[CM_INDEX_ADDRESS] = self.inner_inproc_client.server_address # replace address
+                        await self.inner_inproc_client.socket.send_multipart(message, copy=copy_frames(message))
             else:
                 await self._instructions_event.wait()
                 self._instructions_event.clear()
+        while len(self._in_flight) > 0 and not reply_forwarder.done():
+            # wait for replies of instructions already in flight, for example, the exit() of the Thing itself
+            self._instructions_event.clear()
+            await self._instructions_event.wait()
+        for task in [reply_forwarder, deadline_scheduler]:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self.shared_memory_ring is not None:
+            self.shared_memory_ring.close() # clients keep the memory of the replies they hold
         self.logger.info("stopped tunneling messages to things")
 
-    async def process_timeouts(self, original_client_message : typing.List, ready_to_process_event : asyncio.Event,
-                               timeout : typing.Optional[float], origin_socket : zmq.Socket) -> bool:
+    async def forward_replies_to_clients(self):
         """
-        replies timeout to client if timeout occured and prevents the instruction from being executed. 
+        receives replies of tunneled instructions from the inner inproc client (or from the futures when dispatching
+        directly) and sends them to the socket & address where the instruction originated, matched by message id. 
+        Returns when the ``Thing`` signals it stopped executing instructions with an EXIT message, otherwise 
+        cancelled by ``tunnel_message_to_things()`` once tunneling stops.
         """
+        if self.direct_dispatch:
+            recv_reply = self._recv_direct_reply
+        else:
+            await self.inner_inproc_client.handshake_complete() # handshake reply is consumed by the client itself
+            recv_reply = self.inner_inproc_client.socket.recv_multipart
+        while True:
+            reply = await recv_reply()
+            if reply[SM_INDEX_MESSAGE_TYPE] == EXIT:
+                if len(self._in_flight) > 0:
+                    self.logger.warning(f"{len(self._in_flight)} instruction(s) remain unanswered as the Thing stopped executing")
+                self._instructions_event.set()
+                return 
+            if reply[SM_INDEX_MESSAGE_TYPE] == ACCEPTED:
+                self._accept(reply[SM_INDEX_MESSAGE_ID])
+                continue
+            try:
+                original_address, origin_socket = self._in_flight.pop(reply[SM_INDEX_MESSAGE_ID])
+            except KeyError:
+                self.logger.warning(f"received reply for unknown message id {reply[SM_INDEX_MESSAGE_ID]}, dropping it.")
+                continue
+            self._accepted.discard(reply[SM_INDEX_MESSAGE_ID])
+            idempotency_key = self._idempotency_keys.pop(reply[SM_INDEX_MESSAGE_ID], None)
+            if idempotency_key is not None:
+                kept_reply = self._detach_from_shared_memory(idempotency_key, reply)
+            if reply[SM_INDEX_MESSAGE_TYPE] != ONEWAY:
+                reply[SM_INDEX_ADDRESS] = original_address
+                try:
+                    await origin_socket.send_multipart(reply, copy=copy_frames(reply))
+                except Exception as ex:
+                    self.logger.error(f"could not send reply for message id {reply[SM_INDEX_MESSAGE_ID]} - {str(ex)}")
+            if idempotency_key is not None:
+                await self._settle_idempotency_key(idempotency_key, kept_reply)
+            self._instructions_event.set() # one more instruction can be tunneled
+
+    def _accept(self, message_id : bytes) -> None:
+        # the Thing executes the instruction in a task, its slot is given to the next instruction
+        if message_id in self._in_flight:
+            self._accepted.add(message_id)
+            self._instructions_event.set()
+
+    def _direct_reply_done(self, message_id : bytes, reply : asyncio.Future) -> None:
+        self._direct_replies.append((message_id, reply))
+        self._direct_replies_event.set()
+
+    async def _recv_direct_reply(self) -> typing.List[bytes]:
+        while True:
+            while len(self._direct_replies) > 0:
+                message_id, reply = self._direct_replies.popleft()
+                if not reply.cancelled():
+                    return reply.result()
+                # executor stopped before executing the instruction, nothing will be sent
+                self._in_flight.pop(message_id, None)
+                self._accepted.discard(message_id)
+                self._instructions_event.set()
+            self._direct_replies_event.clear()
+            await self._direct_replies_event.wait()
+
+    def _enqueue(self, instruction : QueuedInstruction) -> bool:
+        """
+        count the instruction in the queue depth unless a high water mark is reached, returns False when the 
+        instruction has to be rejected. Instructions of higher than normal priority are rejected only when the 
+        queue holds twice ``queue_high_water_mark`` instructions.
+        """
+        address = instruction.message[CM_INDEX_ADDRESS]
+        client_depth = self._queue_depth_per_client.get(address, 0)
+        if instruction.priority <= Priority.NORMAL:
+            if self.queue_high_water_mark is not None and self._queue_depth >= self.queue_high_water_mark:
+                self._rejected += 1
+                return False
+            if self.client_high_water_mark is not None and client_depth >= self.client_high_water_mark:
+                self._rejected += 1
+                self._rejected_per_client += 1
+                return False
+        elif self.queue_high_water_mark is not None and self._queue_depth >= 2 * self.queue_high_water_mark:
+            self._rejected += 1
+            return False
+        self._queue_depth += 1
+        self._queue_depth_per_client[address] = client_depth + 1
+        if self._queue_depth > self._peak_queue_depth:
+            self._peak_queue_depth = self._queue_depth
+        return True
+
+    def _dequeue(self, instruction : QueuedInstruction) -> None:
+        """
+        remove the instruction from the queue depth, once passed to the ``Thing`` or expired
+        """
+        address = instruction.message[CM_INDEX_ADDRESS]
+        self._queue_depth -= 1
+        client_depth = self._queue_depth_per_client.pop(address) - 1
+        if client_depth > 0:
+            self._queue_depth_per_client[address] = client_depth
+
+    @property
+    def queue_stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        depth of the instruction queue, its peak, number of instructions rejected due to the high water marks, 
+        number of instructions answered with the reply of an earlier instruction with the same idempotency key and
+        number of instructions in flight, of which accepted ones are executed in a task by the ``Thing``
+        """
+        return dict(
+            depth=self._queue_depth,
+            peak_depth=self._peak_queue_depth,
+            high_water_mark=self.queue_high_water_mark,
+            client_high_water_mark=self.client_high_water_mark,
+            rejected=self._rejected,
+            rejected_due_to_client_high_water_mark=self._rejected_per_client,
+            idempotent_replies=len(self._idempotent_replies),
+            replayed=self._replayed,
+            in_flight=len(self._in_flight),
+            accepted=len(self._accepted)
+        )
+
+    async def _send_busy(self, instruction : QueuedInstruction) -> None:
+        """
+        replies busy to client when the instruction was rejected as the queue is full, the instruction is not executed.
+        """
+        self.logger.debug(f"rejecting message id {instruction.message_id} from client " + 
+                            f"'{instruction.message[CM_INDEX_ADDRESS]}', queue full")
         try:
-            await asyncio.wait_for(ready_to_process_event.wait(), timeout)
-            return False 
-        except TimeoutError:    
-            await origin_socket.send_multipart(self.craft_reply_from_arguments(original_client_message[CM_INDEX_ADDRESS], 
-                original_client_message[CM_INDEX_CLIENT_TYPE], TIMEOUT, original_client_message[CM_INDEX_MESSAGE_ID]))
+            await instruction.origin_socket.send_multipart(self.craft_reply_from_arguments(
+                                            instruction.message[CM_INDEX_ADDRESS], instruction.client_type, BUSY, 
+                                            instruction.message_id, dict(exception=format_exception_as_json(
+                                                ServerBusyError(f"'{self.instance_name}' is busy, " +
+                                                                f"{self._queue_depth} instructions queued")))))
+        except Exception as ex:
+            self.logger.error(f"could not send busy for message id {instruction.message_id} - {str(ex)}")
+
+    async def _send_opcode_mismatch(self, instruction : QueuedInstruction) -> None:
+        """
+        replies invalid message to a client which sent opcodes of another opcode table, the instruction is not executed
+        """
+        self.logger.warning(f"rejecting message id {instruction.message_id} from client " + 
+                            f"'{instruction.message[CM_INDEX_ADDRESS]}', opcodes of another opcode table")
+        try:
+            await instruction.origin_socket.send_multipart(self.craft_reply_from_arguments(
+                                            instruction.message[CM_INDEX_ADDRESS], instruction.client_type, 
+                                            INVALID_MESSAGE, instruction.message_id, dict(exception=format_exception_as_json(
+                                                OpcodeMismatchError(f"opcodes of '{self.instance_name}' changed, " + 
+                                                                    "fetch the opcodes again")))))
+        except Exception as ex:
+            self.logger.error(f"could not send invalid message for message id {instruction.message_id} - {str(ex)}")
+
+    async def _send_timeout(self, instruction : QueuedInstruction) -> None:
+        """
+        replies timeout to client when the instruction could not be passed to the ``Thing`` within its invokation 
+        timeout, the instruction is not executed. Called by the deadline scheduler.
+        """
+        self._dequeue(instruction)
+        # retries waiting for the reply of this instruction time out as well
+        for expired in [instruction] + self._idempotency_waiters.pop(instruction.idempotency_key, (None, []))[1]:
+            try:
+                await expired.origin_socket.send_multipart(self.craft_reply_from_arguments(
+                                                expired.message[CM_INDEX_ADDRESS], expired.client_type, TIMEOUT, 
+                                                expired.message_id))
+            except Exception as ex:
+                self.logger.error(f"could not send timeout for message id {expired.message_id} - {str(ex)}")
+
+    def _get_idempotency_key(self, instruction : QueuedInstruction) -> typing.Optional[IdempotencyKey]:
+        """
+        idempotency key of the execution context of the instruction, scoped by the client (socket identity) and 
+        the instruction (or its opcode). Also scoped by the client type and whether the client reads frames from the 
+        shared memory ring, as replies are formatted differently for these clients. 
+        """
+        message = instruction.message
+        if len(message) == LEGACY_MESSAGE_LENGTH:
+            index = CM_INDEX_EXECUTION_CONTEXT
+        elif len(message) > CM_INDEX_COMPACT_EXECUTION_CONTEXT:
+            index = CM_INDEX_COMPACT_EXECUTION_CONTEXT
+        else:
+            return None
+        if IDEMPOTENCY_KEY not in message[index]: # most instructions do not need deserializing the context
+            return None
+        serializer = self.zmq_serializer if instruction.client_type == PROXY else self.http_serializer
+        context = serializer.loads(message[index]) # type: typing.Dict[str, typing.Any]
+        key = context.get('idempotency_key', None)
+        if key is None:
+            return None
+        if index == CM_INDEX_EXECUTION_CONTEXT:
+            shared_memory = context.get('shared_memory', False)
+            instruction_or_opcode = serializer.loads(message[CM_INDEX_INSTRUCTION])
+        else:
+            _, _, flags, _, opcode, _, instruction_str = unpack_compact_header(message[CM_INDEX_HEADER])
+            shared_memory = bool(flags & FLAG_SHARED_MEMORY)
+            instruction_or_opcode = opcode if opcode >= 0 else instruction_str
+        return IdempotencyKey(message[CM_INDEX_ADDRESS], instruction.client_type, shared_memory, 
+                            instruction_or_opcode, key)
+
+    @staticmethod
+    def _get_arguments_digest(message : typing.List[bytes]) -> bytes:
+        """
+        digest of the (serialized) arguments of an instruction, to detect an idempotency key reused with other arguments
+        """
+        index = CM_INDEX_ARGUMENTS if len(message) == LEGACY_MESSAGE_LENGTH else CM_INDEX_COMPACT_ARGUMENTS
+        return hashlib.blake2b(message[index], digest_size=16).digest()
+
+    async def _replay(self, instruction : QueuedInstruction) -> bool:
+        """
+        answer the instruction with the reply of an earlier instruction with the same idempotency key, or wait for 
+        that reply if the earlier instruction is still being executed. Returns False if the instruction has to be 
+        executed.
+        """
+        key = instruction.idempotency_key = self._get_idempotency_key(instruction)
+        if key is None:
+            return False
+        digest = self._get_arguments_digest(instruction.message)
+        digest_and_reply = self._idempotent_replies.get(key, None)
+        if digest_and_reply is not None:
+            if digest_and_reply[0] != digest:
+                await self._send_reused_idempotency_key(instruction)
+                return True
+            self._idempotent_replies.move_to_end(key)
+            self._replayed += 1
+            await self._send_replayed_reply(instruction, digest_and_reply[1])
+            return True
+        digest_and_waiters = self._idempotency_waiters.get(key, None)
+        if digest_and_waiters is not None:
+            if digest_and_waiters[0] != digest:
+                await self._send_reused_idempotency_key(instruction)
+                return True
+            self._replayed += 1
+            digest_and_waiters[1].append(instruction)
             return True
+        self._idempotency_waiters[key] = (digest, [])
+        return False
+
+    async def _send_reused_idempotency_key(self, instruction : QueuedInstruction) -> None:
+        """
+        replies invalid message to a client which reused an idempotency key with other arguments, the instruction 
+        is neither executed nor answered with the reply of the first instruction
+        """
+        self.logger.warning(f"idempotency key '{instruction.idempotency_key.key}' reused with other arguments " +
+                            f"by message id {instruction.message_id}")
+        try:
+            await instruction.origin_socket.send_multipart(self.craft_reply_from_arguments(
+                                            instruction.message[CM_INDEX_ADDRESS], instruction.client_type, 
+                                            INVALID_MESSAGE, instruction.message_id, dict(exception=format_exception_as_json(
+                                                ValueError("idempotency key reused with different arguments, " + 
+                                                            "use a new key for a different instruction")))))
+        except Exception as ex:
+            self.logger.error(f"could not send invalid message for message id {instruction.message_id} - {str(ex)}")
+
+    def _detach_from_shared_memory(self, key : IdempotencyKey, 
+                                reply : typing.List[bytes]) -> typing.List[bytes]:
+        """
+        the reply with frames passed through the shared memory ring copied inline, as the slots are released by the 
+        client of the first instruction. To be called before the reply is sent. 
+        """
+        if not key.shared_memory or self.shared_memory_ring is None or len(reply) <= SM_INDEX_OUT_OF_BAND_DATA:
+            return reply
+        frame_map = reply[SM_INDEX_OUT_OF_BAND_DATA]
+        frames = reply[SM_INDEX_OUT_OF_BAND_DATA + 1:]
+        return reply[:SM_INDEX_OUT_OF_BAND_DATA] + [bytes(len(frames))] + [
+                    self.shared_memory_ring.copy(frame) if frame_map[index] else frame 
+                    for index, frame in enumerate(frames)]
+
+    async def _settle_idempotency_key(self, key : IdempotencyKey, reply : typing.List[bytes]) -> None:
+        """
+        keep the reply of an executed instruction with an idempotency key & answer the retries that waited for it
+        """
+        digest, waiters = self._idempotency_waiters.pop(key, (None, []))
+        if reply[SM_INDEX_MESSAGE_TYPE] in (REPLY, EXCEPTION, ONEWAY) and digest is not None: # executed
+            self._idempotent_replies[key] = (digest, reply)
+            self._idempotent_replies.move_to_end(key)
+            while len(self._idempotent_replies) > self.idempotency_cache_size:
+                self._idempotent_replies.popitem(last=False)
+        for waiter in waiters:
+            await self._send_replayed_reply(waiter, reply)
+
+    async def _send_replayed_reply(self, instruction : QueuedInstruction, reply : typing.List[bytes]) -> None:
+        if reply[SM_INDEX_MESSAGE_TYPE] == ONEWAY:
+            return
+        self.logger.debug(f"answering message id {instruction.message_id} with the reply of message id " + 
+                        f"{reply[SM_INDEX_MESSAGE_ID]}, same idempotency key")
+        reply = list(reply)
+        reply[SM_INDEX_ADDRESS] = instruction.message[CM_INDEX_ADDRESS]
+        reply[SM_INDEX_MESSAGE_ID] = instruction.message_id
+        try:
+            await instruction.origin_socket.send_multipart(reply, copy=copy_frames(reply))
+        except Exception as ex:
+            self.logger.error(f"could not send reply for message id {instruction.message_id} - {str(ex)}")
 
     async def _handle_invalid_message(self, original_client_message: builtins.list[builtins.bytes], 
                                 exception: builtins.Exception, originating_socket : zmq.Socket) -> None:
@@ -1154,10 +2364,14 @@ class RPCServer(BaseZMQServer):
     
     async def _handshake(self, original_client_message: builtins.list[builtins.bytes],
                                     originating_socket : zmq.Socket) -> None:
+        if self.tcp_server is not None and originating_socket is self.tcp_server.socket:
+            capabilities = HANDSHAKE_CAPABILITIES 
+        else:
+            capabilities = self._local_handshake_capabilities # shared memory ring is offered to local clients 
         await originating_socket.send_multipart(self.craft_reply_from_arguments(
                 original_client_message[CM_INDEX_ADDRESS], 
                 original_client_message[CM_INDEX_CLIENT_TYPE], HANDSHAKE, original_client_message[CM_INDEX_MESSAGE_ID],
-                EMPTY_DICT))
+                EMPTY_DICT, capabilities))
         self.logger.info("sent handshake to client '{}'".format(original_client_message[CM_INDEX_ADDRESS]))
 
 
@@ -1172,14 +2386,772 @@ class RPCServer(BaseZMQServer):
             self.inproc_server.exit()
             self.ipc_server.exit()
             self.tcp_server.exit()
-            self.inner_inproc_client.exit()
+            self.inner_inproc_server.exit() if self.direct_dispatch else self.inner_inproc_client.exit()
         except:
             pass 
         self.context.term()
         self.logger.info("terminated context of socket '{}' of type '{}'".format(self.identity, self.__class__))
 
+
+
+class BrokerWorker:
+    """
+    A replica of a ``Thing`` behind a ``LoadBalancingBroker`` along with its health, i.e. whether it is connected 
+    and the number of instructions it was given, answered and could not answer as it disconnected.
+    """
+    __slots__ = ['client', 'socket_address', 'alive', 'outstanding', 'completed', 'failed', 'disconnects']
+
+    def __init__(self, client : "AsyncZMQClient", socket_address : str) -> None:
+        self.client = client
+        self.socket_address = socket_address
+        self.alive = False
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.disconnects = 0
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return dict(
+            socket_address=self.socket_address,
+            alive=self.alive,
+            outstanding=self.outstanding,
+            completed=self.completed,
+            failed=self.failed,
+            disconnects=self.disconnects
+        )
+
+
+
+class LoadBalancingBroker(BaseZMQServer):
+    """
+    Broker accepting clients for one logical instance name and distributing their instructions to replicas of the 
+    ``Thing`` (workers), each run by its own ``EventLoop`` & ``RPCServer``, for example to scale a read-heavy Thing. 
+    Clients connect to the broker exactly like to a ``Thing`` (the broker answers handshakes), each instruction is 
+    passed to the connected worker with the least outstanding instructions, ties are broken round robin. 
+    Replies are routed back to the client by message id. 
+    
+    The workers run under the same instance name as the broker, as instructions contain the instance name, but 
+    listen on different TCP sockets (``thing.run(zmq_protocols='TCP', tcp_socket_address=...)``) given 
+    here as ``worker_socket_addresses``. Each worker executes the instructions it was given independently, so 
+    property writes and other state changes reach only one of them. 
+
+    A worker is alive once it answered the handshake of the broker. When it disconnects, the instructions it did not 
+    answer are answered with a ``ConnectionAbortedError`` (they may or may not have been executed) and it is given no 
+    more instructions until it answers a handshake again. Instructions received while no worker is alive are held 
+    until one is. See ``stats`` for the health of each worker. 
+
+    Parameters
+    ----------
+    instance_name: str
+        instance name of the ``Thing`` served by the workers
+    worker_socket_addresses: List[str]
+        TCP socket addresses of the workers, like "tcp://localhost:60001". The IPC address of a worker, like 
+        "ipc:///tmp/hololinked/my-thing.ipc", may be given when the broker itself is not bound to IPC.
+    protocols: List[str, Enum], default [ZMQ_PROTOCOLS.IPC]
+        protocols on which clients are accepted, IPC & INPROC are bound under the instance name. 
+    context: Optional, zmq.asyncio.Context
+        ZeroMQ Context object to use, automatically created when None is supplied.
+    **kwargs:
+        tcp_socket_address: str
+            address of the TCP socket for clients, if not given, a random port is chosen
+        identity: str
+            identity of the broker towards the workers, default "<instance name>/broker"
+    """
+
+    def __init__(self, instance_name : str, worker_socket_addresses : typing.List[str], *, 
+                protocols : typing.Union[ZMQ_PROTOCOLS, str, typing.List[ZMQ_PROTOCOLS]] = ZMQ_PROTOCOLS.IPC,
+                context : typing.Union[zmq.asyncio.Context, None] = None, **kwargs) -> None:
+        super().__init__(instance_name=instance_name, server_type=ServerTypes.THING.value, **kwargs)
+        if not isinstance(worker_socket_addresses, (list, tuple)) or len(worker_socket_addresses) == 0:
+            raise ValueError("at least one worker socket address is required")
+        if isinstance(protocols, (str, ZMQ_PROTOCOLS)):
+            protocols = [protocols]
+        self.identity = kwargs.pop('identity', None) or f"{instance_name}/broker"
+        if self.logger is None:
+            self.logger = get_default_logger('{}|{}'.format(self.__class__.__name__, instance_name), 
+                                            kwargs.get('log_level', logging.INFO))
+        self._terminate_context = context is None
+        self.context = context or zmq.asyncio.Context()
+        tcp_socket_address = kwargs.pop('tcp_socket_address', None)
+        self.servers = [] # type: typing.List[AsyncPollingZMQServer]
+        for protocol in [ZMQ_PROTOCOLS.TCP, ZMQ_PROTOCOLS.IPC, ZMQ_PROTOCOLS.INPROC]:
+            if protocol in protocols or protocol.name in protocols:
+                self.servers.append(AsyncPollingZMQServer(instance_name=instance_name, server_type=self.server_type, 
+                                        context=self.context, protocol=protocol, logger=self.logger, 
+                                        socket_address=tcp_socket_address if protocol == ZMQ_PROTOCOLS.TCP else None,
+                                        zmq_serializer=self.zmq_serializer, http_serializer=self.http_serializer))
+        self.workers = [] # type: typing.List[BrokerWorker]
+        for index, socket_address in enumerate(worker_socket_addresses):
+            client = AsyncZMQClient(server_instance_name=instance_name, identity=f"{self.identity}|{index}", 
+                                    client_type=PROXY, handshake=False, protocol=socket_address.split('://', 1)[0].upper(), 
+                                    socket_address=socket_address, context=self.context, logger=self.logger,
+                                    zmq_serializer=self.zmq_serializer, http_serializer=self.http_serializer)
+            self.workers.append(BrokerWorker(client, socket_address))
+        self._in_flight = dict() # type: typing.Dict[bytes, typing.Tuple[bytes, bytes, zmq.asyncio.Socket, BrokerWorker]]
+        self._pending = deque() # type: deque[typing.Tuple[typing.List[bytes], zmq.asyncio.Socket, bytes, bytes, bool]]
+        self._next_worker = 0
+        self._loop = None # type: typing.Optional[asyncio.AbstractEventLoop]
+        self._stopped = None # type: typing.Optional[asyncio.Event]
+
+    async def run(self) -> None:
+        """
+        accept instructions from clients and replies from workers until ``stop()`` is called
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        tasks = [asyncio.create_task(self._route_instructions(server)) for server in self.servers]
+        tasks += [asyncio.create_task(self._route_replies(worker)) for worker in self.workers]
+        self.logger.info(f"broker for '{self.instance_name}' started with {len(self.workers)} workers")
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.logger.info(f"broker for '{self.instance_name}' stopped")
+
+    def stop(self) -> None:
+        """
+        stop the broker and return from ``run()``, can be called from any thread
+        """
+        if self._stopped is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._stopped.set)
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        health of each worker, number of instructions in flight and held until a worker is alive
+        """
+        return dict(
+            workers=[worker.stats for worker in self.workers],
+            in_flight=len(self._in_flight),
+            pending=len(self._pending)
+        )
+
+    def _get_instruction_info(self, message : typing.List[bytes]) -> typing.Tuple[bytes, bytes, bool]:
+        """
+        client type, message id and whether no reply is expected (oneway), without parsing the whole message
+        """
+        if len(message) != LEGACY_MESSAGE_LENGTH:
+            client_type, _, flags, _, _, message_id, _ = unpack_compact_header(message[CM_INDEX_HEADER])
+            return client_type, message_id, bool(flags & FLAG_ONEWAY)
+        client_type = message[CM_INDEX_CLIENT_TYPE]
+        oneway = False
+        if b'oneway' in message[CM_INDEX_EXECUTION_CONTEXT]:
+            serializer = self.zmq_serializer if client_type == PROXY else self.http_serializer
+            oneway = serializer.loads(message[CM_INDEX_EXECUTION_CONTEXT]).get('oneway', False)
+        return client_type, message[CM_INDEX_MESSAGE_ID], oneway
+
+    async def _route_instructions(self, server : "AsyncPollingZMQServer") -> None:
+        while True:
+            message = await server.socket.recv_multipart()
+            try:
+                if len(message) == LEGACY_MESSAGE_LENGTH and message[CM_INDEX_MESSAGE_TYPE] == HANDSHAKE:
+                    await server.socket.send_multipart(self.craft_reply_from_arguments(message[CM_INDEX_ADDRESS],
+                                                message[CM_INDEX_CLIENT_TYPE], HANDSHAKE, message[CM_INDEX_MESSAGE_ID],
+                                                EMPTY_DICT, HANDSHAKE_CAPABILITIES))
+                    continue
+                if len(message) == LEGACY_MESSAGE_LENGTH and message[CM_INDEX_MESSAGE_TYPE] == EXIT:
+                    continue
+                client_type, message_id, oneway = self._get_instruction_info(message)
+                if await self._answer_locally(server.socket, message, client_type, message_id, oneway):
+                    continue
+            except Exception as ex:
+                self.logger.error(f"dropping message from client '{message[CM_INDEX_ADDRESS]}' - {str(ex)}")
+                continue
+            self._pending.append((message, server.socket, client_type, message_id, oneway))
+            await self._dispatch()
+
+    async def _answer_locally(self, origin_socket : zmq.asyncio.Socket, message : typing.List[bytes], 
+                            client_type : bytes, message_id : bytes, oneway : bool) -> bool:
+        """
+        answer an instruction without passing it to a worker, returns True if answered. The broker answers none.
+        """
+        return False
+
+    async def _dispatch(self) -> None:
+        """
+        pass held instructions to the alive worker with the least outstanding instructions
+        """
+        while len(self._pending) > 0:
+            message, origin_socket, client_type, message_id, oneway = self._pending[0]
+            if message_id in self._in_flight:
+                return # held back until the instruction with the same message id is answered, like RPCServer
+            worker = None
+            for offset in range(len(self.workers)):
+                candidate = self.workers[(self._next_worker + offset) % len(self.workers)]
+                if candidate.alive and (worker is None or candidate.outstanding < worker.outstanding):
+                    worker = candidate
+            if worker is None:
+                return # held until a worker is alive
+            self._next_worker = (self.workers.index(worker) + 1) % len(self.workers)
+            self._pending.popleft()
+            original_address = message[CM_INDEX_ADDRESS]
+            message[CM_INDEX_ADDRESS] = worker.client.server_address
+            if oneway:
+                worker.completed += 1
+            else:
+                self._in_flight[message_id] = (original_address, client_type, origin_socket, worker)
+                worker.outstanding += 1
+            try:
+                await worker.client.socket.send_multipart(message, copy=copy_frames(message))
+            except Exception as ex:
+                self.logger.error(f"could not pass message id {message_id} to worker '{worker.socket_address}' - {str(ex)}")
+
+    async def _route_replies(self, worker : BrokerWorker) -> None:
+        client = worker.client
+        while True:
+            try:
+                await client._handshake(timeout=None)
+            except ConnectionAbortedError:
+                continue # reply to an instruction of before the disconnect, handshake again 
+            worker.alive = True
+            self.logger.info(f"worker '{worker.socket_address}' of '{self.instance_name}' is alive")
+            self._on_worker_alive(worker)
+            await self._dispatch()
+            while worker.alive:
+                for socket, _ in await client.poller.poll():
+                    message = await socket.recv_multipart()
+                    if socket is client.socket:
+                        await self._forward_reply(worker, message)
+                        continue
+                    try:
+                        client.parse_server_message(message)
+                    except ConnectionAbortedError:
+                        await self._fail_worker(worker)
+
+    def _on_worker_alive(self, worker : BrokerWorker) -> None:
+        """
+        called when a worker answered the handshake of the broker, before it is given instructions
+        """
+        pass
+
+    async def _forward_reply(self, worker : BrokerWorker, reply : typing.List[bytes]) -> None:
+        if reply[SM_INDEX_MESSAGE_TYPE] == HANDSHAKE:
+            return
+        try:
+            original_address, _, origin_socket, _ = self._in_flight.pop(reply[SM_INDEX_MESSAGE_ID])
+        except KeyError:
+            self.logger.warning(f"received reply for unknown message id {reply[SM_INDEX_MESSAGE_ID]}, dropping it.")
+            return
+        worker.outstanding -= 1
+        worker.completed += 1
+        reply[SM_INDEX_ADDRESS] = original_address
+        try:
+            await origin_socket.send_multipart(reply, copy=copy_frames(reply))
+        except Exception as ex:
+            self.logger.error(f"could not send reply for message id {reply[SM_INDEX_MESSAGE_ID]} - {str(ex)}")
+        await self._dispatch()
+
+    async def _fail_worker(self, worker : BrokerWorker) -> None:
+        """
+        stop passing instructions to a disconnected worker and answer its outstanding instructions with an exception
+        """
+        worker.alive = False
+        worker.disconnects += 1
+        self.logger.error(f"worker '{worker.socket_address}' of '{self.instance_name}' disconnected with " +
+                        f"{worker.outstanding} outstanding instructions")
+        for message_id, (original_address, client_type, origin_socket, owner) in list(self._in_flight.items()):
+            if owner is not worker:
+                continue
+            self._in_flight.pop(message_id)
+            worker.outstanding -= 1
+            worker.failed += 1
+            try:
+                await origin_socket.send_multipart(self.craft_reply_from_arguments(original_address, client_type, 
+                                            EXCEPTION, message_id, dict(exception=format_exception_as_json(
+                                                ConnectionAbortedError(f"worker of '{self.instance_name}' " +
+                                                    "disconnected before replying, the instruction may have been executed")))))
+            except Exception as ex:
+                self.logger.error(f"could not send exception for message id {message_id} - {str(ex)}")
+        await self._dispatch() # instructions with the same message id as a failed one
+
+    def exit(self) -> None:
+        for worker in self.workers:
+            worker.client.exit()
+        for server in self.servers:
+            server.exit()
+        if self._terminate_context:
+            self.context.term()
+            self.logger.info(f"terminated context of broker '{self.identity}'")
+
+
+
+
+class ThingReplica(LoadBalancingBroker):
+    """
+    Read-only replica of a ``Thing`` (the primary), which keeps a snapshot of the properties of the primary and 
+    answers property reads and the Thing Description from it, without passing them to the primary, for example for 
+    dashboards with many viewers. Property writes, actions and everything else are passed to the primary. 
+    Clients connect to the replica exactly like to the primary. 
+
+    The snapshot is read from the primary when connected and refreshed every ``refresh_interval`` seconds. Observable 
+    properties are also updated as soon as their change event arrives. A property written through the replica is 
+    read from the primary until the next refresh, so that clients read their own writes. Otherwise reads may lag behind 
+    the primary by up to ``refresh_interval``, especially for properties changed by actions. Property reads are passed 
+    to the primary when a refresh failed or is late by more than ``refresh_interval``, until the next refresh succeeds. 
+    When the primary disconnects, the snapshot is dropped and instructions are held until it is back 
+    (see ``LoadBalancingBroker``). 
+
+    The replica runs under the instance name of the primary, as instructions contain the instance name, therefore 
+    both cannot be bound to IPC on the same host. By default the replica accepts clients on TCP.   
+
+    Parameters
+    ----------
+    instance_name: str
+        instance name of the primary ``Thing``
+    primary_socket_address: str
+        TCP or IPC socket address of the primary, like "tcp://my-pc:60000" or "ipc:///tmp/hololinked/my-thing.ipc"
+    protocols: List[str, Enum], default [ZMQ_PROTOCOLS.TCP]
+        protocols on which clients are accepted
+    refresh_interval: float, default 1
+        seconds between two reads of all properties from the primary, None reads once after connecting 
+    properties: List[str], optional
+        names of the properties kept in the snapshot, all properties when None. Use it to leave out large or 
+        slow to read properties. Properties in ``unreplicated_properties`` (like ``queue_stats``), which describe 
+        the server of the primary rather than the ``Thing``, are always read from the primary.
+    context: Optional, zmq.asyncio.Context
+        ZeroMQ Context object to use, automatically created when None is supplied.
+    **kwargs:
+        tcp_socket_address: str
+            address of the TCP socket for clients, if not given, a random port is chosen
+        invokation_timeout: float, default 5
+            seconds to wait for the primary to answer a read of the snapshot
+    """
+    # instructions of actions whose replies depend only on the arguments and are kept once answered
+    memoized_actions = ['get_thing_description']
+    # properties describing the server of the primary (diagnostics), never kept in the snapshot 
+    unreplicated_properties = ['queue_stats', 'thread_pool_stats']
+
+    def __init__(self, instance_name : str, primary_socket_address : str, *, 
+                protocols : typing.Union[ZMQ_PROTOCOLS, str, typing.List[ZMQ_PROTOCOLS]] = ZMQ_PROTOCOLS.TCP,
+                refresh_interval : typing.Optional[float] = 1, properties : typing.Optional[typing.List[str]] = None,
+                context : typing.Union[zmq.asyncio.Context, None] = None, **kwargs) -> None:
+        if refresh_interval is not None and refresh_interval <= 0:
+            raise ValueError(f"refresh interval must be positive or None, given {refresh_interval}")
+        self.invokation_timeout = kwargs.pop('invokation_timeout', 5)
+        super().__init__(instance_name, [primary_socket_address], protocols=protocols, context=context, 
+                        identity=f"{instance_name}/replica|{uuid4().hex[:8]}", **kwargs)
+        self.refresh_interval = refresh_interval
+        self.replicated_properties = properties
+        self._snapshot = dict() # type: typing.Dict[str, typing.Any] # read instruction -> value
+        self._serialized_snapshot = dict() # type: typing.Dict[typing.Tuple[str, bytes], bytes]
+        self._property_instructions = dict() # type: typing.Dict[str, str] # property name -> read instruction
+        self._property_reads = set() # type: typing.Set[str] # read instructions of the properties
+        self._change_events = dict() # type: typing.Dict[bytes, str] # event id -> read instruction
+        self._instructions_by_opcode = dict() # type: typing.Dict[int, str]
+        self._opcode_epoch = 0
+        self._memoized_instructions = set() # type: typing.Set[str]
+        self._memoized_replies = dict() # type: typing.Dict[typing.Tuple[str, bytes, bytes], typing.List[bytes]]
+        self._memoizing = dict() # type: typing.Dict[bytes, typing.Tuple[str, bytes, bytes]]
+        self._invalidated = set() # type: typing.Set[str] # written while a refresh was in flight
+        self._fetches = dict() # type: typing.Dict[bytes, asyncio.Future]
+        self._replication_task = None # type: typing.Optional[asyncio.Task]
+        self._event_task = None # type: typing.Optional[asyncio.Task]
+        self._event_socket = None # type: typing.Optional[zmq.asyncio.Socket]
+        self._local_replies = 0
+        self._refreshes = 0
+        self._last_refresh = None # type: typing.Optional[float]
+        self._refreshed_at = None # type: typing.Optional[float] # time.monotonic() of the last refresh
+
+    @property
+    def primary(self) -> BrokerWorker:
+        return self.workers[0]
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        health of the primary, size & age of the snapshot and number of instructions answered from the snapshot
+        """
+        stats = super().stats
+        stats.update(
+            snapshot=len(self._snapshot),
+            local_replies=self._local_replies,
+            refreshes=self._refreshes,
+            last_refresh=self._last_refresh
+        )
+        return stats
+
+    async def run(self) -> None:
+        try:
+            await super().run()
+        finally:
+            self._stop_replicating()
+
+    async def _answer_locally(self, origin_socket : zmq.asyncio.Socket, message : typing.List[bytes], 
+                            client_type : bytes, message_id : bytes, oneway : bool) -> bool:
+        """
+        answer reads of properties in the snapshot and instructions of memoized actions already answered once, 
+        property writes are passed to the primary and the property is dropped from the snapshot until the next refresh.
+        """
+        if oneway:
+            return False
+        if len(message) == LEGACY_MESSAGE_LENGTH:
+            if message[CM_INDEX_MESSAGE_TYPE] != INSTRUCTION or b'fetch_execution_logs' in message[CM_INDEX_EXECUTION_CONTEXT]:
+                return False
+            serializer = self.zmq_serializer if client_type == PROXY else self.http_serializer
+            instruction = serializer.loads(message[CM_INDEX_INSTRUCTION])
+            arguments = message[CM_INDEX_ARGUMENTS]
+        else:
+            _, message_type, flags, _, opcode, _, instruction = unpack_compact_header(message[CM_INDEX_HEADER])
+            if message_type != INSTRUCTION or flags & FLAG_FETCH_EXECUTION_LOGS:
+                return False
+            if opcode >= 0:
+                if unpack_opcode_epoch(message[CM_INDEX_HEADER]) != self._opcode_epoch:
+                    return False # the primary rejects opcodes of another table
+                instruction = self._instructions_by_opcode.get(opcode, None)
+                if instruction is None:
+                    return False
+            arguments = message[CM_INDEX_COMPACT_ARGUMENTS]
+        if instruction in self._snapshot and not self._is_outdated(instruction):
+            try:
+                data = self._serialized_snapshot[(instruction, client_type)]
+            except KeyError:
+                data = self.craft_reply_from_arguments(EMPTY_BYTE, client_type, REPLY, 
+                                                    data=self._snapshot[instruction])[SM_INDEX_DATA]
+                self._serialized_snapshot[(instruction, client_type)] = data
+            reply = [message[CM_INDEX_ADDRESS], EMPTY_BYTE, self.server_type, REPLY, message_id, data, EMPTY_BYTE]
+        elif instruction in self._memoized_instructions:
+            key = (instruction, client_type, arguments)
+            if key not in self._memoized_replies:
+                self._memoizing[message_id] = key
+                return False
+            reply = [message[CM_INDEX_ADDRESS], EMPTY_BYTE, self.server_type, REPLY, message_id, 
+                    *self._memoized_replies[key]]
+        else:
+            if instruction.endswith(('/write', '/delete')):
+                self._drop_from_snapshot(instruction.rsplit('/', 1)[0] + '/read')
+            return False
+        self._local_replies += 1
+        await origin_socket.send_multipart(reply, copy=copy_frames(reply))
+        return True
+
+    def _is_outdated(self, instruction : str) -> bool:
+        # the periodic refresh is late, for example as the primary is busy, values may lag behind by any amount
+        return (instruction in self._property_reads and self.refresh_interval is not None and 
+                self._refreshed_at is not None and time.monotonic() - self._refreshed_at > 2 * self.refresh_interval)
+
+    def _drop_from_snapshot(self, instruction : str) -> None:
+        self._snapshot.pop(instruction, None)
+        self._invalidated.add(instruction)
+        for client_type in (PROXY, HTTP_SERVER):
+            self._serialized_snapshot.pop((instruction, client_type), None)
+
+    def _update_snapshot(self, instruction : str, value : typing.Any) -> None:
+        self._snapshot[instruction] = value
+        for client_type in (PROXY, HTTP_SERVER):
+            self._serialized_snapshot.pop((instruction, client_type), None)
+
+    def _on_worker_alive(self, worker : BrokerWorker) -> None:
+        self._stop_replicating()
+        self._replication_task = asyncio.create_task(self._replicate())
+
+    def _stop_replicating(self) -> None:
+        for task in (self._replication_task, self._event_task):
+            if task is not None:
+                task.cancel()
+        self._replication_task = self._event_task = None
+        if self._event_socket is not None:
+            self._event_socket.close(0)
+            self._event_socket = None
+        for future in self._fetches.values():
+            if not future.done():
+                future.set_exception(ConnectionAbortedError(f"primary of '{self.instance_name}' disconnected"))
+        self._fetches.clear()
+        self._snapshot.clear()
+        self._serialized_snapshot.clear()
+        self._memoized_replies.clear()
+        self._memoizing.clear()
+        self._instructions_by_opcode.clear()
+        self._memoized_instructions.clear()
+        self._change_events.clear()
+
+    async def _fetch(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT) -> typing.Any:
+        """
+        execute an instruction on the primary on behalf of the replica itself
+        """
+        client = self.primary.client
+        message = client.craft_instruction(instruction, arguments)
+        message_id = get_message_id(message)
+        self._fetches[message_id] = asyncio.get_running_loop().create_future()
+        try:
+            await client.socket.send_multipart(message, copy=copy_frames(message))
+            reply = await asyncio.wait_for(self._fetches[message_id], self.invokation_timeout)
+        finally:
+            self._fetches.pop(message_id, None)
+        return client.parse_server_message(reply, raise_client_side_exception=True)[SM_INDEX_DATA]
+
+    async def _replicate(self) -> None:
+        """
+        read the resources & properties of the primary, then subscribe to the change events of observable properties
+        and refresh the snapshot periodically
+        """
+        try:
+            resources = await self._fetch(CommonRPC.zmq_resource_read(self.instance_name))
+            opcodes = dict()
+            if f"/{self.instance_name}{CommonRPC.OPCODES}" in resources:
+                opcodes = await self._fetch(CommonRPC.opcodes_read(self.instance_name))
+            http_resources = await self._fetch(CommonRPC.http_resource_read(self.instance_name))
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            self.logger.error(f"could not read resources of primary of '{self.instance_name}', " + 
+                            f"all instructions are passed to the primary - {str(ex)}")
+            return
+        self._update_snapshot(CommonRPC.zmq_resource_read(self.instance_name), resources)
+        self._update_snapshot(CommonRPC.opcodes_read(self.instance_name), opcodes)
+        self._update_snapshot(CommonRPC.http_resource_read(self.instance_name), http_resources)
+        self._instructions_by_opcode = {opcode : instruction for instruction, opcode in opcodes.items()}
+        self._opcode_epoch = get_opcode_epoch(opcodes)
+        get_properties = None
+        event_addresses = set()
+        for resource in resources.values():
+            if resource['what'] == ResourceTypes.PROPERTY:
+                if resource['obj_name'] in self.unreplicated_properties:
+                    continue
+                self._property_instructions[resource['obj_name']] = f"{resource['instruction']}/read"
+                self._property_reads.add(f"{resource['instruction']}/read")
+            elif resource['what'] == ResourceTypes.ACTION:
+                if resource['obj_name'] == '_get_properties':
+                    get_properties = resource['instruction']
+                elif resource['obj_name'] in self.memoized_actions:
+                    self._memoized_instructions.add(resource['instruction'])
+        for resource in resources.values():
+            if resource['what'] == ResourceTypes.EVENT and resource['obj_name'].endswith('_change_event'):
+                instruction = self._property_instructions.get(resource['obj_name'][:-len('_change_event')], None)
+                if instruction is None:
+                    continue
+                prefix = b'zmq-' if resource['serialization_specific'] else b''
+                self._change_events[prefix + bytes(resource['unique_identifier'], encoding='utf-8')] = instruction
+                event_addresses.add(resource['socket_address'])
+        if len(self._change_events) > 0:
+            self._subscribe_change_events(event_addresses)
+        if get_properties is None:
+            self.logger.error(f"primary of '{self.instance_name}' cannot read all properties at once, " + 
+                            "property reads are passed to the primary")
+            return
+        if self.replicated_properties is not None:
+            names = [name for name in self.replicated_properties if name not in self.unreplicated_properties]
+        else:
+            names = list(self._property_instructions.keys())
+        arguments = dict(names=names)
+        while True:
+            self._invalidated.clear()
+            try:
+                values = await self._fetch(get_properties, arguments)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                self.logger.error(f"could not refresh snapshot of '{self.instance_name}', property reads are " +
+                                f"passed to the primary until the next refresh - {str(ex)}")
+                for instruction in self._property_reads:
+                    self._drop_from_snapshot(instruction)
+            else:
+                for name, value in values.items():
+                    instruction = self._property_instructions.get(name, None)
+                    if instruction is not None and instruction not in self._invalidated:
+                        self._update_snapshot(instruction, value)
+                self._refreshes += 1
+                self._last_refresh = time.time()
+                self._refreshed_at = time.monotonic()
+            if self.refresh_interval is None:
+                return
+            await asyncio.sleep(self.refresh_interval)
+
+    def _subscribe_change_events(self, socket_addresses : typing.Set[str]) -> None:
+        host = self.primary.socket_address.split('://', 1)[1].rsplit(':', 1)[0]
+        self._event_socket = self.context.socket(zmq.SUB)
+        for socket_address in socket_addresses:
+            if socket_address.startswith('tcp://'):
+                # the publisher of the primary is bound to all interfaces
+                socket_address = socket_address.replace('0.0.0.0', host).replace('*', host)
+            self._event_socket.connect(socket_address)
+        for event_id in self._change_events.keys():
+            self._event_socket.setsockopt(zmq.SUBSCRIBE, event_id)
+        self._event_task = asyncio.create_task(self._receive_change_events(self._event_socket))
+
+    async def _receive_change_events(self, socket : zmq.asyncio.Socket) -> None:
+        while True:
+            event_id, payload, *out_of_band_frames = await socket.recv_multipart()
+            instruction = self._change_events.get(event_id, None)
+            if instruction is None:
+                continue # subscriptions match by prefix
+            try:
+                if out_of_band_frames:
+                    value = self.zmq_serializer.loads_out_of_band(payload, out_of_band_frames)
+                else:
+                    value = self.zmq_serializer.loads(payload)
+            except Exception as ex:
+                self.logger.error(f"could not deserialize change event {event_id} - {str(ex)}")
+                continue
+            self._update_snapshot(instruction, value)
+
+    async def _forward_reply(self, worker : BrokerWorker, reply : typing.List[bytes]) -> None:
+        future = self._fetches.get(reply[SM_INDEX_MESSAGE_ID], None)
+        if future is not None:
+            if not future.done():
+                future.set_result(reply)
+            return
+        key = self._memoizing.pop(reply[SM_INDEX_MESSAGE_ID], None)
+        if key is not None and reply[SM_INDEX_MESSAGE_TYPE] == REPLY:
+            self._memoized_replies[key] = reply[SM_INDEX_DATA:]
+        await super()._forward_reply(worker, reply)
+
+    async def _fail_worker(self, worker : BrokerWorker) -> None:
+        self._stop_replicating()
+        await super()._fail_worker(worker)
+
     
        
+class MessageIDGenerator:
+    """
+    Generates message ids for a client, a random 8 byte prefix renewed at every handshake followed by a 64-bit 
+    monotonic counter (16 bytes in total). Cheaper than a UUID and unique enough as replies are routed to the 
+    client by its socket identity anyway. Subclass and override ``__call__()`` (and ``reset()``) for a different 
+    format, message ids may be any bytes up to 255 long. Thread-safe.
+    """
+
+    _counter_struct = struct.Struct('!Q')
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        called at handshake with the server, renews the prefix 
+        """
+        self._prefix = os.urandom(8)
+        self._counter = itertools.count() # next() is atomic under the GIL
+
+    def __call__(self) -> bytes:
+        return self._prefix + self._counter_struct.pack(next(self._counter))
+
+
+
+class UUIDMessageIDGenerator(MessageIDGenerator):
+    """
+    Generates UUID4 strings as message ids, the format used by older clients. 
+    """
+
+    def reset(self) -> None:
+        pass 
+
+    def __call__(self) -> bytes:
+        return bytes(str(uuid4()), encoding='utf-8')
+
+
+
+class ExpiringCache:
+    """
+    Mapping (of message ids to replies for example) whose entries are forgotten ``ttl`` seconds after they were set 
+    or, oldest first, when more than ``max_size`` entries are stored. Entries are kept in insertion order, expired 
+    ones are swept from the front when setting an entry, so that all operations are O(1) (amortized). The number 
+    of expired and evicted entries are counted in ``stats`` to make leaks visible. Thread-safe.
+
+    Parameters
+    ----------
+    ttl: float, default 300
+        time to live of an entry in seconds, None to keep entries until evicted
+    max_size: int, default 10000
+        maximum number of entries
+    on_discard: Callable[[Any], None], optional
+        called with the value of each entry forgotten as it expired or was evicted, must not use the cache
+    """
+
+    def __init__(self, ttl : typing.Optional[float] = 300, max_size : int = 10000, 
+                on_discard : typing.Optional[typing.Callable[[typing.Any], None]] = None) -> None:
+        if ttl is not None and (not isinstance(ttl, (int, float)) or ttl <= 0):
+            raise ValueError(f"ttl must be a number greater than 0 or None, given value : {ttl}")
+        if not isinstance(max_size, int) or max_size < 1:
+            raise ValueError(f"max_size must be an integer greater than 0, given value : {max_size}")
+        self.ttl = ttl
+        self.max_size = max_size
+        self.on_discard = on_discard
+        self._entries = OrderedDict() # type: typing.Dict[typing.Any, typing.Tuple[float, typing.Any]]
+        self._lock = threading.Lock()
+        self._expired = 0
+        self._evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key : typing.Any) -> bool:
+        return self.get(key, self) is not self
+
+    def __setitem__(self, key : typing.Any, value : typing.Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(key, None) # moves the key to the end
+            self._entries[key] = (now + self.ttl if self.ttl is not None else None, value)
+            self._sweep(now)
+
+    def get(self, key : typing.Any, default : typing.Any = None) -> typing.Any:
+        """
+        value of an entry which did not expire, otherwise default 
+        """
+        with self._lock:
+            return self._get(key, default, remove=False)
+        
+    def pop(self, key : typing.Any, default : typing.Any = None) -> typing.Any:
+        """
+        remove an entry and return its value if it did not expire, otherwise default
+        """
+        with self._lock:
+            return self._get(key, default, remove=True)
+
+    def _get(self, key : typing.Any, default : typing.Any, remove : bool) -> typing.Any:
+        entry = self._entries.get(key, None)
+        if entry is None:
+            return default
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            self._expired += 1
+            self._discard(entry[1])
+            return default
+        if remove:
+            del self._entries[key]
+        return entry[1]
+
+    def values(self) -> typing.List[typing.Any]:
+        """
+        values of the entries which did not expire
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [value for expiry, value in self._entries.values() if expiry is None or expiry > now]
+
+    def sweep(self) -> None:
+        """
+        remove expired entries and the oldest entries beyond ``max_size``
+        """
+        with self._lock:
+            self._sweep(time.monotonic())
+
+    def _sweep(self, now : float) -> None:
+        if self.ttl is not None:
+            while len(self._entries) > 0 and next(iter(self._entries.values()))[0] <= now:
+                self._discard(self._entries.popitem(last=False)[1][1])
+                self._expired += 1
+        while len(self._entries) > self.max_size:
+            self._discard(self._entries.popitem(last=False)[1][1])
+            self._evicted += 1
+
+    def _discard(self, value : typing.Any) -> None:
+        if self.on_discard is not None:
+            self.on_discard(value)
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        number of entries, entries removed as they expired or as ``max_size`` was exceeded
+        """
+        return dict(size=len(self._entries), max_size=self.max_size, ttl=self.ttl, expired=self._expired, 
+                    evicted=self._evicted)
+
+
+
 class BaseZMQClient(BaseZMQ):
     """    
     Base class for all ZMQ clients irrespective of sync and async.
@@ -1196,6 +3168,24 @@ class BaseZMQClient(BaseZMQ):
         The instance name of the server (or ``Thing``)
     client_type: str
         RPC or HTTP Server
+    compact_header: bool, default True
+        send instructions with the compact header (see ``COMPACT_HEADER``) if the server supports it, which is 
+        negotiated at handshake. Otherwise, or with older servers, the original 9 frame messages are sent.
+    array_frames: bool, default True
+        receive numpy arrays in replies as out-of-band frames (reconstructed without copying, read-only) if the 
+        server supports it, which is negotiated at handshake. RPC clients (b'PROXY') only.
+    shared_memory: bool, default True
+        read large out-of-band frames from the shared memory ring of the server (``SharedMemoryRing``) if the 
+        server offers one at handshake, only for IPC & INPROC connections. Slots of the ring are held until the
+        arrays of a reply are garbage collected, drop them (or copy) when no longer needed. ``ObjectProxy`` keeps 
+        the last reply of each action & property (``last_return_value``), holding its slot until the next call.
+    message_id_generator: MessageIDGenerator, optional
+        generator of message ids, by default a per-client prefix followed by a monotonic counter 
+    reply_cache_ttl: float, default 300
+        seconds after which a reply received while waiting for another one (for example of a ``noblock`` call) 
+        is forgotten if not read, None to keep it until evicted
+    reply_cache_size: int, default 10000
+        maximum number of such replies, the oldest are evicted first
     **kwargs:
         zmq_serializer: BaseSerializer
             custom implementation of RPC serializer if necessary
@@ -1209,6 +3199,12 @@ class BaseZMQClient(BaseZMQ):
                 http_serializer : typing.Union[None, JSONSerializer] = None, 
                 zmq_serializer : typing.Union[str, BaseSerializer, None] = None,
                 logger : typing.Optional[logging.Logger] = None,
+                compact_header : bool = True,
+                array_frames : bool = True,
+                shared_memory : bool = True,
+                message_id_generator : typing.Optional[MessageIDGenerator] = None,
+                reply_cache_ttl : typing.Optional[float] = 300,
+                reply_cache_size : int = 10000,
                 **kwargs
             ) -> None:
         if client_type in [PROXY, HTTP_SERVER, TUNNELER]: 
@@ -1230,9 +3226,36 @@ class BaseZMQClient(BaseZMQ):
             self.server_type = bytes(server_type, encoding='utf-8') 
         self.logger = logger
         self._monitor_socket = None
-        self._reply_cache = dict()
+        self._reply_cache = ExpiringCache(ttl=reply_cache_ttl, max_size=reply_cache_size)
+        self._compact_header_allowed = compact_header
+        self._use_compact_header = False # negotiated at handshake
+        self._array_frames_allowed = array_frames and client_type == PROXY and 'numpy' in globals()
+        self._use_array_frames = False # negotiated at handshake
+        self._shared_memory_allowed = shared_memory and self._array_frames_allowed
+        self._shared_memory_ring = None # type: typing.Optional[SharedMemoryRing] # attached at handshake
+        self.opcodes = dict() # type: typing.Dict[str, int] # instruction to opcode, sent instead of instruction when known
+        self._refetch_opcodes = False # server rejected the opcodes
+        self.message_id_generator = message_id_generator or MessageIDGenerator()
         super().__init__()
 
+    @property
+    def opcodes(self) -> typing.Dict[str, int]:
+        """instruction to opcode, sent instead of the instruction string when known (see ``fetch_opcodes()``)"""
+        return self._opcodes
+    
+    @opcodes.setter
+    def opcodes(self, value : typing.Dict[str, int]) -> None:
+        self._opcodes = value
+        self._opcode_epoch = get_opcode_epoch(value)
+
+    @property
+    def reply_cache_stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        size of the cache of replies received while waiting for another reply, with the number of replies 
+        forgotten unread (expired or evicted)
+        """
+        return self._reply_cache.stats
+
 
     def raise_local_exception(self, exception : typing.Dict[str, typing.Any]) -> None:
         """
@@ -1291,7 +3314,11 @@ class BaseZMQClient(BaseZMQ):
                 if self.client_type == HTTP_SERVER:
                     message[SM_INDEX_DATA] = self.http_serializer.loads(message[SM_INDEX_DATA]) # type: ignore
                 elif self.client_type == PROXY:
-                    message[SM_INDEX_DATA] = self.zmq_serializer.loads(message[SM_INDEX_DATA]) # type: ignore
+                    if len(message) > SM_INDEX_OUT_OF_BAND_DATA:
+                        message[SM_INDEX_DATA] = self.zmq_serializer.loads_out_of_band(message[SM_INDEX_DATA], 
+                                                                self._out_of_band_frames(message)) # type: ignore
+                    else:
+                        message[SM_INDEX_DATA] = self.zmq_serializer.loads(message[SM_INDEX_DATA]) # type: ignore
             return message 
         elif message_type == HANDSHAKE:
             self.logger.debug("""handshake messages arriving out of order are silently dropped as receiving this message 
@@ -1301,6 +3328,14 @@ class BaseZMQClient(BaseZMQ):
                 message[SM_INDEX_DATA] = self.http_serializer.loads(message[SM_INDEX_DATA]) # type: ignore
             elif self.client_type == PROXY:
                 message[SM_INDEX_DATA] = self.zmq_serializer.loads(message[SM_INDEX_DATA]) # type: ignore
+            if (message_type == INVALID_MESSAGE and isinstance(message[SM_INDEX_DATA].get('exception', None), dict) and
+                    message[SM_INDEX_DATA]['exception'].get('type', None) == OpcodeMismatchError.__name__):
+                # instruction strings are sent until the opcodes are fetched again
+                self.logger.warning(f"opcodes of server '{self.instance_name}' changed, fetching them again")
+                self.opcodes = dict()
+                self._refetch_opcodes = True
+                if raise_client_side_exception:
+                    raise OpcodeMismatchError(message[SM_INDEX_DATA]['exception']['message']) from None
             if not raise_client_side_exception:
                 return message
             if message[SM_INDEX_DATA].get('exception', None) is not None:
@@ -1308,6 +3343,14 @@ class BaseZMQClient(BaseZMQ):
             else:
                 raise NotImplementedError("message type {} received. No exception field found, exception field mandatory.".format(
                     message_type))
+        elif message_type == BUSY:
+            if self.client_type == HTTP_SERVER:
+                message[SM_INDEX_DATA] = self.http_serializer.loads(message[SM_INDEX_DATA]) # type: ignore
+            elif self.client_type == PROXY:
+                message[SM_INDEX_DATA] = self.zmq_serializer.loads(message[SM_INDEX_DATA]) # type: ignore
+            if raise_client_side_exception:
+                raise ServerBusyError(message[SM_INDEX_DATA]['exception']['message']) from None
+            return message
         elif message_type == TIMEOUT:
             exception =  TimeoutError("message timed out.")
             if raise_client_side_exception:
@@ -1318,8 +3361,42 @@ class BaseZMQClient(BaseZMQ):
             raise NotImplementedError("Unknown message type {} received. This message cannot be dealt.".format(message_type))
 
 
+    def _out_of_band_frames(self, message : typing.List[bytes]) -> typing.List[typing.Any]:
+        """
+        out-of-band frames of a reply, frames passed through the shared memory ring are read from it
+        """
+        if self._shared_memory_ring is None:
+            return message[SM_INDEX_OUT_OF_BAND_DATA:]
+        frame_map = message[SM_INDEX_OUT_OF_BAND_DATA]
+        frames = message[SM_INDEX_OUT_OF_BAND_DATA + 1:]
+        return [self._shared_memory_ring.read(frame) if frame_map[index] else frame 
+                                                    for index, frame in enumerate(frames)]
+
+    def _shared_memory_handles(self, message : typing.List[bytes]) -> typing.List[bytes]:
+        """
+        handles of the frames of a reply passed through the shared memory ring
+        """
+        if (self._shared_memory_ring is None or len(message) <= SM_INDEX_OUT_OF_BAND_DATA or 
+                                                                    message[SM_INDEX_MESSAGE_TYPE] != REPLY):
+            return []
+        frame_map = message[SM_INDEX_OUT_OF_BAND_DATA]
+        return [frame for index, frame in enumerate(message[SM_INDEX_OUT_OF_BAND_DATA + 1:]) if frame_map[index]]
+
+    def _release_shared_memory(self, message : typing.List[bytes]) -> None:
+        """
+        release the slots of the shared memory ring held by a reply which is dropped without being parsed
+        """
+        handles = self._shared_memory_handles(message)
+        for handle in handles:
+            self._shared_memory_ring.release(handle)
+        if len(handles) > 0:
+            self.logger.debug(f"released {len(handles)} shared memory slot(s) of dropped reply with message ID " +
+                            f"'{message[SM_INDEX_MESSAGE_ID]}'")
+
+
     def craft_instruction_from_arguments(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT, 
-                timeout : typing.Optional[float] = None, context : typing.Dict[str, typing.Any] = EMPTY_DICT) -> typing.List[bytes]: 
+                timeout : typing.Optional[float] = None, context : typing.Dict[str, typing.Any] = EMPTY_DICT, 
+                message_type : bytes = INSTRUCTION) -> typing.List[bytes]: 
         """
         message from client to server:
 
@@ -1328,7 +3405,11 @@ class BaseZMQClient(BaseZMQ):
             [ 0     ,   1    ,     2      ,      3      ,       4   ,    5       ,     6    ]
 
         """
-        message_id = bytes(str(uuid4()), encoding='utf-8')
+        message_id = self.message_id_generator()
+        if self._use_array_frames:
+            context = dict(context, array_frames=True)
+            if self._shared_memory_ring is not None:
+                context['shared_memory'] = True
         if self.client_type == HTTP_SERVER:
             timeout = self.http_serializer.dumps(timeout) # type: bytes
             instruction = self.http_serializer.dumps(instruction) # type: bytes
@@ -1349,7 +3430,7 @@ class BaseZMQClient(BaseZMQ):
             self.server_address, 
             EMPTY_BYTE,
             self.client_type,
-            INSTRUCTION,
+            message_type,
             message_id,
             timeout, 
             instruction,
@@ -1358,6 +3439,117 @@ class BaseZMQClient(BaseZMQ):
         ]
 
 
+    def craft_compact_instruction_from_arguments(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT, 
+                timeout : typing.Optional[float] = None, context : typing.Dict[str, typing.Any] = EMPTY_DICT, 
+                message_type : bytes = INSTRUCTION) -> typing.List[bytes]: 
+        """
+        compact message from client to server, the execution context is sent as flags unless it contains 
+        other keys than "oneway", "fetch_execution_logs", "array_frames" and "shared_memory". The instruction is replaced by its opcode if 
+        found in ``opcodes``:
+
+        ::
+            [address, bytes(), header, arguments, (execution context)]
+            [ 0     ,   1    ,   2   ,     3    ,          4         ]
+
+        """
+        message_id = self.message_id_generator()
+        serializer = self.zmq_serializer if self.client_type == PROXY else self.http_serializer
+        opcode = self.opcodes.get(instruction, -1)
+        # the opcode epoch is sent whenever opcodes are, batch items carry their opcodes within the arguments
+        opcode_epoch = self._opcode_epoch if opcode >= 0 or (message_type == BATCH and isinstance(arguments, list) and 
+                                                any(isinstance(item[0], int) for item in arguments)) else 0
+        if arguments == b'':
+            arguments = serializer.dumps({}) # type: bytes
+        elif not isinstance(arguments, byte_types):
+            arguments = serializer.dumps(arguments) # type: bytes
+        flags = 0
+        if context:
+            context = dict(context)
+            if context.pop('oneway', False):
+                flags |= FLAG_ONEWAY
+            if context.pop('fetch_execution_logs', False):
+                flags |= FLAG_FETCH_EXECUTION_LOGS
+            if context.pop('array_frames', False):
+                flags |= FLAG_ARRAY_FRAMES
+            if context.pop('shared_memory', False):
+                flags |= FLAG_SHARED_MEMORY
+            if context:
+                flags |= FLAG_EXECUTION_CONTEXT
+        if self._use_array_frames:
+            flags |= FLAG_ARRAY_FRAMES
+            if self._shared_memory_ring is not None:
+                flags |= FLAG_SHARED_MEMORY
+        message = [
+            self.server_address,
+            EMPTY_BYTE,
+            pack_compact_header(self.client_type, message_type, message_id, instruction if opcode < 0 else '', 
+                                timeout, flags, opcode, opcode_epoch),
+            arguments
+        ]
+        if flags & FLAG_EXECUTION_CONTEXT:
+            message.append(serializer.dumps(context))
+        return message
+
+
+    def craft_instruction(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT, 
+                timeout : typing.Optional[float] = None, context : typing.Dict[str, typing.Any] = EMPTY_DICT, 
+                message_type : bytes = INSTRUCTION) -> typing.List[bytes]: 
+        """
+        craft an instruction in the format negotiated with the server at handshake, use ``get_message_id()`` 
+        to retrieve the message id from the crafted message.
+        """
+        if self._use_compact_header:
+            return self.craft_compact_instruction_from_arguments(instruction, arguments, timeout, context, message_type)
+        return self.craft_instruction_from_arguments(instruction, arguments, timeout, context, message_type)
+
+
+    def craft_batch(self, instructions : typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]], 
+                timeout : typing.Optional[float] = None, context : typing.Dict[str, typing.Any] = EMPTY_DICT) -> typing.List[bytes]:
+        """
+        craft a batch of instructions, sent as the arguments of a BATCH message without an instruction. 
+        Instructions are replaced by their opcodes when available and the compact header (carrying the opcode epoch) 
+        is used. 
+        """
+        opcodes = self.opcodes if self._use_compact_header else EMPTY_DICT
+        items = [[opcodes.get(instruction, instruction), arguments] for instruction, arguments in instructions]
+        return self.craft_instruction('', items, timeout, context, BATCH)
+
+
+    def _negotiate_message_format(self, handshake_reply : typing.List[bytes]) -> None:
+        """
+        use the compact header, out-of-band array frames and the shared memory ring if the server advertised them 
+        in its handshake reply, older servers send nothing. Opcodes are forgotten as the server may have been 
+        restarted and the message id prefix is renewed. 
+        """
+        self._use_compact_header = False
+        self._use_array_frames = False
+        if self._shared_memory_ring is not None:
+            self._shared_memory_ring.close()
+            self._shared_memory_ring = None
+        self.opcodes = dict()
+        self.message_id_generator.reset()
+        if len(handshake_reply) <= SM_INDEX_ENCODED_DATA:
+            return
+        try:
+            capabilities = self.http_serializer.loads(handshake_reply[SM_INDEX_ENCODED_DATA]) 
+        except Exception:
+            return 
+        if not isinstance(capabilities, dict):
+            return
+        if self._compact_header_allowed and capabilities.get('compact_header', None) == COMPACT_HEADER_VERSION:
+            self._use_compact_header = True
+        if self._array_frames_allowed and capabilities.get('array_frames', None) == 1:
+            self._use_array_frames = True
+        ring = capabilities.get('shared_memory', None)
+        if (self._use_array_frames and self._shared_memory_allowed and isinstance(ring, dict) and 
+                self.socket_address.startswith(('ipc://', 'inproc://'))):
+            try:
+                self._shared_memory_ring = SharedMemoryRing.attach(ring['name'], ring['slots'], ring['slot_size'])
+            except Exception as ex:
+                self.logger.warning(f"could not attach to shared memory ring '{ring.get('name', None)}' of server " + 
+                                    f"'{self.instance_name}', large frames are received inline - {str(ex)}")
+
+
     def craft_empty_message_with_type(self, message_type : bytes = HANDSHAKE):
         """
         create handshake message for example
@@ -1376,6 +3568,9 @@ class BaseZMQClient(BaseZMQ):
     
     def exit(self) -> None:
         BaseZMQ.exit(self)
+        if self._shared_memory_ring is not None:
+            self._shared_memory_ring.close()
+            self._shared_memory_ring = None
         try:
             self.poller.unregister(self.socket)
             # TODO - there is some issue here while quitting 
@@ -1410,6 +3605,12 @@ class SyncZMQClient(BaseZMQClient, BaseSyncZMQ):
     Synchronous ZMQ client that connect with sync or async server based on ZMQ protocol. Works like REQ-REP socket. 
     Each request is blocking until response is received. Suitable for most purposes. 
 
+    The client can be shared between threads, each having their requests in flight at the same time. As ZMQ sockets 
+    must not be used by more than one thread, the thread which created the client uses its socket and other threads 
+    get their own socket on first use (with the identity of the client suffixed by a number), so that replies 
+    are routed by the server to the socket of the requesting thread. Sockets of finished threads are closed when the 
+    next thread socket is created. Read the reply of a ``send_instruction()`` in the thread which sent it. 
+
     Parameters
     ----------
     server_instance_name: str
@@ -1444,10 +3645,54 @@ class SyncZMQClient(BaseZMQClient, BaseSyncZMQ):
         self.poller = zmq.Poller()
         self.poller.register(self.socket, zmq.POLLIN)
         self._terminate_context = context == None
-        self._client_queue = threading.RLock()
+        self._owner_thread = threading.current_thread()
+        self._thread_sockets = dict() # type: typing.Dict[threading.Thread, typing.Tuple[zmq.Socket, zmq.Poller, zmq.Socket]]
+        self._thread_sockets_lock = threading.Lock()
+        self._thread_socket_count = itertools.count(1)
         # print("context on client", self.context)
         if handshake:
             self.handshake(kwargs.pop("handshake_timeout", 60000))
+
+    def _thread_socket(self) -> typing.Tuple[zmq.Socket, zmq.Poller]:
+        """
+        socket and poller of the calling thread, created and handshook for threads other than the one which created 
+        the client at their first request 
+        """
+        thread = threading.current_thread()
+        if thread is self._owner_thread:
+            return self.socket, self.poller
+        thread_socket = self._thread_sockets.get(thread, None)
+        if thread_socket is not None:
+            return thread_socket[0], thread_socket[1]
+        with self._thread_sockets_lock:
+            for finished_thread in [other for other in self._thread_sockets if not other.is_alive()]:
+                self._close_thread_socket(*self._thread_sockets.pop(finished_thread))
+        socket = self.context.socket(zmq.ROUTER)
+        monitor_socket = None
+        try:
+            socket.setsockopt_string(zmq.IDENTITY, f"{self.identity}|{next(self._thread_socket_count)}")
+            socket.connect(self.socket_address)
+            poller = zmq.Poller()
+            poller.register(socket, zmq.POLLIN)
+            self._handshake_socket(socket, poller, 60000)
+            # endpoints named after the file descriptor of the socket (default) may still be bound for a closed socket
+            monitor_socket = socket.get_monitor_socket(addr=f"inproc://monitor.{uuid4().hex}")
+            poller.register(monitor_socket, zmq.POLLIN)
+        except Exception:
+            if monitor_socket is not None:
+                monitor_socket.close(0)
+            socket.close(0)
+            raise
+        with self._thread_sockets_lock:
+            self._thread_sockets[thread] = (socket, poller, monitor_socket)
+        return socket, poller
+
+    def _close_thread_socket(self, socket : zmq.Socket, poller : zmq.Poller, monitor_socket : zmq.Socket) -> None:
+        try:
+            monitor_socket.close(0)
+            socket.close(0)
+        except Exception as ex:
+            self.logger.warning(f"could not close thread socket of client '{self.identity}' - {str(ex)}")
     
     def send_instruction(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT, 
                         invokation_timeout : typing.Optional[float] = None, execution_timeout : typing.Optional[float] = None,
@@ -1484,10 +3729,12 @@ class SyncZMQClient(BaseZMQClient, BaseSyncZMQ):
         message id : bytes
             a byte representation of message id
         """
-        message = self.craft_instruction_from_arguments(instruction, arguments, invokation_timeout, context)
-        self.socket.send_multipart(message)
-        self.logger.debug(f"sent instruction '{instruction}' to server '{self.instance_name}' with msg-id '{message[SM_INDEX_MESSAGE_ID]}'")
-        return message[SM_INDEX_MESSAGE_ID]
+        message = self.craft_instruction(instruction, arguments, invokation_timeout, context)
+        socket, _ = self._thread_socket()
+        socket.send_multipart(message, copy=copy_frames(message))
+        message_id = get_message_id(message)
+        self.logger.debug(f"sent instruction '{instruction}' to server '{self.instance_name}' with msg-id '{message_id}'")
+        return message_id
     
     def recv_reply(self, message_id : bytes, timeout : typing.Optional[int] = None, raise_client_side_exception : bool = False, 
                     deserialize : bool = True) -> typing.List[typing.Union[bytes, typing.Dict[str, typing.Any]]]:
@@ -1502,8 +3749,12 @@ class SyncZMQClient(BaseZMQClient, BaseSyncZMQ):
             if True, any exceptions raised during execution inside ``Thing`` instance will be raised on the client.
             See docs of ``raise_local_exception()`` for info on exception 
         """
+        reply = self._reply_cache.pop(message_id, None) # arrived while waiting for another reply
+        if reply is not None:
+            return reply
+        _, poller = self._thread_socket()
         while True:
-            sockets = self.poller.poll(timeout)
+            sockets = poller.poll(timeout)
             reply = None
             for socket, _ in sockets:
                 try:    
@@ -1513,7 +3764,7 @@ class SyncZMQClient(BaseZMQClient, BaseSyncZMQ):
                     pass 
             if reply: 
                 if message_id != reply[SM_INDEX_MESSAGE_ID]:
-                    self._reply_cache[message_id] = reply
+                    self._reply_cache[reply[SM_INDEX_MESSAGE_ID]] = reply
                     continue 
                 self.logger.debug("received reply with msg-id {}".format(reply[SM_INDEX_MESSAGE_ID]))
                 return reply
@@ -1543,53 +3794,228 @@ class SyncZMQClient(BaseZMQClient, BaseSyncZMQ):
         message id : bytes
             a byte representation of message id
         """
-        acquire_timeout = -1 if invokation_timeout is None else invokation_timeout   
-        acquired = self._client_queue.acquire(timeout=acquire_timeout)
-        if not acquired:
-            raise TimeoutError("previous request still in progress")
-        try:
-            msg_id = self.send_instruction(instruction, arguments, invokation_timeout, 
-                                        execution_timeout, context, argument_schema)
-            return self.recv_reply(msg_id, raise_client_side_exception=raise_client_side_exception, deserialize=deserialize_reply)
-        finally:
-            self._client_queue.release() 
+        if self._refetch_opcodes:
+            self._refetch_opcodes = False
+            self.fetch_opcodes()
+        msg_id = self.send_instruction(instruction, arguments, invokation_timeout, 
+                                    execution_timeout, context, argument_schema)
+        return self.recv_reply(msg_id, raise_client_side_exception=raise_client_side_exception, deserialize=deserialize_reply)
+
+
+    def send_batch(self, instructions : typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]], 
+                invokation_timeout : typing.Optional[float] = None, 
+                context : typing.Dict[str, typing.Any] = EMPTY_DICT) -> bytes:
+        """
+        send a batch of instructions to the server, which are executed in order in one pass. The reply is a list 
+        with the result of each item, ``{"returnValue" : value}`` or ``{"exception" : exception}``.
+
+        Parameters
+        ----------
+        instructions: List[Tuple[str, Dict[str, Any]]]
+            (instruction, arguments) pairs, see ``send_instruction()``. Instructions of sub-things may be mixed.
+        context: Dict[str, Any]
+            execution context of the whole batch
+
+        Returns
+        -------
+        message id : bytes
+            a byte representation of message id
+        """
+        message = self.craft_batch(instructions, invokation_timeout, context)
+        socket, _ = self._thread_socket()
+        socket.send_multipart(message, copy=copy_frames(message))
+        message_id = get_message_id(message)
+        self.logger.debug(f"sent batch of {len(instructions)} instructions to server '{self.instance_name}' with msg-id '{message_id}'")
+        return message_id
+    
+    def execute_batch(self, instructions : typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]], 
+                invokation_timeout : typing.Optional[float] = None, context : typing.Dict[str, typing.Any] = EMPTY_DICT, 
+                raise_client_side_exception : bool = False, 
+                deserialize_reply : bool = True) -> typing.List[typing.Union[bytes, typing.List[typing.Dict[str, typing.Any]]]]:
+        """
+        send a batch of instructions and receive the single reply for it, see ``send_batch()``. 
+        ``raise_client_side_exception`` only concerns the batch as a whole, exceptions of items are returned 
+        within the reply.
+        """
+        if self._refetch_opcodes:
+            self._refetch_opcodes = False
+            self.fetch_opcodes()
+        msg_id = self.send_batch(instructions, invokation_timeout, context)
+        return self.recv_reply(msg_id, raise_client_side_exception=raise_client_side_exception, deserialize=deserialize_reply)
+
+
+    def fetch_opcodes(self) -> None:
+        """
+        fetch the opcodes of the instructions from the server (``Thing.opcodes``) so that opcodes are sent instead of 
+        instruction strings. Has no effect unless compact header was negotiated at handshake.
+        """
+        if not self._use_compact_header:
+            return
+        self.opcodes = self.execute(CommonRPC.opcodes_read(self.instance_name), 
+                                    raise_client_side_exception=True)[SM_INDEX_DATA]
 
 
     def handshake(self, timeout : typing.Union[float, int] = 60000) -> None: 
         """
         hanshake with server before sending first message
         """
+        message = self._handshake_socket(self.socket, self.poller, timeout)
+        self.server_type = message[SM_INDEX_SERVER_TYPE]
+        self._negotiate_message_format(message)
+        self._monitor_socket = self.socket.get_monitor_socket()
+        self.poller.register(self._monitor_socket, zmq.POLLIN) 
+        # sufficient to know when server dies only while receiving messages, not continuous polling
+
+    def _handshake_socket(self, socket : zmq.Socket, poller : zmq.Poller, 
+                        timeout : typing.Union[float, int, None]) -> typing.List[bytes]:
+        """
+        send handshakes through a socket until the server replies, returns the handshake reply
+        """
         start_time = time.time_ns()
+        poll_timeout = 5 # handshakes sent before the connection is established are dropped, retry soon at first
         while True:
             if timeout is not None and (time.time_ns() - start_time)/1e6 > timeout:
                 raise ConnectionError(f"Unable to contact server '{self.instance_name}' from client '{self.identity}'")
-            self.socket.send_multipart(self.craft_empty_message_with_type(HANDSHAKE))
+            socket.send_multipart(self.craft_empty_message_with_type(HANDSHAKE))
             self.logger.info(f"sent Handshake to server '{self.instance_name}'")
-            if self.poller.poll(500):
+            if poller.poll(poll_timeout):
                 try:
-                    message = self.socket.recv_multipart(zmq.NOBLOCK)
+                    message = socket.recv_multipart(zmq.NOBLOCK)
                 except zmq.Again:
                     pass 
                 else:
                     if message[3] == HANDSHAKE:  # type: ignore
                         self.logger.info(f"client '{self.identity}' handshook with server '{self.instance_name}'")
-                        self.server_type = message[SM_INDEX_SERVER_TYPE]
-                        break
+                        return message
                     else:
                         raise ConnectionAbortedError(f"Handshake cannot be done with '{self.instance_name}'. Another message arrived before handshake complete.")
             else:
                 self.logger.info('got no reply')
-        self._monitor_socket = self.socket.get_monitor_socket()
-        self.poller.register(self._monitor_socket, zmq.POLLIN) 
-        # sufficient to know when server dies only while receiving messages, not continuous polling
+                poll_timeout = min(2 * poll_timeout, 500)
+
+    def exit(self) -> None:
+        if hasattr(self, '_thread_sockets'):
+            with self._thread_sockets_lock:
+                for thread_socket in self._thread_sockets.values():
+                    self._close_thread_socket(*thread_socket)
+                self._thread_sockets.clear()
+        super().exit()
  
     
 
+class SharedZMQClients:
+    """
+    Process wide pool of synchronous clients shared by proxies (``ObjectProxy(shared_client=True)``), so that a new 
+    proxy does not create a socket and handshake with its server. Clients are keyed by server instance name, 
+    protocol, socket address & serializer, up to ``width`` clients (``global_config.ZMQ_CLIENT_POOL_WIDTH`` 
+    by default) are created per key and handed out round robin. As clients correlate replies by message ID and 
+    each thread uses its own socket (see ``SyncZMQClient``), a client can be used by many proxies & threads at once. 
+    Import ``shared_zmq_clients`` instead of instantiating this class. 
+
+    Parameters
+    ----------
+    width: int, optional
+        number of clients per key
+    """
+
+    def __init__(self, width : typing.Optional[int] = None) -> None:
+        self.width = width
+        self._clients = dict() # type: typing.Dict[typing.Tuple, typing.List[SyncZMQClient]]
+        self._next = dict() # type: typing.Dict[typing.Tuple, int]
+        self._creating = dict() # type: typing.Dict[typing.Tuple, int] # clients being created & handshook per key
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+
+    @property
+    def width(self) -> int:
+        """
+        number of clients per key, takes effect for keys whose clients are not all created yet
+        """
+        return self._width if self._width is not None else global_config.ZMQ_CLIENT_POOL_WIDTH
+    
+    @width.setter
+    def width(self, value : typing.Optional[int]) -> None:
+        if value is not None and (not isinstance(value, int) or value < 1):
+            raise ValueError(f"width must be an integer greater than 0, given value : {value}")
+        self._width = value
+
+    def get(self, server_instance_name : str, protocol : str = ZMQ_PROTOCOLS.IPC, 
+            socket_address : typing.Optional[str] = None, zmq_serializer : typing.Any = None, 
+            **kwargs) -> SyncZMQClient:
+        """
+        a client for the server, created (and handshook) if less than ``width`` clients exist for the key. 
+        Other keyword arguments are passed to ``SyncZMQClient`` when creating the client and are not part of the key.
+        The client is created without holding the lock, callers for the same key wait only when no client is 
+        created yet, callers for other keys do not wait. 
+        """
+        key = (server_instance_name, str(protocol), socket_address, zmq_serializer)
+        with self._lock:
+            while True:
+                clients = self._clients.get(key, [])
+                creating = self._creating.get(key, 0)
+                if len(clients) + creating < self.width:
+                    self._creating[key] = creating + 1
+                    break 
+                if len(clients) > 0:
+                    index = self._next[key] % len(clients)
+                    self._next[key] = (index + 1) % len(clients)
+                    return clients[index]
+                self._published.wait() # first client of the key is being created
+        try:
+            client = SyncZMQClient(server_instance_name, f"{server_instance_name}|shared|{uuid4()}", 
+                                client_type=kwargs.pop('client_type', PROXY), protocol=protocol, 
+                                socket_address=socket_address, zmq_serializer=zmq_serializer, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._created(key)
+            raise
+        with self._lock:
+            self._created(key)
+            self._clients.setdefault(key, []).append(client)
+            self._next.setdefault(key, 0)
+        return client
+
+    def _created(self, key : typing.Tuple) -> None:
+        # to be called with the lock held, once a client of the key is created or could not be created
+        creating = self._creating.pop(key) - 1
+        if creating > 0:
+            self._creating[key] = creating
+        self._published.notify_all()
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        """
+        number of clients per server instance name & protocol
+        """
+        with self._lock:
+            return {f"{key[0]}|{key[1]}" : len(clients) for key, clients in self._clients.items()}
+
+    def clear(self) -> None:
+        """
+        exit all clients, proxies using them cannot be used anymore
+        """
+        with self._lock:
+            clients = [client for clients in self._clients.values() for client in clients]
+            self._clients.clear()
+            self._next.clear()
+        for client in clients:
+            client.exit()
+
+
+shared_zmq_clients = SharedZMQClients()
+
+
+
 class AsyncZMQClient(BaseZMQClient, BaseAsyncZMQ):
     """ 
     Asynchronous client to talk to a ZMQ server where the server is identified by the instance name. The identity 
     of the client needs to be different from the server, unlike the ZMQ Server. The client will also perform handshakes 
     if necessary.
+
+    Replies are received by a background task (started with the first instruction in the running event loop) which
+    resolves the future of the reply by its message ID. Therefore many coroutines can send instructions at once 
+    and await their replies in any order without a lock. The future of a reply is kept in the reply cache (see 
+    ``BaseZMQClient``) until it is awaited.
     """
 
     def __init__(self, server_instance_name : str, identity : str, client_type = HTTP_SERVER, 
@@ -1603,7 +4029,11 @@ class AsyncZMQClient(BaseZMQClient, BaseAsyncZMQ):
         self._terminate_context = context == None
         self._handshake_event = asyncio.Event()
         self._handshake_event.clear()
-        self._client_queue = asyncio.Lock()
+        self._receiver = None # type: typing.Optional[SocketReceiver]
+        self._receiver_loop = None # type: typing.Optional[asyncio.AbstractEventLoop]
+        self._receiver_task = None # type: typing.Optional[asyncio.Task]
+        self._awaited_replies = dict() # type: typing.Dict[bytes, asyncio.Future]
+        self._reply_cache.on_discard = self._discard_reply
         if handshake:
             self.handshake(kwargs.pop("handshake_timeout", 60000))
     
@@ -1618,6 +4048,7 @@ class AsyncZMQClient(BaseZMQClient, BaseAsyncZMQ):
         """
         hanshake with server before sending first message
         """
+        self._stop_receiving() # the handshake reply is received here
         if self._monitor_socket is not None and self._monitor_socket in self.poller:
             self.poller.unregister(self._monitor_socket)
         self._handshake_event.clear()
@@ -1636,6 +4067,7 @@ class AsyncZMQClient(BaseZMQClient, BaseAsyncZMQ):
                     if message[3] == HANDSHAKE:  # type: ignore
                         self.logger.info(f"client '{self.identity}' handshook with server '{self.instance_name}'")
                         self.server_type = message[SM_INDEX_SERVER_TYPE]
+                        self._negotiate_message_format(message)
                         break
                     else:
                         raise ConnectionAbortedError(f"Handshake cannot be done with '{self.instance_name}'. Another message arrived before handshake complete.")
@@ -1651,6 +4083,16 @@ class AsyncZMQClient(BaseZMQClient, BaseAsyncZMQ):
         wait for handshake to complete
         """
         await self._handshake_event.wait()
+
+    async def async_fetch_opcodes(self) -> None:
+        """
+        fetch the opcodes of the instructions from the server (``Thing.opcodes``) so that opcodes are sent instead of 
+        instruction strings. Has no effect unless compact header was negotiated at handshake.
+        """
+        if not self._use_compact_header:
+            return
+        self.opcodes = (await self.async_execute(CommonRPC.opcodes_read(self.instance_name), 
+                                                raise_client_side_exception=True))[SM_INDEX_DATA]
        
     async def async_send_instruction(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT, 
                     invokation_timeout : typing.Optional[float] = None, execution_timeout : typing.Optional[float] = None,
@@ -1686,42 +4128,128 @@ class AsyncZMQClient(BaseZMQClient, BaseAsyncZMQ):
         message id : bytes
             a byte representation of message id
         """
-        message = self.craft_instruction_from_arguments(instruction, arguments, invokation_timeout, context) 
-        await self.socket.send_multipart(message)
-        self.logger.debug(f"sent instruction '{instruction}' to server '{self.instance_name}' with msg-id {message[SM_INDEX_MESSAGE_ID]}")
-        return message[SM_INDEX_MESSAGE_ID]
+        message_id = await self._send(self.craft_instruction(instruction, arguments, invokation_timeout, context))
+        self.logger.debug(f"sent instruction '{instruction}' to server '{self.instance_name}' with msg-id {message_id}")
+        return message_id
+
+    async def _send(self, message : typing.List[bytes]) -> bytes:
+        """
+        register the future which is resolved by the reply of a message, then send the message
+        """
+        self._receive_replies()
+        message_id = get_message_id(message)
+        self._reply_cache[message_id] = asyncio.get_running_loop().create_future()
+        try:
+            await self.socket.send_multipart(message, copy=copy_frames(message))
+        except BaseException:
+            self._reply_cache.pop(message_id, None)
+            raise
+        return message_id
+
+    def _receive_replies(self) -> None:
+        """
+        start the background task receiving replies in the running event loop, unless already running in it
+        """
+        loop = asyncio.get_running_loop()
+        if self._receiver is not None and self._receiver_loop is loop and self._receiver.running:
+            return
+        self._stop_receiving()
+        self._receiver = SocketReceiver(self._on_server_message, self.logger)
+        self._receiver.register(self.socket)
+        if self._monitor_socket is not None:
+            self._receiver.register(self._monitor_socket)
+        self._receiver_loop = loop
+        self._receiver_task = loop.create_task(self._receiver.run())
+
+    def _stop_receiving(self) -> None:
+        """
+        stop the background task receiving replies, for example when the replies are to be received by a client pool
+        """
+        if self._receiver is None:
+            return
+        # cancelled instead of SocketReceiver.stop() as the task may not have started yet
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._receiver_loop:
+            self._receiver_task.cancel()
+        elif not self._receiver_loop.is_closed():
+            self._receiver_loop.call_soon_threadsafe(self._receiver_task.cancel)
+        self._receiver = None
+        self._receiver_task = None
+
+    def _on_server_message(self, socket : zmq.asyncio.Socket, message : typing.List[bytes]) -> None:
+        if len(message) == 2: # socket monitor message
+            try:
+                self.parse_server_message(message)
+            except ConnectionAbortedError as ex:
+                # replies awaited or yet to be awaited never arrive
+                futures = [future for future in list(self._awaited_replies.values()) + self._reply_cache.values()
+                            if not future.done()]
+                self.logger.error(f"{str(ex)}, failing {len(futures)} pending replies")
+                for future in futures:
+                    future.set_exception(ConnectionAbortedError(str(ex)))
+            return
+        if message[SM_INDEX_MESSAGE_TYPE] == HANDSHAKE:
+            self.parse_server_message(message)
+            return
+        message_id = message[SM_INDEX_MESSAGE_ID]
+        future = self._awaited_replies.get(message_id, None) or self._reply_cache.get(message_id, None)
+        if future is None or future.done(): # not awaited anymore, for example, cancelled or timed out
+            self.logger.debug(f"dropped reply with unknown or expired message ID '{message_id}'")
+            self._release_shared_memory(message)
+            return
+        for handle in self._shared_memory_handles(message):
+            self._shared_memory_ring.claim(handle) # reply may be parsed after the lease of the server
+        future.set_result(message) # parsed by the awaiting coroutine
+
+    def _discard_reply(self, future : asyncio.Future) -> None:
+        """
+        release the shared memory held by a reply which is forgotten by the reply cache
+        """
+        if future.done() and not future.cancelled() and future.exception() is None:
+            self._release_shared_memory(future.result())
     
     async def async_recv_reply(self, message_id : bytes, timeout : typing.Optional[int] = None, 
                         raise_client_side_exception : bool = False, deserialize : bool = True) -> typing.List[
                                                                     typing.Union[bytes, typing.Dict[str, typing.Any]]]:
         """
-        Receives reply from server. Messages are identified by message id, so call this method immediately after 
-        calling ``send_instruction()`` to avoid receiving messages out of order. Or, use other methods like
-        ``execute()``, ``read_attribute()`` or ``write_attribute()``.
+        Receives reply from server. Messages are identified by message id and replies are received in the 
+        background, so replies of instructions sent concurrently can be awaited in any order.
 
         Parameters
         ----------
+        message_id: bytes
+            message id of the instruction
+        timeout: int, optional
+            milliseconds to wait for the reply, None is returned if the reply did not arrive within the timeout 
+            and the reply can be awaited again. 
         raise_client_side_exception: bool, default False
             if True, any exceptions raised during execution inside ``Thing`` instance will be raised on the client.
             See docs of ``raise_local_exception()`` for info on exception 
         """
-        while True:
-            sockets = await self.poller.poll(timeout)
-            reply = None
-            for socket, _ in sockets:
-                try:    
-                    message = await socket.recv_multipart(zmq.NOBLOCK)
-                    reply = self.parse_server_message(message, raise_client_side_exception, deserialize) # type: ignore
-                except zmq.Again:
-                    pass 
-            if reply:
-                if message_id != reply[SM_INDEX_MESSAGE_ID]:
-                    self._reply_cache[message_id] = reply
-                    continue 
-                self.logger.debug(f"received reply with message-id '{reply[SM_INDEX_MESSAGE_ID]}'")
-                return reply
-            if timeout is not None:
-                break
+        self._receive_replies()
+        future = self._reply_cache.pop(message_id, None)
+        if future is None: # not sent by this client or expired
+            future = asyncio.get_running_loop().create_future()
+        self._awaited_replies[message_id] = future
+        try:
+            if timeout is None:
+                message = await future
+            else:
+                message = await asyncio.wait_for(asyncio.shield(future), timeout / 1000)
+        except TimeoutError:
+            self._reply_cache[message_id] = future
+            return None
+        except asyncio.CancelledError:
+            self._discard_reply(future) # arrived meanwhile, a later reply is dropped on arrival
+            raise
+        finally:
+            self._awaited_replies.pop(message_id, None)
+        reply = self.parse_server_message(message, raise_client_side_exception, deserialize)
+        self.logger.debug(f"received reply with message-id '{message_id}'")
+        return reply
             
     async def async_execute(self, instruction : str, arguments : typing.Dict[str, typing.Any] = EMPTY_DICT, 
                     invokation_timeout : typing.Optional[float] = None, execution_timeout : typing.Optional[float] = None, 
@@ -1746,23 +4274,54 @@ class AsyncZMQClient(BaseZMQClient, BaseAsyncZMQ):
         message id : bytes
             a byte representation of message id
         """
-        try:
-            await asyncio.wait_for(self._client_queue.acquire(), timeout=invokation_timeout)
-        except TimeoutError:
-            raise TimeoutError("previous request still in progress") from None
-        try:
-            msg_id = await self.async_send_instruction(instruction, arguments, invokation_timeout, execution_timeout, 
-                                                    context, argument_schema)
-            return await self.async_recv_reply(msg_id, raise_client_side_exception=raise_client_side_exception, 
-                                            deserialize=deserialize_reply)
-        finally:
-            self._client_queue.release()
+        if self._refetch_opcodes:
+            self._refetch_opcodes = False
+            await self.async_fetch_opcodes()
+        msg_id = await self.async_send_instruction(instruction, arguments, invokation_timeout, execution_timeout, 
+                                                context, argument_schema)
+        return await self.async_recv_reply(msg_id, raise_client_side_exception=raise_client_side_exception, 
+                                        deserialize=deserialize_reply)
+
+    async def async_send_batch(self, instructions : typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]], 
+                invokation_timeout : typing.Optional[float] = None, 
+                context : typing.Dict[str, typing.Any] = EMPTY_DICT) -> bytes:
+        """
+        send a batch of instructions to the server, see ``SyncZMQClient.send_batch()``
+        """
+        message_id = await self._send(self.craft_batch(instructions, invokation_timeout, context))
+        self.logger.debug(f"sent batch of {len(instructions)} instructions to server '{self.instance_name}' with msg-id {message_id}")
+        return message_id
+
+    async def async_execute_batch(self, instructions : typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]], 
+                invokation_timeout : typing.Optional[float] = None, context : typing.Dict[str, typing.Any] = EMPTY_DICT, 
+                raise_client_side_exception : bool = False, 
+                deserialize_reply : bool = True) -> typing.List[typing.Union[bytes, typing.List[typing.Dict[str, typing.Any]]]]:
+        """
+        send a batch of instructions and receive the single reply for it, see ``SyncZMQClient.execute_batch()``
+        """
+        if self._refetch_opcodes:
+            self._refetch_opcodes = False
+            await self.async_fetch_opcodes()
+        msg_id = await self.async_send_batch(instructions, invokation_timeout, context)
+        return await self.async_recv_reply(msg_id, raise_client_side_exception=raise_client_side_exception, 
+                                        deserialize=deserialize_reply)
+
+    def exit(self) -> None:
+        if hasattr(self, '_receiver'):
+            self._stop_receiving()
+        super().exit()
    
 
         
 class MessageMappedZMQClientPool(BaseZMQClient):
     """
-    Pool of clients where message ID can track the replies irrespective of order of arrival. 
+    Pool of clients where message ID can track the replies irrespective of order of arrival. Replies are received
+    by one task per socket (see ``poll()``), the socket of a client has to be registered with ``register_client()`` 
+    once the client is ready to be used through the pool. 
+
+    The future of a reply is kept in the reply cache (``reply_cache_ttl`` & ``reply_cache_size``, see 
+    ``BaseZMQClient``) from sending the instruction until ``async_recv_reply()`` awaits it, so that futures of 
+    replies which are never awaited are forgotten. See ``stats`` for the sizes of the bookkeeping.
     """
 
     def __init__(self, server_instance_names: typing.List[str], identity: str, client_type = HTTP_SERVER,
@@ -1775,21 +4334,20 @@ class MessageMappedZMQClientPool(BaseZMQClient):
         # this class does not call create_socket method
         self.context = context or zmq.asyncio.Context()
         self.pool = dict() # type: typing.Dict[str, AsyncZMQClient]
-        self.poller = zmq.asyncio.Poller()
+        self._receiver = SocketReceiver(self._on_server_message, self.logger)
         for instance_name in server_instance_names:
             client = AsyncZMQClient(server_instance_name=instance_name,
-                identity=identity, client_type=client_type, handshake=handshake, protocol=protocol, 
+                identity=identity, client_type=client_type, handshake=handshake, 
                 context=self.context, zmq_serializer=self.zmq_serializer, http_serializer=self.http_serializer,
-                logger=self.logger)
+                logger=self.logger, **self._resolve_protocol(instance_name, protocol))
             client._monitor_socket = client.socket.get_monitor_socket()
-            self.poller.register(client._monitor_socket, zmq.POLLIN)
+            self._receiver.register(client._monitor_socket)
             self.pool[instance_name] = client
         # Both the client pool as well as the individual client get their serializers and client_types
         # This is required to implement pool level sending and receiving messages like polling of pool of sockets
-        self.event_pool = AsyncioEventPool(len(server_instance_names))
-        self.events_map = dict() # type: typing.Dict[bytes, asyncio.Event]
-        self.message_map = dict()
-        self.cancelled_messages = []
+        self._awaited_replies = dict() # type: typing.Dict[bytes, asyncio.Future]
+        self._pending_replies = dict() # type: typing.Dict[str, weakref.WeakSet[asyncio.Future]] # per server
+        self._dropped_replies = 0
         self.poll_timeout = poll_timeout
         self.stop_poll = False 
         self._deserialize_server_messages = deserialize_server_messages
@@ -1807,20 +4365,41 @@ class MessageMappedZMQClientPool(BaseZMQClient):
         """
         if server_instance_name not in self.pool.keys():
             client = AsyncZMQClient(server_instance_name=server_instance_name,
-                identity=self.identity, client_type=self.client_type, handshake=True, protocol=protocol, 
+                identity=self.identity, client_type=self.client_type, handshake=True, 
                 context=self.context, zmq_serializer=self.zmq_serializer, http_serializer=self.http_serializer,
-                logger=self.logger)
+                logger=self.logger, **self._resolve_protocol(server_instance_name, protocol))
             client._monitor_socket = client.socket.get_monitor_socket()
-            self.poller.register(client._monitor_socket, zmq.POLLIN)
+            self._receiver.register(client._monitor_socket)
             self.pool[server_instance_name] = client
         else: 
             raise ValueError(f"client for instance name '{server_instance_name}' already present in pool")
 
+    @staticmethod
+    def _resolve_protocol(instance_name : str, protocol : str) -> typing.Dict[str, str]:
+        """
+        connect through TCP to servers registered on this host (``ThingRegistry``) without an IPC socket
+        """
+        if protocol == ZMQ_PROTOCOLS.IPC or protocol == "IPC":
+            entry = thing_registry.lookup(instance_name)
+            if entry is not None and 'IPC' not in entry['endpoints'] and 'TCP' in entry['endpoints']:
+                return dict(protocol=ZMQ_PROTOCOLS.TCP, 
+                            socket_address=thing_registry.resolve(instance_name, ZMQ_PROTOCOLS.TCP))
+        return dict(protocol=protocol)
+
+    def register_client(self, client : AsyncZMQClient) -> None:
+        """
+        receive the replies for a client of the pool, to be called once the client handshook with its server 
+        (and the application is ready to route requests to it). Replies are received immediately if the pool 
+        is polling, otherwise once ``poll()`` is started. 
+        """
+        client._stop_receiving()
+        self._receiver.register(client.socket)
+
 
     @property
     def poll_timeout(self) -> int:
         """
-        socket polling timeout in milliseconds greater than 0. 
+        socket polling timeout in milliseconds greater than 0, unused as replies are awaited without a timeout. 
         """
         return self._poll_timeout
 
@@ -1833,91 +4412,86 @@ class MessageMappedZMQClientPool(BaseZMQClient):
 
     async def poll(self) -> None:
         """
-        Poll for replies from server. Since the client is message mapped, this method should be independently started
-        in the event loop. Sending message and retrieving a message mapped is still carried out by other methods.
+        Receive replies from servers until ``stop_polling()`` is called. Since the client is message mapped, this method 
+        should be independently started in the event loop. Sending message and retrieving a message mapped is still 
+        carried out by other methods. Each registered socket is awaited by its own task, idle sockets do not wake up 
+        the event loop.
         """
         self.logger.info("client polling started for sockets for {}".format(list(self.pool.keys())))
         self.stop_poll = False 
-        event_loop = asyncio.get_event_loop()
-        while not self.stop_poll:
-            sockets = await self.poller.poll(self.poll_timeout) # type hints dont work in this line
-            for socket, _ in sockets:
-                while True:
-                    try:
-                        reply = self.parse_server_message(await socket.recv_multipart(zmq.NOBLOCK),
-                                                    deserialize=self._deserialize_server_messages)
-                        if not reply:
-                            continue
-                    except zmq.Again:
-                        # errors in handle_message should reach the client. 
-                        break
-                    except ConnectionAbortedError:
-                        for client in self.pool.values():
-                            if client.socket.get_monitor_socket() == socket:
-                                self.poller.unregister(client.socket) # leave the monitor in the pool
-                                client.handshake(timeout=None)
-                                self.logger.error(f"{client.instance_name} disconnected." +
-                                    " Unregistering from poller temporarily until server comes back.")
-                                break
-                    else:
-                        address, _, server_type, message_type, message_id, data, encoded_data = reply
-                        self.logger.debug(f"received reply from server '{address}' with message ID '{message_id}'")
-                        if message_id in self.cancelled_messages:
-                            self.cancelled_messages.remove(message_id)
-                            self.logger.debug(f"message_id '{message_id}' cancelled")
-                            continue
-                        event = self.events_map.get(message_id, None) 
-                        if event:
-                            if len(encoded_data) > 0:
-                                self.message_map[message_id] = encoded_data
-                            else:
-                                self.message_map[message_id] = data
-                            event.set()
-                        else:    
-                            if len(encoded_data) > 0:
-                                invalid_event_task = asyncio.create_task(self._resolve_reply(message_id, encoded_data))
-                            else:
-                                invalid_event_task = asyncio.create_task(self._resolve_reply(message_id, data))
-                            event_loop.call_soon(lambda: invalid_event_task)
-
-
-    async def _resolve_reply(self, message_id : bytes, data : typing.Any) -> None:
-        """
-        This method is called when there is an asyncio Event not available for a message ID. This can happen only 
-        when the server replied before the client created a asyncio.Event object. check ``async_execute()`` for details.
+        await self._receiver.run()
+        self.logger.info("client polling stopped for sockets for {}".format(list(self.pool.keys())))
 
-        Parameters
-        ----------
-        message_id: bytes 
-            the message for which the event was not created
-        data: bytes
-            the data given by the server which needs to mapped to the message
-        """
-        max_number_of_retries = 100
-        for i in range(max_number_of_retries):
-            await asyncio.sleep(0.025)
-            try:
-                event = self.events_map[message_id]
-            except KeyError:
-                if message_id in self.cancelled_messages:
-                    # Only for safety, likely should never reach here
-                    self.cancelled_messages.remove(message_id)
-                    self.logger.debug(f'message_id {message_id} cancelled')
-                    return 
-                if i >= max_number_of_retries - 1:
-                    self.logger.error("unknown message id {} without corresponding event object".format(message_id)) 
-                    return
-            else:    
-                self.message_map[message_id] = data
-                event.set()
-                break
+    def _on_server_message(self, socket : zmq.asyncio.Socket, message : typing.List[bytes]) -> None:
+        try:
+            reply = self.parse_server_message(message, deserialize=self._deserialize_server_messages)
+        except ConnectionAbortedError as ex:
+            for client in self.pool.values():
+                if client._monitor_socket is socket:
+                    self._receiver.unregister(client.socket) # leave the monitor in the pool
+                    client.handshake(timeout=None)
+                    self.logger.error(f"{client.instance_name} disconnected." +
+                        " Unregistering from poller temporarily until server comes back.")
+                    self._fail_pending_replies(client, ex)
+                    break
+            return
+        if not reply:
+            return
+        if self._refetch_opcodes:
+            # opcodes rejected by the server, the message was parsed on behalf of the client of the socket
+            self._refetch_opcodes = False
+            for client in self.pool.values():
+                if client.socket is socket:
+                    client.opcodes = dict()
+                    client._refetch_opcodes = True
+                    break
+        address, _, server_type, message_type, message_id, data, encoded_data = reply[:SM_INDEX_OUT_OF_BAND_DATA]
+        self.logger.debug(f"received reply from server '{address}' with message ID '{message_id}'")
+        future = self._awaited_replies.get(message_id, None) or self._reply_cache.get(message_id, None)
+        if future is None:
+            # reply arrived after the client side timeout, the awaiting task was cancelled or the future expired
+            self._dropped_replies += 1
+            self.logger.debug(f"dropped reply with unknown or cancelled message ID '{message_id}'")
+            return
+        if not future.done():
+            future.set_result(encoded_data if len(encoded_data) > 0 else data)
+
+    def _fail_pending_replies(self, client : AsyncZMQClient, ex : Exception) -> None:
+        """
+        fail the futures of the replies yet to arrive from a disconnected server, awaited or not, as they never will
+        """
+        futures = [future for future in self._pending_replies.pop(client.instance_name, ()) if not future.done()]
+        for future in futures:
+            future.set_exception(ConnectionAbortedError(str(ex)))
+            future.exception() # not logged when never awaited 
+        if len(futures) > 0:
+            self.logger.error(f"failed {len(futures)} replies awaited from {client.instance_name}")
+
+    def _expect_reply(self, client : AsyncZMQClient, message : typing.List[bytes]) -> bytes:
+        """
+        register the future which is resolved by the reply of a message, before the message is sent
+        """
+        message_id = get_message_id(message)
+        future = asyncio.get_running_loop().create_future()
+        self._reply_cache[message_id] = future
+        self._pending_replies.setdefault(client.instance_name, weakref.WeakSet()).add(future)
+        return message_id
+
+    async def _send(self, client : AsyncZMQClient, message : typing.List[bytes]) -> bytes:
+        message_id = self._expect_reply(client, message)
+        try:
+            await client.socket.send_multipart(message, copy=copy_frames(message))
+        except BaseException:
+            self._reply_cache.pop(message_id, None)
+            raise
+        return message_id
 
     def assert_client_ready(self, client : AsyncZMQClient):
         if not client._handshake_event.is_set():
             raise ConnectionAbortedError(f"{client.instance_name} is currently not alive")
-        if not client.socket in self.poller._map:
+        if not client.socket in self._receiver:
             raise ConnectionError("handshake complete, server is alive but client socket not yet ready to be polled." +
-                                "Application using MessageMappedClientPool should register the socket manually for polling." +
+                                "Application using MessageMappedClientPool should register the client with register_client()." +
                                 "If using hololinked.server.HTTPServer, socket is waiting until HTTP Server updates its "
                                 "routing logic as the server has just now come alive, please try again soon.")
 
@@ -1927,7 +4501,8 @@ class MessageMappedZMQClientPool(BaseZMQClient):
                 context : typing.Dict[str, typing.Any] = EMPTY_DICT, argument_schema : typing.Optional[JSON] = None) -> bytes:
         """
         Send instruction to server with instance name. Replies are automatically polled & to be retrieved using 
-        ``async_recv_reply()``
+        ``async_recv_reply()``. The reply is awaited by a future registered before the instruction is sent, 
+        so that a reply arriving immediately is not missed.
 
         Parameters
         ----------
@@ -1946,12 +4521,10 @@ class MessageMappedZMQClientPool(BaseZMQClient):
         message_id: bytes
             created message ID
         """
-        self.assert_client_ready(self.pool[instance_name])
-        message_id = await self.pool[instance_name].async_send_instruction(instruction=instruction, arguments=arguments, 
-                                            invokation_timeout=invokation_timeout, execution_timeout=execution_timeout, 
-                                            context=context, argument_schema=argument_schema)
-        event = self.event_pool.pop()
-        self.events_map[message_id] = event 
+        client = self.pool[instance_name]
+        self.assert_client_ready(client)
+        message_id = await self._send(client, client.craft_instruction(instruction, arguments, invokation_timeout, context))
+        self.logger.debug(f"sent instruction '{instruction}' to server '{instance_name}' with msg-id {message_id}")
         return message_id
 
     async def async_recv_reply(self, instance_name : str, message_id : bytes, raise_client_side_exception = False,
@@ -1984,27 +4557,21 @@ class MessageMappedZMQClientPool(BaseZMQClient):
         TimeoutError:
             if timeout is not None and reply did not arrive
         """
+        future = self._reply_cache.pop(message_id, None)
+        if future is None:
+            raise ValueError(f"message id {message_id} unknown, already awaited or expired.")
+        self._awaited_replies[message_id] = future
         try:
-            event = self.events_map[message_id]
-        except KeyError:
-            raise ValueError(f"message id {message_id} unknown.") from None
-        while True:
-            try:
-                await asyncio.wait_for(event.wait(), timeout if (timeout and timeout > 0) else 5) 
-                # default 5 seconds because we want to check if server is also dead
-                if event.is_set():
-                    break
-                self.assert_client_ready(self.pool[instance_name])
-            except TimeoutError:
-                if timeout is None:
-                    continue
-                self.cancelled_messages.append(message_id)
-                self.logger.debug(f'message_id {message_id} added to list of cancelled messages')
-                raise TimeoutError(f"Execution not completed within {timeout} seconds") from None
-        self.events_map.pop(message_id)
-        self.event_pool.completed(event)
-        reply = self.message_map.pop(message_id)
-        if raise_client_side_exception and reply.get('exception', None) is not None:
+            if timeout is None:
+                reply = await future
+            else:
+                reply = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except TimeoutError:
+            self.logger.debug(f'message_id {message_id} cancelled, reply will be dropped')
+            raise TimeoutError(f"Execution not completed within {timeout} seconds") from None
+        finally:
+            self._awaited_replies.pop(message_id, None)
+        if raise_client_side_exception and isinstance(reply, dict) and reply.get('exception', None) is not None:
             self.raise_local_exception(reply['exception'])
         return reply
 
@@ -2036,12 +4603,74 @@ class MessageMappedZMQClientPool(BaseZMQClient):
             drops execution altogether if timeout occured. Client side timeouts only wait for message to come within 
             the timeout, but do not gaurantee non-execution.  
         """
+        await self._refetch_opcodes_if_rejected(instance_name)
         message_id = await self.async_send_instruction(instance_name=instance_name, instruction=instruction, 
                                                     arguments=arguments, invokation_timeout=invokation_timeout, 
                                                     execution_timeout=execution_timeout, context=context, 
                                                     argument_schema=argument_schema)
         return await self.async_recv_reply(instance_name=instance_name, message_id=message_id, 
                                                 raise_client_side_exception=raise_client_side_exception, timeout=None)
+    
+    async def _refetch_opcodes_if_rejected(self, instance_name : str) -> None:
+        """
+        fetch the opcodes of the server again if it rejected the opcodes the client sent last
+        """
+        client = self.pool[instance_name]
+        if client._refetch_opcodes:
+            client._refetch_opcodes = False
+            opcodes = await self.async_execute(instance_name, CommonRPC.opcodes_read(instance_name), 
+                                            raise_client_side_exception=True)
+            client.opcodes = opcodes if isinstance(opcodes, dict) else self.http_serializer.loads(opcodes)
+
+    async def async_execute_batch(self, instance_name : str, 
+                    instructions : typing.List[typing.Tuple[str, typing.Dict[str, typing.Any]]], 
+                    *, context : typing.Dict[str, typing.Any] = EMPTY_DICT, raise_client_side_exception = False, 
+                    invokation_timeout : typing.Optional[float] = 5, 
+                    execution_timeout : typing.Optional[float] = None) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        sends a batch of instructions and receives the single reply for it. Instructions are executed in order 
+        in one pass by the ``Thing``.
+
+        Parameters
+        ----------
+        instance_name: str
+            instance name of the server
+        instructions: List[Tuple[str, Dict[str, Any]]]
+            (instruction, arguments) pairs, instructions of sub-things may be mixed.
+        context: Dict[str, Any]
+            see execution context definitions
+        raise_client_side_exceptions: bool, default False
+            raise exceptions from server on client side, exceptions of individual items are returned within the reply
+        invokation_timeout: float, default 5
+            server side timeout
+        execution_timeout: float, default None
+            client side timeout, see ``async_execute()``
+
+        Returns
+        -------
+        reply: List[Dict[str, Any]]
+            ``{"returnValue" : value}`` or ``{"exception" : exception}`` for each item
+        """
+        await self._refetch_opcodes_if_rejected(instance_name)
+        client = self.pool[instance_name]
+        self.assert_client_ready(client)
+        message_id = await self._send(client, client.craft_batch(instructions, invokation_timeout, context))
+        self.logger.debug(f"sent batch of {len(instructions)} instructions to server '{instance_name}' with msg-id {message_id}")
+        return await self.async_recv_reply(instance_name=instance_name, message_id=message_id, 
+                                                raise_client_side_exception=raise_client_side_exception, 
+                                                timeout=execution_timeout)
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        number of replies currently awaited, the reply cache holding futures of replies not yet awaited (and the 
+        number of them forgotten) and the number of replies dropped as nothing awaited them anymore
+        """
+        return dict(
+            awaited_replies=len(self._awaited_replies),
+            reply_cache=self._reply_cache.stats,
+            dropped_replies=self._dropped_replies
+        )
 
     def start_polling(self) -> None:
         """
@@ -2052,9 +4681,10 @@ class MessageMappedZMQClientPool(BaseZMQClient):
 
     def stop_polling(self):
         """
-        stop polling for replies from server
+        stop polling for replies from server, can be called from any thread
         """
         self.stop_poll = True
+        self._receiver.stop()
 
     async def async_execute_in_all(self, instruction : str, instance_names : typing.Optional[typing.List[str]] = None,  
                         arguments : typing.Dict[str, typing.Any] = EMPTY_DICT, context : typing.Dict[str, typing.Any] = EMPTY_DICT, 
@@ -2116,9 +4746,10 @@ class MessageMappedZMQClientPool(BaseZMQClient):
     
     def exit(self) -> None:
         BaseZMQ.exit(self)
+        self._receiver.stop()
         for client in self.pool.values():
-            self.poller.unregister(client.socket)
-            self.poller.unregister(client.socket.get_monitor_socket())
+            self._receiver.unregister(client.socket)
+            self._receiver.unregister(client._monitor_socket)
             client.exit()
         self.logger.info("all client socket unregistered from pool for '{}'".format(self.__class__))
         try:
@@ -2129,40 +4760,6 @@ class MessageMappedZMQClientPool(BaseZMQClient):
                             "'{}'. Exception message : {}".format(self.identity, str(ex)))
 
 
-class AsyncioEventPool:
-    """
-    creates a pool of asyncio Events to be used as a synchronisation object for MessageMappedClientPool
-
-    Parameters
-    ----------
-    initial_number_of_events: int
-        initial pool size of events
-    """
-
-    def __init__(self, initial_number_of_events : int) -> None:
-        self.pool = [asyncio.Event() for i in range(initial_number_of_events)] 
-        self.size = initial_number_of_events
-
-    def pop(self) -> asyncio.Event:
-        """
-        pop an event, new one is created if nothing left in pool
-        """
-        try:
-            event = self.pool.pop(0)
-        except IndexError:
-            self.size += 1
-            event = asyncio.Event()
-        event.clear()
-        return event
-
-    def completed(self, event : asyncio.Event) -> None:
-        """
-        put an event back into the pool
-        """
-        self.pool.append(event)
-
-
-
 class EventPublisher(BaseZMQServer, BaseSyncZMQ):
 
     def __init__(self, instance_name : str, protocol : str, 
@@ -2206,7 +4803,8 @@ class EventPublisher(BaseZMQServer, BaseSyncZMQ):
             warnings.warn(f"event {event._name} not found in list of events, please use another name.", UserWarning)
                
     def publish(self, unique_identifier : bytes, data : typing.Any, *, zmq_clients : bool = True, 
-                        http_clients : bool = True, serialize : bool = True) -> None: 
+                        http_clients : bool = True, serialize : bool = True, 
+                        track : bool = False) -> typing.Optional[zmq.MessageTracker]: 
         """
         publish an event with given unique name. 
 
@@ -2217,31 +4815,52 @@ class EventPublisher(BaseZMQServer, BaseSyncZMQ):
         data: Any
             payload of the event
         serialize: bool, default True
-            serialize the payload before pushing, set to False when supplying raw bytes
+            serialize the payload before pushing, set to False when supplying raw bytes or any object supporting 
+            the buffer protocol (for example, a numpy array), which is sent without copying when large 
+            (see ``copy_frames()``). When serialized with a RPC specific serializer (i.e. not JSON), numpy arrays 
+            within the payload are sent to RPC clients as out-of-band frames.
         zmq_clients: bool, default True
             pushes event to RPC clients
         http_clients: bool, default True
             pushed event to HTTP clients
+        track: bool, default False
+            return a ``zmq.MessageTracker`` when the payload was sent without copying, whose ``done`` property 
+            (or ``wait()`` method) tells when the buffer of the payload may be modified again. 
+
+        Returns
+        -------
+        tracker: zmq.MessageTracker | None
+            when ``track`` is True and the payload was not copied, otherwise None
         """
-        if unique_identifier in self.event_ids:
-            if serialize:
-                if isinstance(self.zmq_serializer , JSONSerializer):
-                    self.socket.send_multipart([unique_identifier, self.http_serializer.dumps(data)])
-                    return
+        if unique_identifier not in self.event_ids:
+            raise AttributeError("event name {} not yet registered with socket {}".format(unique_identifier, self.socket_address))
+        messages = []
+        if serialize:
+            if isinstance(self.zmq_serializer , JSONSerializer):
+                messages.append([unique_identifier, self.http_serializer.dumps(data)])
+            else:
                 if zmq_clients:
                     # TODO - event id should not any longer be unique
-                    self.socket.send_multipart([b'zmq-' + unique_identifier, self.zmq_serializer.dumps(data)])
-                if http_clients:
-                    self.socket.send_multipart([unique_identifier, self.http_serializer.dumps(data)])
-            elif not isinstance(self.zmq_serializer , JSONSerializer):
-                if zmq_clients:
-                    self.socket.send_multipart([b'zmq-' + unique_identifier, data])
+                    payload, out_of_band_frames = self.zmq_serializer.dumps_out_of_band(data)
+                    messages.append([b'zmq-' + unique_identifier, payload, *out_of_band_frames])
                 if http_clients:
-                    self.socket.send_multipart([unique_identifier, data])
-            else: 
-                self.socket.send_multipart([unique_identifier, data])
-        else:
-            raise AttributeError("event name {} not yet registered with socket {}".format(unique_identifier, self.socket_address))
+                    messages.append([unique_identifier, self.http_serializer.dumps(data)])
+        elif not isinstance(self.zmq_serializer , JSONSerializer):
+            if zmq_clients:
+                messages.append([b'zmq-' + unique_identifier, data])
+            if http_clients:
+                messages.append([unique_identifier, data])
+        else: 
+            messages.append([unique_identifier, data])
+        trackers = []
+        for message in messages:
+            copy = copy_frames(message)
+            tracker = self.socket.send_multipart(message, copy=copy, track=track and not copy)
+            if tracker is not None:
+                trackers.append(tracker)
+        if len(trackers) > 0:
+            return zmq.MessageTracker(*trackers)
+        return None
         
     def exit(self):
         if not hasattr(self, 'logger'):
@@ -2380,7 +4999,7 @@ class AsyncEventConsumer(BaseEventConsumer):
         deserialize: bool, default True
             deseriliaze the data, use False for HTTP server sent event to simply bypass
         """
-        contents = None
+        contents, out_of_band_frames = None, []
         sockets = await self.poller.poll(timeout) 
         if len(sockets) > 1:
             if socket[0] == self.interrupting_peer:
@@ -2389,7 +5008,7 @@ class AsyncEventConsumer(BaseEventConsumer):
                 sockets = [socket[1]]
         for socket, _ in sockets:
             try:
-                _, contents = await socket.recv_multipart(zmq.NOBLOCK)
+                _, contents, *out_of_band_frames = await socket.recv_multipart(zmq.NOBLOCK)
             except zmq.Again:
                 pass     
         if not deserialize or not contents: 
@@ -2397,6 +5016,8 @@ class AsyncEventConsumer(BaseEventConsumer):
         if self.client_type == HTTP_SERVER:
             return self.http_serializer.loads(contents)
         elif self.client_type == PROXY:
+            if out_of_band_frames:
+                return self.zmq_serializer.loads_out_of_band(contents, out_of_band_frames)
             return self.zmq_serializer.loads(contents)
         else:
             raise ValueError("invalid client type")
@@ -2459,7 +5080,7 @@ class EventConsumer(BaseEventConsumer):
         deserialize: bool, default True
             deseriliaze the data, use False for HTTP server sent event to simply bypass
         """
-        contents = None
+        contents, out_of_band_frames = None, []
         sockets = self.poller.poll(timeout) # typing.List[typing.Tuple[zmq.Socket, int]]
         if len(sockets) > 1:
             if socket[0] == self.interrupting_peer:
@@ -2468,7 +5089,7 @@ class EventConsumer(BaseEventConsumer):
                 sockets = [socket[1]]
         for socket, _ in sockets:
             try:
-                _, contents = socket.recv_multipart(zmq.NOBLOCK) 
+                _, contents, *out_of_band_frames = socket.recv_multipart(zmq.NOBLOCK)
             except zmq.Again:
                 pass
         if not deserialize: 
@@ -2476,6 +5097,8 @@ class EventConsumer(BaseEventConsumer):
         if self.client_type == HTTP_SERVER:
             return self.http_serializer.loads(contents)
         elif self.client_type == PROXY:
+            if out_of_band_frames:
+                return self.zmq_serializer.loads_out_of_band(contents, out_of_band_frames)
             return self.zmq_serializer.loads(contents)
         else:
             raise ValueError("invalid client type for event")
@@ -2501,11 +5124,20 @@ from .events import EventDispatcher
 __all__ = [
     AsyncZMQServer.__name__, 
     AsyncPollingZMQServer.__name__, 
+    ThreadsafeQueueServer.__name__,
     ZMQServerPool.__name__, 
     RPCServer.__name__, 
+    LoadBalancingBroker.__name__,
+    ThingReplica.__name__,
+    BrokerWorker.__name__,
     SyncZMQClient.__name__, 
     AsyncZMQClient.__name__, 
+    SharedZMQClients.__name__,
     MessageMappedZMQClientPool.__name__, 
+    SocketReceiver.__name__,
+    MessageIDGenerator.__name__,
+    UUIDMessageIDGenerator.__name__,
+    ExpiringCache.__name__,
     AsyncEventConsumer.__name__, 
     EventConsumer.__name__
 ]
\ No newline at end of file
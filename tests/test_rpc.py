@@ -1,6 +1,16 @@
-import threading, random, asyncio, requests
+import threading, random, asyncio, requests, time, typing
 import logging, multiprocessing, unittest
+import numpy, zmq, zmq.asyncio
 from hololinked.client import ObjectProxy
+from hololinked.server.constants import Priority
+from hololinked.server.exceptions import OpcodeMismatchError
+from hololinked.server.config import global_config
+from hololinked.server.serializers import JSONSerializer, MsgpackSerializer, PickleSerializer
+from hololinked.server.shared_memory import SharedMemoryRing
+from hololinked.server.zmq_message_brokers import (UUIDMessageIDGenerator, PriorityInstructionQueue, copy_frames, 
+                                                EventPublisher, EventConsumer, SocketReceiver, AsyncPollingZMQServer,
+                                                AsyncZMQClient, MessageMappedZMQClientPool, CM_INDEX_INSTRUCTION, 
+                                                CM_INDEX_ARGUMENTS, ExpiringCache, shared_zmq_clients)
 
 try:
     from .utils import TestCase, TestRunner
@@ -107,6 +117,507 @@ class TestRPC(TestCase):
         self.assertEqual(done_queue_7.get(), True)
         self.assertEqual(done_queue_8.get(), True)
 
+    def test_8_invokation_timeout(self):
+        # an instruction that could not start executing within its invokation timeout is not executed 
+        # and the client receives a timeout
+        client = ObjectProxy('test-rpc', invokation_timeout=0.5, log_level=logging.WARN) # type: TestThing
+        client.invoke_action('sleep', noblock=True, duration=2)
+        with self.assertRaises(TimeoutError):
+            client.test_echo('timed out')
+        self.assertEqual(client.test_echo('in time'), 'in time')
+
+    def test_9_message_format_negotiation(self):
+        # compact header is used when advertised by the server, clients sending the original messages still work
+        client = ObjectProxy('test-rpc', log_level=logging.WARN) # type: TestThing
+        self.assertTrue(client.zmq_client._use_compact_header)
+        legacy_client = ObjectProxy('test-rpc', compact_header=False, log_level=logging.WARN) # type: TestThing
+        self.assertFalse(legacy_client.zmq_client._use_compact_header)
+        for value in [1, 'string', [1, 2, 3], {'key': 'value'}, None]:
+            self.assertEqual(client.test_echo(value), value)
+            self.assertEqual(legacy_client.test_echo(value), value)
+
+    def test_10_opcodes(self):
+        # clients send opcodes instead of instruction strings when fetched from the server
+        client = ObjectProxy('test-rpc', log_level=logging.WARN) # type: TestThing
+        self.assertEqual(client.zmq_client.opcodes, client.opcodes)
+        self.assertIn('/test-rpc/test-echo/invoke-on-POST', client.zmq_client.opcodes)
+        self.assertEqual(client.test_echo('opcode'), 'opcode')
+        # unknown opcodes are not executed
+        client.zmq_client.opcodes['/test-rpc/test-echo/invoke-on-POST'] = len(client.opcodes)
+        with self.assertRaises(AttributeError):
+            client.test_echo('unknown opcode')
+        # opcodes of another opcode table, like of a Thing restarted with other resources, are rejected & fetched again
+        opcodes = dict(client.opcodes)
+        echo, other = '/test-rpc/test-echo/invoke-on-POST', '/test-rpc/get-pid/invoke-on-POST'
+        opcodes[echo], opcodes[other] = opcodes[other], opcodes[echo]
+        client.zmq_client.opcodes = opcodes
+        with self.assertRaises(OpcodeMismatchError):
+            client.test_echo('other opcode table')
+        self.assertEqual(client.test_echo('fetched again'), 'fetched again')
+        self.assertEqual(client.zmq_client.opcodes, client.opcodes)
+        # also when the next instruction after the rejection is a batch
+        client.zmq_client.opcodes = opcodes
+        with self.assertRaises(OpcodeMismatchError):
+            client.test_echo('other opcode table')
+        self.assertEqual(client.batch().invoke_action('test_echo', 'fetched again').execute(), ['fetched again'])
+        self.assertEqual(client.zmq_client.opcodes, client.opcodes)
+
+    def test_11_message_ids(self):
+        # message ids are a client prefix and a counter by default, other formats can be plugged in
+        client = ObjectProxy('test-rpc', log_level=logging.WARN) # type: TestThing
+        first, second = client.zmq_client.message_id_generator(), client.zmq_client.message_id_generator()
+        self.assertEqual(len(first), 16)
+        self.assertEqual(first[:8], second[:8])
+        self.assertLess(first, second)
+        uuid_client = ObjectProxy('test-rpc', message_id_generator=UUIDMessageIDGenerator(), 
+                                log_level=logging.WARN) # type: TestThing
+        self.assertEqual(len(uuid_client.zmq_client.message_id_generator()), 36)
+        self.assertEqual(uuid_client.test_echo('uuid'), 'uuid')
+
+    def test_12_batch(self):
+        # actions, property reads & writes executed in order with a single reply, exceptions are per item
+        for client in [ObjectProxy('test-rpc', log_level=logging.WARN), 
+                    ObjectProxy('test-rpc', compact_header=False, log_level=logging.WARN)]: # type: TestThing
+            batch = client.batch().write_property('number_prop', 3).read_property('number_prop')
+            batch.invoke_action('test_echo', 'batch').invoke_action('test_echo', value=[1, 2])
+            batch.write_property('number_prop', 'not a number').read_property('number_prop')
+            results = batch.execute(raise_client_side_exception=False)
+            self.assertEqual(len(results), 6)
+            self.assertEqual(results[:4], [None, 3, 'batch', [1, 2]])
+            self.assertIsInstance(results[4], TypeError)
+            self.assertEqual(results[5], 3)
+            with self.assertRaises(TypeError):
+                batch.execute()
+        # instructions can also be given as such, like for sub-things
+        results = client.batch().add('/test-rpc/number-prop/read').add('/test-rpc/unknown/read').execute(
+                                                                            raise_client_side_exception=False)
+        self.assertEqual(results[0], 3)
+        self.assertIsInstance(results[1], AttributeError)
+        # unknown names are reported by name before anything is sent
+        with self.assertRaisesRegex(AttributeError, 'No remote method named unknown_method'):
+            client.batch().invoke_action('unknown_method')
+        with self.assertRaisesRegex(AttributeError, 'No remote method named unknown_method'):
+            client.invoke_action('unknown_method')
+        with self.assertRaisesRegex(AttributeError, 'No property named unknown_prop'):
+            client.batch().read_property('unknown_prop')
+
+    def test_13_async_actions_as_tasks(self):
+        # async actions with create_task=True do not block other instructions
+        client = ObjectProxy('test-rpc', log_level=logging.WARN) # type: TestThing
+        start = time.time()
+        long_running = client.invoke_action('async_sleep', noblock=True, duration=1)
+        self.assertEqual(client.test_echo('meanwhile'), 'meanwhile')
+        self.assertEqual(client.number_prop, client.read_property('number_prop'))
+        self.assertLess(time.time() - start, 0.5)
+        concurrent = [client.invoke_action('async_sleep', noblock=True, duration=0.5) for _ in range(3)]
+        self.assertEqual([client.read_reply(msg_id) for msg_id in concurrent], [0.5]*3)
+        self.assertEqual(client.read_reply(long_running), 1)
+        self.assertLess(time.time() - start, 1.5)
+        # limited concurrency, executed one after the other
+        start = time.time()
+        limited = [client.invoke_action('async_sleep_one_at_a_time', noblock=True, duration=0.3) for _ in range(3)]
+        self.assertEqual(client.test_echo('meanwhile'), 'meanwhile')
+        self.assertLess(time.time() - start, 0.3)
+        self.assertEqual([client.read_reply(msg_id) for msg_id in limited], [0.3]*3)
+        self.assertGreaterEqual(time.time() - start, 0.9)
+
+    def test_14_threaded_actions_and_properties(self):
+        # sync actions & properties marked threaded are executed in the thread pool, a lock serializes them
+        client = ObjectProxy('test-rpc', log_level=logging.WARN) # type: TestThing
+        start = time.time()
+        blocking = client.invoke_action('threaded_sleep', noblock=True, duration=1)
+        self.assertEqual(client.test_echo('meanwhile'), 'meanwhile')
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(client.read_reply(blocking), 1)
+        start = time.time()
+        locked = [client.invoke_action('locked_sleep', noblock=True, duration=0.3) for _ in range(2)]
+        write = client.write_property('threaded_number_prop', 5, noblock=True)
+        self.assertEqual(client.test_echo('meanwhile'), 'meanwhile')
+        self.assertLess(time.time() - start, 0.3)
+        self.assertEqual([client.read_reply(msg_id) for msg_id in locked], [0.3]*2)
+        self.assertGreaterEqual(time.time() - start, 0.6)
+        client.read_reply(write)
+        self.assertEqual(client.threaded_number_prop, 5)
+        stats = client.thread_pool_stats
+        self.assertEqual(stats['active'], 0)
+        self.assertGreaterEqual(stats['completed'], 5)
+        self.assertEqual(stats['max_workers'], 4)
+
+    def test_15_large_payloads(self):
+        # payloads above the zero copy threshold are sent without copying and must arrive intact
+        for size in [global_config.ZMQ_ZERO_COPY_THRESHOLD - 1, 4 * global_config.ZMQ_ZERO_COPY_THRESHOLD]:
+            value = 'x' * size
+            self.assertEqual(self.thing_client.test_echo(value), value)
+
+    def test_16_array_frames(self):
+        # numpy arrays in replies arrive as out-of-band frames & are reconstructed as read-only arrays
+        reply = self.thing_client.get_arrays(size=100000)
+        self.assertIsInstance(reply['array'], numpy.ndarray)
+        self.assertTrue(numpy.array_equal(reply['array'], numpy.arange(100000, dtype=numpy.float64)))
+        self.assertFalse(reply['array'].flags.writeable)
+        self.assertEqual([image.shape for image in reply['images']], [(4, 3), (3, 4)])
+        self.assertEqual(reply['images'][1].dtype, numpy.uint16)
+        # clients not requesting them receive lists
+        client = ObjectProxy('test-rpc', log_level=logging.WARN, array_frames=False) # type: TestThing
+        self.assertEqual(client.get_arrays(size=3)['array'], [0, 1, 2])
+
+    def test_17_threads_sharing_a_client(self):
+        # threads sharing a proxy have their requests in flight at the same time, each receiving its own replies
+        client = ObjectProxy('test-rpc', log_level=logging.WARN) # type: TestThing
+        errors = []
+        def echo(thread_number : int):
+            try:
+                for i in range(50):
+                    value = f'{thread_number}-{i}'
+                    self.assertEqual(client.test_echo(value), value)
+            except Exception as ex:
+                errors.append(ex)
+        threads = [threading.Thread(target=echo, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        start = time.time()
+        threads = [threading.Thread(target=client.threaded_sleep, kwargs=dict(duration=0.5)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(time.time() - start, 1) # not one after another
+        self.assertEqual(client.test_echo('owner thread'), 'owner thread')
+        client.zmq_client.exit()
+
+    def test_18_concurrent_async_calls(self):
+        # coroutines sharing the async client have their requests in flight at the same time
+        client = ObjectProxy('test-rpc', async_mixin=True, log_level=logging.WARN) # type: TestThing
+
+        async def run():
+            values = await asyncio.gather(*[client.async_invoke_action('test_echo', i) for i in range(100)])
+            self.assertEqual(values, list(range(100)))
+            start = time.time()
+            await asyncio.gather(*[client.async_invoke_action('threaded_sleep', duration=0.5) for _ in range(4)],
+                                client.async_read_property('number_prop'))
+            self.assertLess(time.time() - start, 1) # not one after another
+            # a reply awaited with a timeout can be awaited again
+            msg_id = await client.async_zmq_client.async_send_instruction('/test-rpc/threaded-sleep/invoke-on-POST', 
+                                                                        dict(duration=0.3))
+            self.assertIsNone(await client.async_zmq_client.async_recv_reply(msg_id, timeout=50))
+            self.assertIsNotNone(await client.async_zmq_client.async_recv_reply(msg_id))
+            self.assertEqual(client.async_zmq_client.reply_cache_stats['size'], 0)
+
+        asyncio.run(run())
+        client.async_zmq_client.exit()
+        client.zmq_client.exit()
+
+    def test_19_shared_clients(self):
+        # proxies with shared_client=True use the clients of the process wide pool round robin
+        global_config.ZMQ_CLIENT_POOL_WIDTH = 2
+        try:
+            proxies = [ObjectProxy('test-rpc', shared_client=True, log_level=logging.WARN) for _ in range(4)] # type: typing.List[TestThing]
+            tcp_proxy = ObjectProxy('test-rpc', protocol='TCP', socket_address='tcp://localhost:58000', 
+                                    shared_client=True, log_level=logging.WARN) # type: TestThing
+            self.assertEqual(len({id(proxy.zmq_client) for proxy in proxies}), 2)
+            self.assertIs(proxies[0].zmq_client, proxies[2].zmq_client)
+            self.assertIsNot(tcp_proxy.zmq_client, proxies[0].zmq_client)
+            self.assertEqual(shared_zmq_clients.stats, {'test-rpc|IPC': 2, 'test-rpc|TCP': 1})
+            for index, proxy in enumerate(proxies + [tcp_proxy]):
+                self.assertEqual(proxy.test_echo(index), index)
+            self.assertIsNot(ObjectProxy('test-rpc', log_level=logging.WARN).zmq_client, proxies[0].zmq_client)
+            # a client handshaking with a server which does not answer does not hold up clients of other servers
+            errors = []
+            def get_absent():
+                try:
+                    shared_zmq_clients.get('test-rpc-absent', 'IPC', handshake_timeout=1500, log_level=logging.CRITICAL)
+                except Exception as ex:
+                    errors.append(ex)
+            absent = threading.Thread(target=get_absent)
+            absent.start()
+            time.sleep(0.1)
+            start = time.time()
+            proxy = ObjectProxy('test-rpc', shared_client=True, log_level=logging.WARN) # type: TestThing
+            self.assertEqual(proxy.test_echo('not blocked'), 'not blocked')
+            self.assertLess(time.time() - start, 1)
+            absent.join()
+            self.assertIsInstance(errors[0], ConnectionError)
+            self.assertNotIn('test-rpc-absent|IPC', shared_zmq_clients.stats)
+        finally:
+            global_config.ZMQ_CLIENT_POOL_WIDTH = 1
+            shared_zmq_clients.clear()
+        self.assertEqual(shared_zmq_clients.stats, {})
+
+
+
+class TestZeroCopy(TestCase):
+
+    def test_1_copy_frames(self):
+        # frames are copied only when all of them are smaller than the threshold
+        threshold = global_config.ZMQ_ZERO_COPY_THRESHOLD
+        self.assertTrue(copy_frames([b'', b'a' * (threshold - 1)]))
+        self.assertFalse(copy_frames([b'', b'a' * threshold]))
+        self.assertFalse(copy_frames([b'', memoryview(bytearray(threshold))]))
+        global_config.ZMQ_ZERO_COPY_THRESHOLD = None
+        try:
+            self.assertTrue(copy_frames([b'', b'a' * threshold]))
+        finally:
+            global_config.ZMQ_ZERO_COPY_THRESHOLD = threshold
+
+    def test_2_deserialize_buffers(self):
+        # received frames need not be bytes
+        for serializer in [MsgpackSerializer(), PickleSerializer()]:
+            data = serializer.dumps({'key' : [1, 2, 3]})
+            for buffer in [data, bytearray(data), memoryview(data)]:
+                self.assertEqual(serializer.loads(buffer), {'key' : [1, 2, 3]})
+
+    def test_3_out_of_band_arrays(self):
+        # numpy arrays are taken out of the payload by the serializers supporting it, also non contiguous ones
+        data = dict(c=numpy.arange(12000.0).reshape(30, 400), f=numpy.asfortranarray(numpy.ones((3, 4))), 
+                    strided=numpy.arange(12).reshape(3, 4)[:, ::2], value=1)
+        for serializer in [JSONSerializer(), MsgpackSerializer(), PickleSerializer()]:
+            payload, frames = serializer.dumps_out_of_band(data)
+            self.assertGreater(len(frames), 0)
+            self.assertLess(len(payload), 1000) # arrays are not in the payload
+            received = serializer.loads_out_of_band(payload, [bytes(memoryview(frame)) for frame in frames])
+            for key in ['c', 'f', 'strided']:
+                self.assertTrue(numpy.array_equal(received[key], data[key]))
+            self.assertEqual(received['value'], 1)
+        self.assertEqual(MsgpackSerializer().dumps_out_of_band(dict(value=1))[1], [])
+        # arrays of python objects remain in the payload
+        self.assertEqual(JSONSerializer().dumps_out_of_band(numpy.array([None, 1])), (b'[null,1]', []))
+
+    def test_4_event_array_frames(self):
+        # events published with a RPC specific serializer carry numpy arrays as out-of-band frames
+        context = zmq.Context()
+        publisher = EventPublisher('test-array-frames', 'INPROC', context=context, 
+                                zmq_serializer=MsgpackSerializer(), logger=logging.getLogger('test-array-frames'))
+        publisher.event_ids.add(b'test-array-frames/event')
+        consumer = EventConsumer('zmq-test-array-frames/event', publisher.socket_address, 'test-array-frames-consumer',
+                                b'PROXY', context=context, zmq_serializer=MsgpackSerializer(), 
+                                logger=logging.getLogger('test-array-frames'))
+        try:
+            image = numpy.arange(1000000, dtype=numpy.uint16).reshape(1000, 1000)
+            received = None
+            for _ in range(50): # no handshake for events, publish until subscribed 
+                publisher.publish(b'test-array-frames/event', dict(image=image), http_clients=False)
+                received = consumer.receive(timeout=100)
+                if received is not None:
+                    break
+            self.assertTrue(numpy.array_equal(received['image'], image))
+        finally:
+            consumer.exit()
+            publisher.socket.close(0)
+            context.term()
+
+    def test_5_shared_memory_ring(self):
+        # frames are passed through free slots, which are held until the client dropped the frame
+        ring = SharedMemoryRing.create(slots=2, slot_size=1024, threshold=16)
+        client_ring = SharedMemoryRing.attach(**ring.capabilities)
+        try:
+            self.assertIsNone(ring.write(b'small'))
+            self.assertIsNone(ring.write(bytes(2048)))
+            array = numpy.arange(64, dtype=numpy.float64).reshape(8, 8).T # fortran order
+            handles = [ring.write(array), ring.write(b'x' * 32)]
+            self.assertIsNone(ring.write(b'y' * 32)) # all slots held
+            frames = [client_ring.read(handle) for handle in handles]
+            self.assertTrue(numpy.array_equal(numpy.ndarray((8, 8), dtype=numpy.float64, buffer=frames[0], 
+                                                            strides=array.strides), array))
+            self.assertEqual(frames[1].tobytes(), b'x' * 32)
+            self.assertEqual(ring.stats['held'], 2)
+            self.assertEqual(ring.stats['fallbacks'], 1)
+            del frames
+            self.assertEqual(ring.stats['held'], 0)
+            self.assertIsNotNone(ring.write(b'y' * 32))
+        finally:
+            client_ring.close()
+            ring.close()
+
+
+
+class TestSocketReceiver(TestCase):
+
+    def test_1_receive_and_stop(self):
+        # sockets registered before and while running are received, stopping does not wait for a poll timeout
+        context = zmq.asyncio.Context()
+        sockets = []
+        for i in range(2):
+            receiver_socket, sender_socket = context.socket(zmq.PAIR), context.socket(zmq.PAIR)
+            receiver_socket.bind(f'inproc://test-socket-receiver-{i}')
+            sender_socket.connect(f'inproc://test-socket-receiver-{i}')
+            sockets.append((receiver_socket, sender_socket))
+        received = []
+        receiver = SocketReceiver(lambda socket, message : received.append(message[0]), 
+                                logging.getLogger('test-socket-receiver'))
+        receiver.register(sockets[0][0])
+
+        async def run():
+            task = asyncio.create_task(receiver.run())
+            await asyncio.sleep(0.05)
+            self.assertTrue(receiver.running)
+            receiver.register(sockets[1][0])
+            await sockets[0][1].send_multipart([b'first'])
+            await sockets[1][1].send_multipart([b'second'])
+            await asyncio.sleep(0.05)
+            receiver.unregister(sockets[1][0])
+            await sockets[1][1].send_multipart([b'unregistered'])
+            await asyncio.sleep(0.05)
+            threading.Thread(target=receiver.stop).start()
+            start = time.perf_counter()
+            await asyncio.wait_for(task, timeout=1)
+            return time.perf_counter() - start
+        
+        try:
+            self.assertLess(asyncio.run(run()), 0.1)
+            self.assertEqual(sorted(received), [b'first', b'second'])
+            self.assertFalse(receiver.running)
+            self.assertNotIn(sockets[1][0], receiver)
+        finally:
+            for pair in sockets:
+                for socket in pair:
+                    socket.close(0)
+            context.term()
+
+    def test_2_polling_server(self):
+        # instructions are returned as soon as they arrive, stop_polling() unblocks immediately 
+        # irrespective of the poll timeout
+        async def run():
+            context = zmq.asyncio.Context()
+            server = AsyncPollingZMQServer(instance_name='test-polling-server', server_type='THING', 
+                                        context=context, protocol='INPROC', poll_timeout=10000, 
+                                        logger=logging.getLogger('test-polling-server'))
+            client = AsyncZMQClient(server_instance_name='test-polling-server', identity='test-polling-client', 
+                                    client_type=b'PROXY', context=context, protocol='INPROC', handshake=False, 
+                                    logger=logging.getLogger('test-polling-server'))
+            try:
+                polling = asyncio.create_task(server.poll_instructions())
+                client.handshake()
+                await client.handshake_complete() # handshakes are answered by the polling server
+                await client.async_send_instruction('test-instruction')
+                instructions = await asyncio.wait_for(polling, timeout=1)
+                self.assertEqual(len(instructions), 1)
+                polling = asyncio.create_task(server.poll_instructions())
+                await asyncio.sleep(0.05)
+                start = time.perf_counter()
+                server.stop_polling()
+                self.assertEqual(await asyncio.wait_for(polling, timeout=1), [])
+                self.assertLess(time.perf_counter() - start, 0.1)
+                # the client pool stops the same way
+                pool = MessageMappedZMQClientPool([], identity='test-polling-pool', 
+                                                logger=logging.getLogger('test-polling-server'))
+                polling = asyncio.create_task(pool.poll())
+                await asyncio.sleep(0.05)
+                start = time.perf_counter()
+                pool.stop_polling()
+                await asyncio.wait_for(polling, timeout=1)
+                self.assertLess(time.perf_counter() - start, 0.1)
+                pool.exit()
+            finally:
+                client.exit()
+                server.exit()
+                context.term()
+
+        asyncio.run(run())
+
+    def test_3_client_pool_replies(self):
+        # replies arriving immediately resolve the future registered before sending, late replies are dropped
+        async def run():
+            context = zmq.asyncio.Context()
+            server = AsyncPollingZMQServer(instance_name='test-pool-replies', server_type='THING', 
+                                        context=context, protocol='INPROC', 
+                                        logger=logging.getLogger('test-pool-replies'))
+            pool = MessageMappedZMQClientPool(['test-pool-replies'], identity='test-pool', handshake=False, 
+                                            protocol='INPROC', context=context, 
+                                            logger=logging.getLogger('test-pool-replies'))
+
+            async def reply():
+                while True:
+                    for instruction in await server.poll_instructions():
+                        if instruction[CM_INDEX_INSTRUCTION] == 'late':
+                            await asyncio.sleep(0.2)
+                        await server.async_send_reply(instruction, instruction[CM_INDEX_ARGUMENTS])
+
+            replier = asyncio.create_task(reply())
+            polling = asyncio.create_task(pool.poll())
+            try:
+                client = pool['test-pool-replies']
+                client.handshake()
+                await client.handshake_complete()
+                pool.register_client(client)
+                replies = await asyncio.wait_for(asyncio.gather(*[pool.async_execute('test-pool-replies', 'echo', 
+                                                    dict(value=i)) for i in range(100)]), timeout=2)
+                self.assertEqual([reply['value'] for reply in replies], list(range(100)))
+                with self.assertRaises(TimeoutError):
+                    await pool.async_recv_reply('test-pool-replies', 
+                                        await pool.async_send_instruction('test-pool-replies', 'late'), timeout=0.05)
+                await asyncio.sleep(0.3) # late reply is dropped
+                self.assertEqual(pool.stats['awaited_replies'], 0)
+                self.assertEqual(pool.stats['reply_cache']['size'], 0)
+                self.assertEqual(pool.stats['dropped_replies'], 1)
+                await pool.async_send_instruction('test-pool-replies', 'echo', dict(value=2)) # never awaited
+                self.assertEqual(pool.stats['reply_cache']['size'], 1)
+                self.assertEqual((await pool.async_execute('test-pool-replies', 'echo', dict(value=1)))['value'], 1)
+            finally:
+                replier.cancel()
+                pool.stop_polling()
+                await asyncio.gather(replier, polling, return_exceptions=True)
+                server.exit()
+                pool.exit() # terminates the context
+
+        asyncio.run(run())
+
+
+
+class TestExpiringCache(TestCase):
+
+    def test_1_ttl_and_size(self):
+        cache = ExpiringCache(ttl=0.1, max_size=3)
+        for i in range(5):
+            cache[i] = str(i)
+        self.assertEqual(len(cache), 3) # oldest evicted
+        self.assertNotIn(0, cache)
+        self.assertEqual(cache.get(4), '4')
+        self.assertEqual(cache.pop(3), '3')
+        self.assertIsNone(cache.pop(3))
+        time.sleep(0.15)
+        self.assertIsNone(cache.get(2)) # expired on access
+        cache['new'] = 'value' # expired entries swept from the front
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats, dict(size=1, max_size=3, ttl=0.1, expired=2, evicted=2))
+        cache = ExpiringCache(ttl=None, max_size=1)
+        cache[1], cache[2] = 1, 2
+        self.assertEqual(cache.get(2), 2)
+        with self.assertRaises(ValueError):
+            ExpiringCache(ttl=0)
+        with self.assertRaises(ValueError):
+            ExpiringCache(max_size=0)
+
+
+
+class TestPriorityInstructionQueue(TestCase):
+
+    def test_1_lanes(self):
+        # highest priority first, FIFO within a priority
+        queue = PriorityInstructionQueue()
+        for item, priority in [('n1', Priority.NORMAL), ('l1', Priority.LOW), ('h1', Priority.HIGH),
+                            ('n2', Priority.NORMAL), ('c1', Priority.CRITICAL), ('h2', Priority.HIGH)]:
+            queue.append(item, priority)
+        self.assertEqual(len(queue), 6)
+        self.assertEqual(queue.peek(), 'c1')
+        self.assertEqual([queue.popleft() for _ in range(6)], ['c1', 'h1', 'h2', 'n1', 'n2', 'l1'])
+        self.assertEqual(len(queue), 0)
+        with self.assertRaises(IndexError):
+            queue.popleft()
+        with self.assertRaises(ValueError):
+            PriorityInstructionQueue(starvation_limit=0)
+
+    def test_2_starvation(self):
+        # the longest waiting instruction is served after starvation_limit higher priority instructions
+        queue = PriorityInstructionQueue(starvation_limit=2)
+        queue.append('l1', Priority.LOW)
+        queue.append('n1', Priority.NORMAL)
+        for i in range(6):
+            queue.append(f'h{i}', Priority.HIGH)
+        self.assertEqual([queue.popleft() for _ in range(8)], ['h0', 'h1', 'l1', 'h2', 'h3', 'n1', 'h4', 'h5'])
+
 
 
 def start_client(done_queue : multiprocessing.Queue, typ : str = 'normal', tcp_socket_address : str = None):
@@ -1,13 +1,27 @@
+import asyncio
+import os
+import signal
+import tempfile
 import threading
+import time
+import types
 import typing
 import unittest
+import unittest.mock
 import multiprocessing 
 import logging
+import numpy
 import zmq.asyncio
 
 from hololinked.server import Thing
+from hololinked.server.exceptions import ServerBusyError
 from hololinked.client import ObjectProxy
 from hololinked.server.eventloop import EventLoop
+from hololinked.server.executors import ResourceThreadPool, ResourceProcessPool, _share_arrays
+from hololinked.server.shared_memory import SharedMemoryRing
+from hololinked.server.zmq_message_brokers import (LoadBalancingBroker, ThingReplica, MessageMappedZMQClientPool, 
+                                                AsyncZMQClient, PROXY, SM_INDEX_DATA)
+from hololinked.server.registry import ThingRegistry, thing_registry
 try:
     from .things import TestThing, OceanOpticsSpectrometer
     from .utils import TestCase
@@ -54,7 +68,544 @@ class TestThingRun(TestCase):
         thing_client.exit()
         self.assertEqual(done_queue.get(), 'test-run-3')
 
+
+    def test_thing_run_with_direct_dispatch(self):
+        # instructions passed to the Thing through a thread-safe queue instead of inproc sockets
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-direct-dispatch', ['IPC', 'TCP'], 'tcp://*:59001'), 
+                                kwargs=dict(done_queue=done_queue, direct_dispatch=True), daemon=True).start()
+        thing_client = ObjectProxy('test-run-direct-dispatch', log_level=logging.WARN) # type: Thing
+        self.assertEqual(thing_client.get_protocols(), ['IPC', 'TCP'])
+        for value in [1, 'string', [1, 2, 3], {'key': 'value'}]:
+            self.assertEqual(thing_client.test_echo(value), value)
+        thing_client.invoke_action('test_echo', oneway=True, value='oneway') # no reply is sent
+        self.assertEqual(thing_client.test_echo('after oneway'), 'after oneway')
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-direct-dispatch')
+
+
+    def test_thing_run_with_queue_high_water_mark(self):
+        # instructions beyond the high water mark are rejected immediately with a BUSY reply
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-high-water-mark',),
+                                kwargs=dict(done_queue=done_queue, max_in_flight=1, queue_high_water_mark=2),
+                                daemon=True).start()
+        thing_client = ObjectProxy('test-run-high-water-mark', log_level=logging.WARN) # type: Thing
+        thing_client.invoke_action('sleep', noblock=True, duration=1)
+        time.sleep(0.2) # executing, not in queue anymore
+        queued = [thing_client.invoke_action('test_echo', noblock=True, value=i) for i in range(2)]
+        with self.assertRaises(ServerBusyError):
+            thing_client.test_echo('rejected')
+        self.assertEqual([thing_client.read_reply(msg_id) for msg_id in queued], [0, 1])
+        queue_stats = thing_client.queue_stats
+        self.assertEqual(queue_stats['depth'], 0)
+        self.assertEqual(queue_stats['peak_depth'], 2)
+        self.assertEqual(queue_stats['rejected'], 1)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-high-water-mark')
+
+
+    def test_thing_run_with_priorities(self):
+        # high priority instructions overtake queued ones & are subject only to twice the high water mark
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-priorities',),
+                                kwargs=dict(done_queue=done_queue, max_in_flight=1, queue_high_water_mark=3),
+                                daemon=True).start()
+        thing_client = ObjectProxy('test-run-priorities', log_level=logging.WARN) # type: Thing
+        start = time.time()
+        thing_client.invoke_action('sleep', noblock=True, duration=1)
+        time.sleep(0.2) # executing, not in queue anymore
+        queued = [thing_client.invoke_action('sleep', noblock=True, duration=0.5) for i in range(3)]
+        urgent = [thing_client.invoke_action('urgent_echo', noblock=True, value=i) for i in range(3)]
+        with self.assertRaises(ServerBusyError):
+            thing_client.urgent_echo('beyond twice the high water mark')
+        self.assertEqual([thing_client.read_reply(msg_id) for msg_id in urgent], [0, 1, 2])
+        self.assertLess(time.time() - start, 1.4) # not executed after the queued sleeps
+        for msg_id in queued:
+            thing_client.read_reply(msg_id)
+        self.assertEqual(thing_client.queue_stats['rejected'], 1)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-priorities')
+
+    def test_thing_run_with_tasks_beyond_max_in_flight(self):
+        # instructions executed in a task do not hold a slot of max_in_flight, other instructions are not stalled
+        for direct_dispatch in [False, True]:
+            instance_name = f'test-run-tasks-beyond-max-in-flight-{direct_dispatch}'
+            done_queue = multiprocessing.Queue()
+            multiprocessing.Process(target=start_thing, args=(instance_name,),
+                                    kwargs=dict(done_queue=done_queue, max_in_flight=2, 
+                                                direct_dispatch=direct_dispatch), daemon=True).start()
+            thing_client = ObjectProxy(instance_name, log_level=logging.WARN) # type: TestThing
+            queued = [thing_client.invoke_action('async_sleep_one_at_a_time', noblock=True, duration=0.3) 
+                                                                                            for _ in range(5)]
+            time.sleep(0.1)
+            start = time.time()
+            self.assertEqual(thing_client.test_echo('not stalled'), 'not stalled')
+            self.assertLess(time.time() - start, 0.25) 
+            self.assertEqual(thing_client.queue_stats['accepted'], 5)
+            self.assertEqual([thing_client.read_reply(msg_id) for msg_id in queued], [0.3] * 5)
+            queue_stats = thing_client.queue_stats
+            self.assertEqual(queue_stats['accepted'], 0)
+            self.assertEqual(queue_stats['in_flight'], 1) # queue_stats itself
+            thing_client.exit()
+            self.assertEqual(done_queue.get(), instance_name)
+
+    def test_thing_run_with_threaded_actions_beyond_max_in_flight(self):
+        # threaded calls beyond the free threads wait in the thread pool, not in the slots of max_in_flight
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-threads-beyond-max-in-flight',),
+                                kwargs=dict(done_queue=done_queue, max_in_flight=2, thread_pool_size=2), 
+                                daemon=True).start()
+        thing_client = ObjectProxy('test-run-threads-beyond-max-in-flight', log_level=logging.WARN) # type: TestThing
+        queued = [thing_client.invoke_action('threaded_sleep', noblock=True, duration=0.5) for _ in range(6)]
+        time.sleep(0.1)
+        start = time.time()
+        self.assertEqual(thing_client.test_echo('not stalled'), 'not stalled')
+        thread_pool_stats = thing_client.thread_pool_stats
+        self.assertLess(time.time() - start, 0.25) 
+        self.assertEqual(thread_pool_stats['active'], 2)
+        self.assertEqual(thread_pool_stats['queued'], 4)
+        self.assertEqual([thing_client.read_reply(msg_id) for msg_id in queued], [0.5] * 6)
+        self.assertEqual(thing_client.queue_stats['accepted'], 0)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-threads-beyond-max-in-flight')
+
+    @unittest.skipIf(os.name == 'nt', "SIGKILL is not available on windows")
+    def test_client_pool_when_thing_is_killed(self):
+        # replies awaited without an execution timeout fail once the Thing disconnects instead of hanging
+        process = multiprocessing.Process(target=start_thing, args=('test-run-pool-killed',), daemon=True)
+        process.start()
+
+        async def run():
+            pool = MessageMappedZMQClientPool(['test-run-pool-killed'], identity='test-run-pool-killed-client', 
+                                            logger=logging.getLogger('test-run-pool-killed'))
+            polling = asyncio.create_task(pool.poll())
+            try:
+                client = pool['test-run-pool-killed']
+                await client.handshake_complete()
+                pool.register_client(client)
+                instruction = '/test-run-pool-killed/sleep/invoke-on-POST'
+                awaited = asyncio.create_task(pool.async_execute('test-run-pool-killed', instruction, 
+                                                                dict(duration=30), execution_timeout=None))
+                unawaited = await pool.async_send_instruction('test-run-pool-killed', instruction, dict(duration=30))
+                await asyncio.sleep(0.5)
+                os.kill(process.pid, signal.SIGKILL)
+                with self.assertRaises(ConnectionAbortedError):
+                    await asyncio.wait_for(awaited, timeout=5)
+                with self.assertRaises(ConnectionAbortedError):
+                    await pool.async_recv_reply('test-run-pool-killed', unawaited)
+            finally:
+                pool.stop_polling()
+                await asyncio.gather(polling, return_exceptions=True)
+                pool.exit()
+
+        asyncio.run(run())
+        process.join()
+
+    def test_async_client_when_thing_is_killed(self):
+        # replies awaited or yet to be awaited fail once the Thing disconnects instead of hanging
+        process = multiprocessing.Process(target=start_thing, args=('test-run-async-client-killed',), daemon=True)
+        process.start()
+
+        async def run():
+            client = AsyncZMQClient('test-run-async-client-killed', 'test-run-async-client-killed-client', 
+                                    client_type=PROXY, log_level=logging.CRITICAL)
+            try:
+                await client.handshake_complete()
+                instruction = '/test-run-async-client-killed/sleep/invoke-on-POST'
+                awaited = asyncio.create_task(client.async_execute(instruction, dict(duration=30)))
+                unawaited = await client.async_send_instruction(instruction, dict(duration=30))
+                await asyncio.sleep(0.5)
+                os.kill(process.pid, signal.SIGKILL)
+                with self.assertRaises(ConnectionAbortedError):
+                    await asyncio.wait_for(awaited, timeout=5)
+                with self.assertRaises(ConnectionAbortedError):
+                    await asyncio.wait_for(client.async_recv_reply(unawaited), timeout=5)
+            finally:
+                client.exit()
+
+        asyncio.run(run())
+        process.join()
+
+    def test_thing_run_with_idempotency_keys(self):
+        # retries with the same idempotency key are answered with the first reply without executing again
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-idempotency',),
+                                kwargs=dict(done_queue=done_queue, idempotency_cache_size=2), daemon=True).start()
+        thing_client = ObjectProxy('test-run-idempotency', log_level=logging.WARN) # type: TestThing
+        start = time.time()
+        first = thing_client.invoke_action('sleep', noblock=True, duration=0.5, idempotency_key='move-1')
+        retry = thing_client.invoke_action('sleep', noblock=True, duration=0.5, idempotency_key='move-1')
+        thing_client.read_reply(retry) # answered once the first is executed
+        thing_client.read_reply(first)
+        thing_client.invoke_action('sleep', duration=0.5, idempotency_key='move-1')
+        self.assertLess(time.time() - start, 0.9) # slept only once
+        self.assertEqual(thing_client.invoke_action('test_echo', value=1, idempotency_key='echo-1'), 1)
+        with self.assertRaises(ValueError): # same key, other arguments
+            thing_client.invoke_action('test_echo', value=2, idempotency_key='echo-1')
+        self.assertEqual(thing_client.invoke_action('test_echo', value=3, idempotency_key='echo-2'), 3)
+        self.assertEqual(thing_client.test_echo(4), 4) # no key, always executed
+        start = time.time()
+        thing_client.invoke_action('sleep', duration=0.2, idempotency_key='move-1') # least recently used, forgotten
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        queue_stats = thing_client.queue_stats
+        self.assertEqual(queue_stats['replayed'], 2)
+        self.assertEqual(queue_stats['idempotent_replies'], 2)
+        # keys are scoped by instruction and by client
+        self.assertEqual(thing_client.invoke_action('test_echo', value=5, idempotency_key='move-1'), 5)
+        other_client = ObjectProxy('test-run-idempotency', log_level=logging.WARN) # type: TestThing
+        self.assertEqual(other_client.invoke_action('test_echo', value=6, idempotency_key='move-1'), 6)
+        self.assertEqual(thing_client.queue_stats['replayed'], 2)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-idempotency')
+
+    def test_thing_run_with_process_pool(self):
+        # classmethods marked process_pool are executed in another process, large arrays return via shared memory
+        done_queue = multiprocessing.Queue()
+        # not daemonic, daemonic processes cannot start the processes of the pool
+        process = multiprocessing.Process(target=start_thing, args=('test-run-process-pool',),
+                                kwargs=dict(done_queue=done_queue, process_pool_size=1))
+        process.start()
+        thing_client = ObjectProxy('test-run-process-pool', log_level=logging.WARN) # type: TestThing
+        small, large = thing_client.process_pool_arange(size=10), thing_client.process_pool_arange(size=100000)
+        self.assertNotEqual(small['pid'], thing_client.get_pid())
+        self.assertEqual(small['pid'], large['pid'])
+        self.assertEqual(small['array'].tolist(), list(range(10))) # arrays are received as numpy arrays
+        self.assertEqual(len(large['array']), 100000)
+        self.assertEqual(large['array'][-1], 99999)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-process-pool')
+        process.join()
+
+    def test_thing_run_with_process_pool_calls_beyond_max_in_flight(self):
+        # calls waiting for a process of the pool (here, for the pool to start) do not hold a slot of max_in_flight
+        done_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=start_thing, args=('test-run-processes-beyond-max-in-flight',),
+                                kwargs=dict(done_queue=done_queue, process_pool_size=1, max_in_flight=2))
+        process.start()
+        thing_client = ObjectProxy('test-run-processes-beyond-max-in-flight', log_level=logging.WARN) # type: TestThing
+        queued = [thing_client.invoke_action('process_pool_arange', noblock=True, size=10) for _ in range(4)]
+        start = time.time()
+        self.assertEqual(thing_client.test_echo('not stalled'), 'not stalled')
+        self.assertLess(time.time() - start, 0.25) 
+        for msg_id in queued:
+            self.assertEqual(thing_client.read_reply(msg_id)['array'].tolist(), list(range(10)))
+        self.assertEqual(thing_client.queue_stats['accepted'], 0)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-processes-beyond-max-in-flight')
+        process.join()
+
+    def test_thing_run_with_execution_logs_of_concurrent_instructions(self):
+        # logs of instructions executed concurrently in tasks & threads are not mixed up in the execution logs
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-execution-logs',),
+                                kwargs=dict(done_queue=done_queue), daemon=True).start()
+        thing_client = ObjectProxy('test-run-execution-logs', log_level=logging.WARN) # type: TestThing
+        client = thing_client.zmq_client
+        message_ids = {}
+        for action_name in ['async_log', 'threaded_log']:
+            for message in ['first', 'second']:
+                message_ids[(action_name, message)] = client.send_instruction(
+                            f'/test-run-execution-logs/{action_name.replace("_", "-")}/invoke-on-POST', 
+                            dict(message=f'{action_name} {message}', duration=0.3), 
+                            context=dict(fetch_execution_logs=True))
+        for (action_name, message), message_id in message_ids.items():
+            logs = client.recv_reply(message_id, raise_client_side_exception=True)[SM_INDEX_DATA]['execution_logs']
+            self.assertEqual(sorted(log['message'] for log in logs if log['level'] == 'WARNING'),
+                            [f'{action_name} {message} completed', f'{action_name} {message} started'])
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-execution-logs')
+
+    def test_thread_pool_stats_of_cancelled_calls(self):
+        # calls cancelled while waiting for a thread are not counted as queued anymore
+        async def cancel_queued_call(pool : ResourceThreadPool) -> None:
+            resource = types.SimpleNamespace(threaded=True, lock=None, isaction=True, iscoroutine=False)
+            running = asyncio.create_task(pool.execute(resource, lambda: time.sleep(0.3)))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(pool.execute(resource, lambda: time.sleep(0.3)))
+            await asyncio.sleep(0.05)
+            self.assertEqual(pool.stats['queued'], 1)
+            queued.cancel()
+            await asyncio.gather(running, queued, return_exceptions=True)
+
+        pool = ResourceThreadPool(max_workers=1)
+        asyncio.run(cancel_queued_call(pool))
+        self.assertEqual(pool.stats['queued'], 0)
+        self.assertEqual(pool.stats['active'], 0)
+        self.assertEqual(pool.stats['completed'], 1)
+        pool.shutdown()
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), "shared memory is listed only on linux")
+    def test_process_pool_releases_shared_memory_of_cancelled_calls(self):
+        # arrays of calls cancelled while executing in a worker are never restored, their shared memory is released
+        async def cancel_calls(pool : ResourceProcessPool) -> None:
+            await pool.execute(TestThing.process_pool_arange, 10) # processes started
+            for delay in [0, 0.001, 0.005, 0.02, 0.05]:
+                call = asyncio.create_task(pool.execute(TestThing.process_pool_arange, 1000000))
+                await asyncio.sleep(delay)
+                call.cancel()
+                await asyncio.gather(call, return_exceptions=True)
+            await asyncio.sleep(0.5) # cancelled calls complete in the worker
+
+        list_shared_memory = lambda: set(name for name in os.listdir('/dev/shm') if name.startswith('psm_'))
+        shared_memory = list_shared_memory()
+        pool = ResourceProcessPool(max_workers=1)
+        asyncio.run(cancel_calls(pool))
+        self.assertEqual(list_shared_memory() - shared_memory, set())
+        self.assertEqual(len(pool._shared_memory) + len(pool._abandoned), 0)
+        pool.shutdown()
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), "shared memory is listed only on linux")
+    def test_process_pool_releases_shared_memory_of_arrays_not_shared(self):
+        # shared memory of the arrays of a return value is released when one of its arrays cannot be shared
+        from multiprocessing.shared_memory import SharedMemory
+        def undersized_second_segment(name=None, create=False, size=0):
+            if not create:
+                return SharedMemory(name) # opened to be released
+            # the copy into the second segment fails
+            shared_memory = SharedMemory(create=True, size=size if len(segments) == 0 else 1)
+            segments.append(shared_memory.name)
+            return shared_memory
+
+        list_shared_memory = lambda: set(name for name in os.listdir('/dev/shm') if name.startswith('psm_'))
+        shared_memory = list_shared_memory()
+        value = dict(first=numpy.arange(100000, dtype=numpy.float64), second=[numpy.ones(100000)])
+        segments = []
+        with unittest.mock.patch('hololinked.server.executors.SharedMemory', side_effect=undersized_second_segment):
+            with self.assertRaises(TypeError):
+                _share_arrays(value, 65536)
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(list_shared_memory() - shared_memory, set())
+
+    def test_thing_run_with_shared_memory_ring(self):
+        # large arrays of replies are passed through shared memory to IPC clients, not to TCP clients
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-shared-memory', ['IPC', 'TCP'], 'tcp://*:59002'),
+                                kwargs=dict(done_queue=done_queue, shared_memory_slots=2, 
+                                            shared_memory_slot_size=8 * 1024**2), daemon=True).start()
+        thing_client = ObjectProxy('test-run-shared-memory', log_level=logging.WARN) # type: TestThing
+        tcp_client = ObjectProxy('test-run-shared-memory', protocol='TCP', socket_address='tcp://localhost:59002', 
+                                log_level=logging.WARN) # type: TestThing
+        ring = thing_client.zmq_client._shared_memory_ring
+        self.assertIsNotNone(ring)
+        self.assertIsNone(tcp_client.zmq_client._shared_memory_ring)
+        replies = [thing_client.get_arrays(size=1000000) for _ in range(3)] # third does not find a free slot
+        self.assertEqual(ring.stats['held'], 2)
+        for reply in replies + [tcp_client.get_arrays(size=1000000)]:
+            self.assertEqual(reply['array'][-1], 999999)
+            self.assertEqual(reply['images'][1].shape, (3, 4))
+        del replies, reply
+        self.assertEqual(ring.stats['held'], 0)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-shared-memory')
+
+    def test_thing_run_with_shared_memory_threshold(self):
+        # arrays smaller than the threshold are sent through the socket although the ring has free slots
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-shared-memory-threshold',),
+                                kwargs=dict(done_queue=done_queue, shared_memory_slots=2, 
+                                            shared_memory_slot_size=16 * 1024**2, 
+                                            shared_memory_threshold=12 * 1024**2), daemon=True).start()
+        thing_client = ObjectProxy('test-run-shared-memory-threshold', log_level=logging.WARN) # type: TestThing
+        ring = thing_client.zmq_client._shared_memory_ring
+        self.assertIsNotNone(ring)
+        reply = thing_client.get_arrays(size=1000000)
+        self.assertEqual(reply['array'][-1], 999999)
+        self.assertEqual(ring.stats['held'], 0)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-shared-memory-threshold')
+
+    def test_thing_run_with_shared_memory_ring_and_cancelled_calls(self):
+        # slots of replies which arrive after their call was cancelled are released when the reply is dropped
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-shared-memory-cancel',),
+                                kwargs=dict(done_queue=done_queue, shared_memory_slots=4, 
+                                            shared_memory_slot_size=8 * 1024**2), daemon=True).start()
+        thing_client = ObjectProxy('test-run-shared-memory-cancel', async_mixin=True, 
+                                log_level=logging.WARN) # type: TestThing
+        ring = thing_client.async_zmq_client._shared_memory_ring
+        self.assertIsNotNone(ring)
+
+        async def cancel_calls():
+            for _ in range(4):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(thing_client.async_invoke_action('get_arrays', size=1000000), 1e-4)
+            await asyncio.sleep(0.5) # late replies are received and dropped
+
+        asyncio.run(cancel_calls())
+        self.assertEqual(ring.stats['held'], 0)
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-shared-memory-cancel')
+
     
+    def test_shared_memory_ring_lease(self):
+        # slots not claimed by a running client are taken back after the lease, claimed ones are kept
+        ring = SharedMemoryRing.create(slots=1, slot_size=1024, threshold=16, lease=0.1)
+        client_ring = SharedMemoryRing.attach(**ring.capabilities)
+        try:
+            handle = ring.write(bytes(64))
+            self.assertIsNotNone(handle)
+            self.assertIsNone(ring.write(bytes(64))) # held, reply lost
+            time.sleep(0.15)
+            handle = ring.write(bytes(64)) 
+            self.assertIsNotNone(handle)
+            self.assertEqual(ring.stats['reclaimed'], 1)
+            frame = client_ring.read(handle) # claimed by this process
+            time.sleep(0.15)
+            self.assertIsNone(ring.write(bytes(64)))
+            del frame
+            self.assertIsNotNone(ring.write(bytes(64)))
+            self.assertEqual(ring.stats['reclaimed'], 1)
+        finally:
+            client_ring.close()
+            ring.close()
+
+    def test_thing_run_behind_load_balancing_broker(self):
+        # replicas under the same instance name on different TCP sockets are served by the broker over IPC
+        done_queue = multiprocessing.Queue()
+        worker_addresses = ['tcp://localhost:59011', 'tcp://localhost:59012']
+        for port in [59011, 59012]:
+            multiprocessing.Process(target=start_thing, args=('test-run-broker', ['TCP'], f'tcp://*:{port}'),
+                                    kwargs=dict(done_queue=done_queue), daemon=True).start()
+        broker = LoadBalancingBroker('test-run-broker', worker_addresses, log_level=logging.WARN)
+        broker_thread = threading.Thread(target=asyncio.run, args=(broker.run(),), daemon=True)
+        broker_thread.start()
+        thing_client = ObjectProxy('test-run-broker', log_level=logging.WARN) # type: TestThing
+        while not all(worker['alive'] for worker in broker.stats['workers']):
+            time.sleep(0.1)
+        self.assertEqual(len(set(thing_client.get_pid() for _ in range(4))), 2) # idle workers take turns
+        start = time.time()
+        replies = [thing_client.invoke_action('sleep', noblock=True, duration=0.5) for _ in range(4)]
+        for reply in replies:
+            thing_client.read_reply(reply)
+        self.assertLess(time.time() - start, 1.4) # two at a time
+        stats = broker.stats
+        self.assertEqual(stats['in_flight'], 0)
+        for worker_stats in stats['workers']:
+            self.assertTrue(worker_stats['alive'])
+            self.assertGreaterEqual(worker_stats['completed'], 4)
+        # a worker that stopped is given no more instructions
+        ObjectProxy('test-run-broker', protocol='TCP', socket_address=worker_addresses[0], 
+                    log_level=logging.WARN).exit()
+        self.assertEqual(done_queue.get(), 'test-run-broker')
+        time.sleep(0.5) # disconnect is noticed
+        self.assertFalse(broker.stats['workers'][0]['alive'])
+        self.assertEqual(thing_client.test_echo(5), 5)
+        self.assertEqual(broker.stats['workers'][1]['outstanding'], 0)
+        ObjectProxy('test-run-broker', protocol='TCP', socket_address=worker_addresses[1], 
+                    log_level=logging.WARN).exit()
+        self.assertEqual(done_queue.get(), 'test-run-broker')
+        broker.stop()
+        broker_thread.join()
+        broker.exit()
+
+    def test_thing_run_with_replica(self):
+        # property reads are answered by the replica while the primary is busy, everything else reaches the primary
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-replica', ['TCP'], 'tcp://*:59021'),
+                                kwargs=dict(done_queue=done_queue), daemon=True).start()
+        replica = ThingReplica('test-run-replica', 'tcp://localhost:59021', protocols=['IPC'], refresh_interval=None, 
+                                log_level=logging.WARN)
+        replica_thread = threading.Thread(target=asyncio.run, args=(replica.run(),), daemon=True)
+        replica_thread.start()
+        thing_client = ObjectProxy('test-run-replica', log_level=logging.WARN) # type: TestThing
+        primary_client = ObjectProxy('test-run-replica', protocol='TCP', socket_address='tcp://localhost:59021', 
+                                    log_level=logging.WARN) # type: TestThing
+        while replica.stats['refreshes'] == 0:
+            time.sleep(0.05)
+        local_replies = replica.stats['local_replies']
+        self.assertIn('depth', thing_client.queue_stats) # diagnostics of the primary are read from it
+        self.assertEqual(replica.stats['local_replies'], local_replies)
+        reply = thing_client.invoke_action('sleep', noblock=True, duration=1)
+        start = time.time()
+        self.assertEqual(thing_client.number_prop, 0)
+        self.assertEqual(thing_client.threaded_number_prop, 0)
+        self.assertLess(time.time() - start, 0.5) # did not wait for the sleep
+        thing_client.number_prop = 5 # written by the primary after the sleep
+        self.assertEqual(thing_client.number_prop, 5) # read from the primary until the next refresh
+        thing_client.read_reply(reply)
+        self.assertEqual(thing_client.get_thing_description(), thing_client.get_thing_description())
+        primary_client.observable_number_prop = 7 # change event updates the replica
+        time.sleep(0.2)
+        local_replies = replica.stats['local_replies']
+        self.assertEqual(thing_client.observable_number_prop, 7)
+        self.assertEqual(replica.stats['local_replies'], local_replies + 1)
+        primary_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-replica')
+        time.sleep(0.5) # disconnect is noticed
+        self.assertFalse(replica.stats['workers'][0]['alive'])
+        self.assertEqual(replica.stats['snapshot'], 0)
+        replica.stop()
+        replica_thread.join()
+        replica.exit()
+
+    def test_thing_run_with_replica_of_busy_primary(self):
+        # property reads are passed to the primary once a refresh is late or failed, until the next refresh
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-replica-busy', ['TCP'], 'tcp://*:29022'),
+                                kwargs=dict(done_queue=done_queue), daemon=True).start()
+        replica = ThingReplica('test-run-replica-busy', 'tcp://localhost:29022', protocols=['IPC'], 
+                                refresh_interval=0.2, invokation_timeout=0.5, log_level=logging.CRITICAL)
+        replica_thread = threading.Thread(target=asyncio.run, args=(replica.run(),), daemon=True)
+        replica_thread.start()
+        thing_client = ObjectProxy('test-run-replica-busy', log_level=logging.WARN) # type: TestThing
+        while replica.stats['refreshes'] == 0:
+            time.sleep(0.05)
+        local_replies = replica.stats['local_replies']
+        self.assertEqual(thing_client.number_prop, 0)
+        self.assertEqual(replica.stats['local_replies'], local_replies + 1)
+        reply = thing_client.invoke_action('sleep', noblock=True, duration=1.5)
+        time.sleep(0.7) # refresh is late & times out
+        start = time.time()
+        self.assertEqual(thing_client.number_prop, 0)
+        self.assertGreater(time.time() - start, 0.3) # waited for the sleep of the primary
+        self.assertEqual(replica.stats['local_replies'], local_replies + 1)
+        thing_client.read_reply(reply)
+        refreshes = replica.stats['refreshes']
+        while replica.stats['refreshes'] == refreshes:
+            time.sleep(0.05)
+        self.assertEqual(thing_client.number_prop, 0)
+        self.assertEqual(replica.stats['local_replies'], local_replies + 2)
+        ObjectProxy('test-run-replica-busy', protocol='TCP', socket_address='tcp://localhost:29022', 
+                    log_level=logging.WARN).exit()
+        self.assertEqual(done_queue.get(), 'test-run-replica-busy')
+        replica.stop()
+        replica_thread.join()
+        replica.exit()
+
+    def test_thing_run_with_registry(self):
+        # TCP sockets bound to ports assigned by the OS are found by clients in the registry of the host
+        done_queue = multiprocessing.Queue()
+        multiprocessing.Process(target=start_thing, args=('test-run-registry', ['IPC', 'TCP']),
+                                kwargs=dict(done_queue=done_queue), daemon=True).start()
+        thing_client = ObjectProxy('test-run-registry', log_level=logging.WARN) # type: TestThing
+        entry = thing_registry.lookup('test-run-registry')
+        self.assertEqual(set(entry['endpoints'].keys()), {'IPC', 'TCP'})
+        self.assertTrue(entry['events'].startswith('ipc://') or entry['events'].startswith('tcp://'))
+        tcp_client = ObjectProxy('test-run-registry', protocol='TCP', log_level=logging.WARN) # type: TestThing
+        self.assertEqual(tcp_client.zmq_client.socket_address, thing_registry.resolve('test-run-registry', 'TCP'))
+        self.assertEqual(tcp_client.get_pid(), entry['pid'])
+        self.assertIn('test-run-registry', thing_registry.list())
+        thing_client.exit()
+        self.assertEqual(done_queue.get(), 'test-run-registry')
+        self.assertIsNone(thing_registry.lookup('test-run-registry'))
+
+    def test_registry_keeps_entries_registered_meanwhile(self):
+        # an entry read as stale (or for deregistering) is not removed when replaced by a new registration meanwhile
+        with tempfile.TemporaryDirectory() as directory:
+            registry = ThingRegistry(directory)
+            registry.register('test-registry-race', dict(IPC='ipc:///tmp/old.ipc'))
+            read_entry = registry.lookup('test-registry-race')
+            time.sleep(0.01)
+            registry.register('test-registry-race', dict(IPC='ipc:///tmp/new.ipc'))
+            with unittest.mock.patch('os.replace') as replace:
+                registry._remove('test-registry-race', read_entry) # removal based on the entry read before
+            replace.assert_not_called() # the new entry was never moved aside, lookups meanwhile find it
+            self.assertEqual(registry.resolve('test-registry-race', 'IPC'), 'ipc:///tmp/new.ipc')
+            registry._remove('test-registry-race', registry.lookup('test-registry-race'))
+            self.assertIsNone(registry.lookup('test-registry-race'))
+            self.assertEqual(os.listdir(directory), [])
+
     # def test_thing_run_and_exit_with_httpserver(self):
         # EventLoop.get_async_loop() # creates the event loop if absent
         # context = zmq.asyncio.Context()
@@ -77,9 +628,9 @@ class TestOceanOpticsSpectrometer(TestThing):
         
 
 def start_thing(instance_name : str, protocols : typing.List[str] = ['IPC'], tcp_socket_address : str = None,
-                done_queue : typing.Optional[multiprocessing.Queue] = None) -> None:
+                done_queue : typing.Optional[multiprocessing.Queue] = None, **kwargs) -> None:
     thing = TestThing(instance_name=instance_name) #, log_level=logging.WARN)
-    thing.run(zmq_protocols=protocols, tcp_socket_address=tcp_socket_address)
+    thing.run(zmq_protocols=protocols, tcp_socket_address=tcp_socket_address, **kwargs)
     if done_queue is not None:
         done_queue.put(instance_name)
 
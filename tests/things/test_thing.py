@@ -1,8 +1,18 @@
-from hololinked.server import Thing, action
+import asyncio
+import os
+import time
+from hololinked.server import Thing, action, Priority
+from hololinked.server.properties import Number
 
 
 class TestThing(Thing):
 
+    number_prop = Number(default=0, doc="A fully editable number property")
+    threaded_number_prop = Number(default=0, threaded=True, lock='device', 
+                                doc="A number property read & written in the thread pool")
+    observable_number_prop = Number(default=0, observable=True, 
+                                doc="A number property pushing a change event when written")
+
     @action()
     def get_protocols(self):
         protocols = []
@@ -16,4 +26,60 @@ class TestThing(Thing):
 
     @action()
     def test_echo(self, value):
-        return value
\ No newline at end of file
+        return value
+
+    @action()
+    def sleep(self, duration):
+        time.sleep(duration) # blocks the Thing
+
+    @action(priority=Priority.HIGH)
+    def urgent_echo(self, value):
+        return value
+
+    @action(create_task=True)
+    async def async_sleep(self, duration):
+        await asyncio.sleep(duration) # other instructions are executed meanwhile
+        return duration
+
+    @action(create_task=True)
+    async def async_log(self, message, duration):
+        self.logger.warning(f"{message} started")
+        await asyncio.sleep(duration) # other instructions log meanwhile
+        self.logger.warning(f"{message} completed")
+
+    @action(threaded=True)
+    def threaded_log(self, message, duration):
+        self.logger.warning(f"{message} started")
+        time.sleep(duration)
+        self.logger.warning(f"{message} completed")
+
+    @action(create_task=True, max_concurrency=1)
+    async def async_sleep_one_at_a_time(self, duration):
+        await asyncio.sleep(duration)
+        return duration
+
+    @action(threaded=True)
+    def threaded_sleep(self, duration):
+        time.sleep(duration) # blocks a thread of the pool, not the Thing
+        return duration
+
+    @action(threaded=True, lock='device')
+    def locked_sleep(self, duration):
+        time.sleep(duration)
+        return duration
+
+    @action()
+    def get_pid(self):
+        return os.getpid()
+
+    @action()
+    def get_arrays(self, size):
+        import numpy
+        return dict(array=numpy.arange(size, dtype=numpy.float64), 
+                    images=[numpy.ones((4, 3), dtype=numpy.uint16), numpy.ones((4, 3), dtype=numpy.uint16).T])
+
+    @classmethod
+    @action(process_pool=True)
+    def process_pool_arange(cls, size):
+        import numpy # CPU bound work is done in another process
+        return dict(pid=os.getpid(), array=numpy.arange(size, dtype=numpy.float64))